@@ -2,7 +2,18 @@ from django.contrib import admin
 
 # Register your models here.
 
-from .models import Worker, Schedule
+from .models import Team, Worker, Schedule, SolveJob, ShiftType, StaffingDemand, Assignment
 
+admin.site.register(Team)
 admin.site.register(Worker)
-admin.site.register(Schedule)
\ No newline at end of file
+admin.site.register(Assignment)
+admin.site.register(SolveJob)
+admin.site.register(ShiftType)
+admin.site.register(StaffingDemand)
+
+
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    # sort by solve_time to find the slow periods
+    list_display = ['id', 'schedule_period', 'period_end', 'solve_time', 'build_time', 'model_variables', 'model_constraints', 'solver_status']
+    list_filter = ['solver_status']
\ No newline at end of file
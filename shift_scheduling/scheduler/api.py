@@ -0,0 +1,220 @@
+import base64
+import datetime
+import functools
+import json
+from django.contrib.auth import authenticate
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_POST
+from .models import Worker, Schedule, SolveJob
+from .forms import WorkerApiForm, MonthForm
+from .data_checks import data_checks
+from .imports import WORKER_FIELDS, match_workers, save_workers
+from .jobs import get_or_enqueue_schedule_job, job_status, invalidate_cached_schedules
+from .metrics import prometheus_text
+
+
+# JSON endpoints for other systems (an HR sync, scripts). They take HTTP
+# Basic auth as well as the session, answer 401 instead of redirecting to the
+# login page, and skip the CSRF token: request bodies have to be JSON, which a
+# cross-site form can't send.
+
+
+def api_error(msg, status=400, **extra):
+    return JsonResponse({'error': msg, **extra}, status=status)
+
+
+def basic_auth_user(request):
+    method, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if method.lower() != 'basic':
+        return None
+
+    try:
+        username, _, password = base64.b64decode(credentials).decode().partition(':')
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+    return authenticate(request, username=username, password=password)
+
+
+def api_view(view):
+    @csrf_exempt
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user = basic_auth_user(request)
+        if user is not None:
+            request.user = user
+
+        if not request.user.is_authenticated:
+            response = api_error('authentication required', status=401)
+            response['WWW-Authenticate'] = 'Basic realm="scheduler"'
+            return response
+
+        if request.method == 'POST':
+            if request.content_type != 'application/json':
+                return api_error('the request body must be application/json', status=415)
+            try:
+                request.json = json.loads(request.body)
+            except ValueError:
+                return api_error('the request body is not valid JSON')
+
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def worker_data(worker):
+    return {
+        'id': worker.id,
+        'external_id': worker.external_id,
+        **{field: getattr(worker, field) for field in WORKER_FIELDS},
+    }
+
+
+@api_view
+@require_GET
+def workers(request):
+    return JsonResponse({'workers': [worker_data(worker) for worker in Worker.objects.order_by('id')]})
+
+
+@api_view
+@require_POST
+def workers_bulk(request):
+    """
+    Creates or updates many workers and their unavailable dates in one
+    request:
+
+        {"unavailable_since": "2026-01-01",
+         "workers": [{"external_id": "hr-17", "first_name": ..., "last_name": ...,
+                      "assign_least_shifts": false, "assign_least_weekends": false,
+                      "unavailable_dates": ["2026-01-05", ...]}, ...]}
+
+    A worker's unavailable dates from unavailable_since (default: the first
+    of this month) on are replaced when the item has "unavailable_dates",
+    older ones are kept. Nothing is saved if any item is invalid.
+    """
+    items = request.json.get('workers') if isinstance(request.json, dict) else None
+    if not isinstance(items, list):
+        return api_error('expected {"workers": [...]}')
+
+    try:
+        since = datetime.date.fromisoformat(request.json.get('unavailable_since') or datetime.date.today().replace(day=1).isoformat())
+    except (TypeError, ValueError):
+        return api_error('unavailable_since must be YYYY-MM-DD')
+
+    forms = [WorkerApiForm(item if isinstance(item, dict) else {}) for item in items]
+    errors = {index: form.errors.get_json_data() for index, form in enumerate(forms) if not form.is_valid()}
+    if errors:
+        return api_error('invalid workers', errors=errors)
+
+    rows = [form.cleaned_data for form in forms]
+    external_ids = [row['external_id'] for row in rows if row['external_id']]
+    if len(external_ids) != len(set(external_ids)):
+        return api_error('external_id must be unique within the request')
+
+    # None keeps the worker's dates as they are
+    for row, item in zip(rows, items):
+        if 'unavailable_dates' not in item:
+            row['unavailable_dates'] = None
+
+    workers, missing = match_workers(rows)
+    if missing:
+        return api_error('invalid workers', errors={index: {'id': [{'message': 'No such worker.', 'code': 'invalid'}]} for index in missing})
+
+    with transaction.atomic():
+        created, updated, _ = save_workers(workers, rows, since)
+        # bulk writes don't send the signals that usually do this
+        invalidate_cached_schedules()
+
+    return JsonResponse({
+        'created': created,
+        'updated': updated,
+        'workers': [{'id': worker.id, 'external_id': worker.external_id} for worker in workers],
+    })
+
+
+@api_view
+@require_POST
+def solve(request):
+    """
+    Starts a solve: {"schedule_period": "2026-01", "period_end": "2026-03",
+    "base_schedule": id, "minimal_changes": true, "time_limit": 10, ...}
+    with the fields of MonthForm. Answers with the stored schedule if the
+    same input was solved before, otherwise with the job to poll.
+    """
+    data = request.json if isinstance(request.json, dict) else {}
+    form = MonthForm(data)
+    if not form.is_valid():
+        return api_error('invalid request', errors=form.errors.get_json_data())
+
+    base_schedule = None
+    if data.get('base_schedule') is not None:
+        # bool is an int subclass, true and false are no primary keys
+        if isinstance(data['base_schedule'], int) and not isinstance(data['base_schedule'], bool):
+            base_schedule = Schedule.objects.filter(pk=data['base_schedule']).only('pk').first()
+        if base_schedule is None:
+            return api_error('no such base_schedule')
+
+    schedule_period = form.cleaned_data['schedule_period']
+    period_end = form.cleaned_data['period_end']
+
+    test_results = data_checks(Worker.objects.all(), schedule_period, period_end)
+    if test_results['code'] != 0:
+        return api_error(test_results['msg'], code=test_results['code'])
+
+    schedule, job = get_or_enqueue_schedule_job(
+        schedule_period,
+        period_end,
+        base_schedule=base_schedule,
+        minimal_changes=bool(data.get('minimal_changes')) and base_schedule is not None,
+        solver_options=form.solver_options(),
+    )
+
+    if schedule is not None:
+        return JsonResponse({'schedule': reverse('api_schedule', args=[schedule.pk])})
+
+    return JsonResponse({**job_status(job), 'status_url': reverse('api_job', args=[job.pk])}, status=202)
+
+
+@api_view
+@require_GET
+def job(request, pk):
+    job = get_object_or_404(SolveJob, pk=pk)
+    data = job_status(job)
+    if job.status == SolveJob.DONE and job.schedule_id:
+        data['schedule'] = reverse('api_schedule', args=[job.schedule_id])
+    return JsonResponse(data)
+
+
+def schedule_etag(request, pk):
+    # a schedule only changes through saves, which move updated_at
+    updated_at = Schedule.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return f'{pk}-{updated_at.timestamp()}'
+
+
+@api_view
+@require_GET
+@condition(etag_func=schedule_etag)
+def schedule(request, pk):
+    schedule = get_object_or_404(Schedule.objects.defer('per_day_schedule', 'per_employee_schedule'), pk=pk)
+    return JsonResponse({
+        'id': schedule.id,
+        'schedule_period': schedule.schedule_period.isoformat(),
+        'period_end': schedule.last_day().isoformat(),
+        'parent': schedule.parent_id,
+        'stats': schedule.schedule_stats,
+        'days': schedule.per_day(),
+        'workers': schedule.per_employee(),
+    })
+
+
+@api_view
+@require_GET
+def metrics(request):
+    # for a Prometheus scrape job with basic_auth, see metrics.py
+    return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
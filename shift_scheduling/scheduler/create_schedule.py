@@ -1,56 +1,774 @@
 import datetime
 import calendar
+import random
+import threading
+import time
 from ortools.sat.python import cp_model
 import math
+import numpy as np
+from .models import unavailability_map
+from .flow import shift_count_bounds
+from .demand import load_demand, headcount_matrix, eligibility_matrix
+from .metrics import log_solve
+
+OBJECTIVE_MODES = ['sequential', 'hinted', 'weighted', 'lns']
+
+INTERVAL_ENCODINGS = ['reified', 'implication']
+
+
+DEFAULT_SOLVER_PARAMS = {'time_limit': 5}
+
+# short names for the CP-SAT parameters we set most often
+SOLVER_PARAM_ALIASES = {
+    'time_limit': 'max_time_in_seconds',
+    'deterministic_time': 'max_deterministic_time',
+}
+
+
+def apply_solver_params(solver, solver_params=None):
+    """
+    Sets solver parameters from a dict such as
+    {'time_limit': 5, 'num_workers': 8, 'random_seed': 42}. Keys are CP-SAT
+    SatParameters field names or one of SOLVER_PARAM_ALIASES. time_limit
+    applies to each objective stage separately.
+    """
+    params = {**DEFAULT_SOLVER_PARAMS, **(solver_params or {})}
+
+    for name, value in params.items():
+        name = SOLVER_PARAM_ALIASES.get(name, name)
+
+        if value is None:
+            continue
+
+        if not hasattr(solver.parameters, name):
+            raise ValueError(f'unknown solver parameter: {name}')
+
+        setattr(solver.parameters, name, value)
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Reports every improving solution of a stage to progress, a callable that
+    gets a dict with the stage name, objective, bound and wall time. If
+    progress returns True the search stops and the best solution so far is kept.
+    """
+
+    def __init__(self, progress, stage):
+        super().__init__()
+        self.progress = progress
+        self.stage = stage
+        self.solutions = 0
+        self.stopped = False
+
+    def on_solution_callback(self):
+        self.solutions += 1
+
+        stop = self.progress({
+            'stage': self.stage,
+            'objective': self.objective_value,
+            'bound': self.best_objective_bound,
+            'wall_time': self.wall_time,
+            'deterministic_time': self.deterministic_time,
+            'solutions': self.solutions,
+        })
+
+        if stop:
+            self.stopped = True
+            self.stop_search()
+
+
+STOP_POLL_INTERVAL = 0.5 # seconds between two should_stop calls during a solve
+
+
+class StopWatcher:
+    """
+    Calls should_stop every `interval` seconds from a thread of its own while
+    the with block solves, and stops the search once it returns True. Unlike
+    a solution callback this also works before the first solution and while
+    the solver is only improving the bound. Does nothing without should_stop.
+    """
+
+    def __init__(self, solver, should_stop, interval=STOP_POLL_INTERVAL):
+        self.solver = solver
+        self.should_stop = should_stop
+        self.interval = interval
+        self.stopped = False
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True) if should_stop is not None else None
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            if self.stopped or self.should_stop():
+                self.stopped = True
+                # repeated until the solve returns, a stop that comes before
+                # the solver started searching is dropped by CP-SAT
+                self.solver.stop_search()
+
+    def __enter__(self):
+        if self.thread is not None:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def solve_stage(model, solver, name, progress=None, should_stop=None):
+    """
+    Solves the model once and returns the status, the stage's stats and
+    whether progress or should_stop asked to stop.
+    """
+    callback = ProgressCallback(progress, name) if progress is not None else None
+    with StopWatcher(solver, should_stop) as watcher:
+        status = solver.solve(model, callback)
+    solved = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+
+    stage = {
+        'stage': name,
+        'status': solver.status_name(status),
+        'wall_time': solver.wall_time,
+        'deterministic_time': solver.response_proto.deterministic_time,
+        'objective': solver.objective_value if solved else None,
+        'bound': solver.best_objective_bound if solved else None,
+        # relative distance between the solution and the bound, 0 when optimal
+        'gap': abs(solver.objective_value - solver.best_objective_bound) / max(1, abs(solver.objective_value)) if solved else None,
+        'branches': solver.num_branches,
+        'conflicts': solver.num_conflicts,
+    }
+
+    stopped = (callback is not None and callback.stopped) or watcher.stopped
+    if stopped:
+        stage['stopped'] = True
+
+    return status, stage, stopped
+
+
+def restore_solution(model, solver, solution):
+    """
+    Puts the values of an earlier solve (its response's solution, one value
+    per model variable) back into the solver, by solving once more with every
+    variable fixed to them. Returns the status of that solve.
+    """
+    model.clear_hints()
+    model.proto.solution_hint.vars.extend(range(len(solution)))
+    model.proto.solution_hint.values.extend(solution)
+
+    solver.parameters.fix_variables_to_their_hinted_value = True
+    status = solver.solve(model)
+    solver.parameters.fix_variables_to_their_hinted_value = False
+
+    model.clear_hints()
+    return status
+
+
+def solve_lexicographic(model, solver, objectives, hint_vars=None, progress=None, should_stop=None):
+    """
+    Minimizes the objectives one at a time, fixing each optimum before moving on
+    to the next one. The solver keeps the values of the last solve, which is
+    the final schedule, so no extra solve is needed at the end.
+
+    If hint_vars is given, each stage's solution is passed on to the next stage
+    as a hint, which is still a valid solution after the equality is added.
+    If the search is stopped through progress or should_stop, the remaining
+    stages are skipped. A stage stopped before its first solution leaves the
+    solver with the schedule of the stage before it.
+    """
+    status = cp_model.UNKNOWN
+    stage_times = []
+    solution = None
+
+    for name, objective, _ in objectives:
+        if solution is not None and should_stop is not None and should_stop():
+            return status, stage_times
+
+        model.minimize(objective)
+        status, stage, stopped = solve_stage(model, solver, name, progress, should_stop)
+        stage_times.append(stage)
+
+        if stopped and status not in [cp_model.OPTIMAL, cp_model.FEASIBLE] and solution is not None:
+            status = restore_solution(model, solver, solution)
+
+        if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE] or stopped:
+            return status, stage_times
+
+        model.add(objective == int(solver.objective_value))
+        solution = list(solver.response_proto.solution)
+
+        if hint_vars is not None:
+            model.clear_hints()
+            for var in hint_vars:
+                model.add_hint(var, solver.value(var))
+
+    if not objectives:
+        status, stage, _ = solve_stage(model, solver, 'feasibility')
+        stage_times.append(stage)
+
+    return status, stage_times
+
+
+def weighted_objective(objectives):
+    """
+    The lexicographic objectives as one sum. Every objective is an integer in
+    [0, upper bound], so weighting objective k with the product of (ub + 1) of
+    all lower priority objectives makes one unit of it worth more than any
+    combination of the ones after it.
+    """
+    weights = []
+    weight = 1
+    for _, _, upper_bound in reversed(objectives):
+        weights.append(weight)
+        weight *= upper_bound + 1
+    weights.reverse()
+
+    return sum(w * objective for w, (_, objective, _) in zip(weights, objectives))
+
+
+def solve_weighted(model, solver, objectives, progress=None, should_stop=None):
+    """
+    Solves the lexicographic problem in one go, see weighted_objective.
+    """
+    if objectives:
+        model.minimize(weighted_objective(objectives))
+
+    status, stage, _ = solve_stage(model, solver, 'weighted', progress if objectives else None, should_stop)
+
+    return status, [stage]
+
+
+# Large neighbourhood search: on big rosters a full solve runs out of time
+# with a schedule that is far from the best one. Instead, after a short first
+# solve the schedule is improved piece by piece. Everything but a neighbourhood
+# (some days, some workers or random assignments) is fixed to the best schedule
+# so far and the small model that is left is solved, starting from the best
+# schedule as a hint. The neighbourhood grows after sub-solves that finish and
+# shrinks after ones that time out.
+# It makes no promise of a better schedule than a weighted solve given the same
+# time: in runs of benchmark_schedule --compare-weighted on rosters of up to
+# 3000 workers the results were comparable, with the weighted solve ahead on
+# some of them. The mode is there to be measured on the rosters at hand.
+
+LNS_FIRST_SHARE = 0.25 # of the time budget for the first solve
+LNS_NEIGHBOURHOOD_TIME = 1.0 # seconds per sub-solve at most
+LNS_NEIGHBOURHOODS = ['days', 'workers', 'random']
+
+
+def lns_neighbourhood(kind, by_day, by_row, num_vars, share, rng):
+    # the indexes of the variables to free: all of a block of days, all of a
+    # sample of workers, or a random sample of all variables
+    if kind == 'days':
+        length = min(len(by_day), max(2, round(share * len(by_day))))
+        first = rng.randint(0, len(by_day) - length)
+        return [i for day in range(first, first + length) for i in by_day[day]]
+
+    if kind == 'workers':
+        rows = rng.sample(range(len(by_row)), min(len(by_row), max(2, round(share * len(by_row)))))
+        return [i for row in rows for i in by_row[row]]
+
+    return rng.sample(range(num_vars), max(1, round(share * num_vars)))
+
+
+def solve_lns(model, solver, objectives, free_vars, var_keys, num_employees, num_days, progress=None, should_stop=None):
+    """
+    Minimizes the weighted objective with LNS, see the note above, for as long
+    as the solver's time limits allow the stages of a sequential solve
+    together, or until the best schedule is proven optimal. var_keys are the
+    (employee row, day) of free_vars.
+
+    Leaves the solver with the values of the best schedule.
+    """
+    if not objectives:
+        status, stage, _ = solve_stage(model, solver, 'feasibility')
+        return status, [stage]
+
+    model.minimize(weighted_objective(objectives))
+
+    parameters = solver.parameters
+    time_limit, deterministic_limit = parameters.max_time_in_seconds, parameters.max_deterministic_time
+    time_budget, deterministic_budget = time_limit * len(objectives), deterministic_limit * len(objectives)
+    rng = random.Random(parameters.random_seed)
+    started = time.perf_counter()
+
+    # the first solve may use the whole budget, but stops at the first schedule
+    # found after LNS_FIRST_SHARE of it. A large model can take that long to
+    # find any schedule, a time limit would throw away what it found so far.
+    stopped = False
+
+    def first_progress(event):
+        nonlocal stopped
+        if progress is not None and progress(event):
+            stopped = True
+            return True
+        return event['wall_time'] >= time_budget * LNS_FIRST_SHARE or event['deterministic_time'] >= deterministic_budget * LNS_FIRST_SHARE
+
+    def first_should_stop():
+        nonlocal stopped
+        stopped = stopped or should_stop()
+        return stopped
+
+    parameters.max_time_in_seconds, parameters.max_deterministic_time = time_budget, deterministic_budget
+    status, first, _ = solve_stage(model, solver, 'lns_start', first_progress, first_should_stop if should_stop is not None else None)
+    first.pop('stopped', None)
+    if stopped:
+        first['stopped'] = True
+
+    # nothing to improve on, or nothing left to improve
+    if status != cp_model.FEASIBLE or stopped:
+        parameters.max_time_in_seconds, parameters.max_deterministic_time = time_limit, deterministic_limit
+        return status, [first]
+
+    by_day = [[] for _ in range(num_days)]
+    by_row = [[] for _ in range(num_employees)]
+    for i, (row, day) in enumerate(var_keys):
+        by_day[day - 1].append(i)
+        by_row[row].append(i)
+    by_day = [indexes for indexes in by_day if indexes]
+    by_row = [indexes for indexes in by_row if indexes]
+
+    # between the sub-solves every variable is fixed to the best schedule, a
+    # sub-solve frees its neighbourhood and fixes it again afterwards
+    best = [solver.value(var) for var in free_vars]
+    best_objective, bound = solver.objective_value, solver.best_objective_bound
+    domains = model.proto.variables
+    for i, var in enumerate(free_vars):
+        domains[var.index].domain[:] = [best[i], best[i]]
+
+    # the clock includes what the solver's own time leaves out, such as
+    # copying the model for every sub-solve
+    spent, deterministic_spent = time.perf_counter() - started, first['deterministic_time']
+    # the size of every kind of neighbourhood, as a share of the days, workers or variables
+    shares = dict.fromkeys(LNS_NEIGHBOURHOODS, 0.2)
+    lns = {'stage': 'lns', 'status': 'FEASIBLE', 'wall_time': 0.0, 'deterministic_time': 0.0, 'branches': 0, 'conflicts': 0, 'neighbourhoods': 0, 'improvements': 0}
+
+    while best_objective > bound and spent < time_budget and deterministic_spent < deterministic_budget and not stopped:
+        kind = LNS_NEIGHBOURHOODS[lns['neighbourhoods'] % len(LNS_NEIGHBOURHOODS)]
+        free = lns_neighbourhood(kind, by_day, by_row, len(free_vars), shares[kind], rng)
+
+        model.clear_hints()
+        for i in free:
+            domains[free_vars[i].index].domain[:] = [0, 1]
+            model.add_hint(free_vars[i], best[i])
+
+        parameters.max_time_in_seconds = min(LNS_NEIGHBOURHOOD_TIME, time_budget - spent)
+        parameters.max_deterministic_time = deterministic_budget - deterministic_spent
+        status, stage, stopped = solve_stage(model, solver, 'lns', progress, should_stop)
+
+        if status in [cp_model.OPTIMAL, cp_model.FEASIBLE] and solver.objective_value < best_objective:
+            for i in free:
+                best[i] = solver.value(free_vars[i])
+            best_objective = solver.objective_value
+            lns['improvements'] += 1
+
+        # with everything free an optimal sub-solve is the optimum
+        if status == cp_model.OPTIMAL and len(free) == len(free_vars):
+            bound = best_objective
+
+        for i in free:
+            domains[free_vars[i].index].domain[:] = [best[i], best[i]]
+
+        spent = time.perf_counter() - started
+        deterministic_spent += stage['deterministic_time']
+        for key in ['wall_time', 'deterministic_time', 'branches', 'conflicts']:
+            lns[key] += stage[key]
+        lns['neighbourhoods'] += 1
+
+        # a neighbourhood solved to the end was too easy, one that timed out too hard
+        shares[kind] = min(1.0, shares[kind] * 1.2) if status == cp_model.OPTIMAL else max(0.01, shares[kind] * 0.8)
+
+    # one last solve with every variable fixed puts the best values into the solver
+    model.clear_hints()
+    parameters.max_time_in_seconds, parameters.max_deterministic_time = time_limit, deterministic_limit
+    status, _, _ = solve_stage(model, solver, 'lns_final')
+    for var in free_vars:
+        domains[var.index].domain[:] = [0, 1]
+
+    lns.update({
+        'status': 'OPTIMAL' if best_objective <= bound else 'FEASIBLE',
+        'objective': best_objective,
+        'bound': bound,
+        'gap': abs(best_objective - bound) / max(1, abs(best_objective)),
+    })
+    if stopped:
+        lns['stopped'] = True
+
+    return status, [first, lns]
+
+
+# Workers with the same available days, the same history and the same
+# assign_least_* flags are interchangeable: swapping two of them turns every
+# schedule into another one that is just as good, and a proof of optimality
+# has to get past all of those permutations. CP-SAT's presolve finds many of
+# them by itself. When most of a team is one large group it still helps to
+# require the group's first working days to be in lexicographic order, which
+# leaves fewer schedules of every permutation class. Ordering longer stretches,
+# the shift counts, smaller groups or the days of several shift types fought
+# the solver's own symmetry handling and made solves slower, so those are
+# left alone. With the benchmark_schedule command, identical rosters of 100 to
+# 300 workers solve 35-50% faster with the ordering, while ordering every
+# group of mixed rosters of 50 to 100 workers made them 25-50% slower.
+
+SYMMETRY_MIN_SHARE = 0.5 # of the workers, smaller groups are left alone
+SYMMETRY_MIN_GROUP = 100 # workers
+SYMMETRY_LEX_DAYS = 7 # days with a choice the ordering looks at
+
+
+def interchangeable_workers(keys, min_size=2, hinted=None):
+    """
+    The groups of at least min_size rows with the same key. Within a group
+    the rows are sorted by hinted (largest first), so a hint of which days
+    everyone works fits the order add_symmetry_breaking gives them.
+    """
+    groups = {}
+    for row, key in enumerate(keys):
+        groups.setdefault(key, []).append(row)
+
+    groups = [rows for rows in groups.values() if len(rows) >= max(2, min_size)]
+    if hinted is not None:
+        groups = [sorted(rows, key=lambda row: hinted[row], reverse=True) for rows in groups]
+    return groups
+
+
+def add_lex_greater_equal(model, xs, ys):
+    # xs >= ys lexicographically. equal is true while the prefix so far is
+    # equal, then the next x must be at least the next y.
+    equal = None
+    for position, (x, y) in enumerate(zip(xs, ys)):
+        if equal is None:
+            model.add_implication(y, x)
+        else:
+            model.add_bool_or([equal.Not(), x, y.Not()])
+
+        if position == len(xs) - 1:
+            break
+        prefix_equal = model.new_bool_var('')
+        enforce = [] if equal is None else [equal.Not()]
+        model.add_bool_or([prefix_equal, *enforce, x, y])
+        model.add_bool_or([prefix_equal, *enforce, x.Not(), y.Not()])
+        equal = prefix_equal
+
+
+def add_symmetry_breaking(model, groups, day_vars):
+    # day_vars[row] are a worker's BoolVars by day, the same days for all
+    # workers of a group
+    for rows in groups:
+        for row, next_row in zip(rows, rows[1:]):
+            add_lex_greater_equal(model, day_vars[row], day_vars[next_row])
+
+
+def add_interval_violations(model, employee_vars, employee_id, num_days, shift_interval, encoding='implication', first_start=1, last_start=None):
+    """
+    Creates one violation bool per window of shift_interval consecutive days,
+    which is true if the employee works 2 or more shifts in that window.
+    Returns (violation, window sum) pairs.
+    Windows start from first_start to last_start (by default the last window
+    that ends inside the period). employee_vars holds a BoolVar for every day
+    the employee may work (the sum of their shift BoolVars when the day has
+    several shifts) and a 0/1 constant for every other day, windows that can't
+    reach 2 shifts, or can't change, get no violation at all.
+
+    'reified' enforces both directions of that equivalence.
+    'implication' only enforces "2 or more shifts -> violation". The violations
+    are minimized, so the optimum is the same, with half the constraints. A
+    schedule short of the optimum may have violations set without a reason,
+    the window sums tell the real ones.
+    """
+    if encoding not in INTERVAL_ENCODINGS:
+        raise ValueError(f'unknown interval encoding: {encoding}')
+
+    if last_start is None:
+        last_start = num_days - shift_interval + 1
+
+    violations = []
+
+    for interval_start in range(first_start, last_start + 1):
+        interval_end = interval_start + shift_interval - 1
+
+        window = [employee_vars[day] for day in range(interval_start, interval_end + 1)]
+        window_vars = [x for x in window if not isinstance(x, int)]
+        window_constant = sum(x for x in window if isinstance(x, int))
+
+        if not window_vars or window_constant + len(window_vars) < 2:
+            continue
+
+        violation = model.new_bool_var(f'interval_violation_for_{employee_id}_from_{interval_start}_to_{interval_end}')
+
+        window_sum = cp_model.LinearExpr.sum(window_vars) + window_constant
+
+        model.add(window_sum < 2).only_enforce_if(violation.Not())
+
+        if encoding == 'reified':
+            model.add(window_sum >= 2).only_enforce_if(violation)
+
+        violations.append((violation, window_sum))
+
+    return violations
+
+
+def availability_matrix(employees, iso_dates, unavailable):
+    """
+    Returns a (workers x days) boolean NumPy array, True where the worker is
+    available. unavailable maps employee ids to their unavailable iso dates
+    (see models.unavailability_map), dates outside iso_dates are ignored.
+    """
+    column = {iso_date: i for i, iso_date in enumerate(iso_dates)}
+    available = np.ones((len(employees), len(iso_dates)), dtype=bool)
+
+    for row, e in enumerate(employees):
+        columns = [column[d] for d in unavailable.get(e.id, ()) if d in column]
+        available[row, columns] = False
+
+    return available
+
+
+def month_end(schedule_period):
+    return schedule_period.replace(day=calendar.monthrange(schedule_period.year, schedule_period.month)[1])
+
+
+def compute_shift_interval(num_days, num_employees, total_shifts=None):
+    # the longest window in which every employee can get at most one shift
+    # while all total_shifts of the period (by default 2 every day) are staffed
+    if total_shifts is None:
+        total_shifts = num_days * 2
+    return math.floor(num_days/max(math.ceil(total_shifts/num_employees), 1))
+
+
+def create_schedule(schedule_period: datetime.date, employees, objective_mode='sequential', interval_encoding='implication',
+                    period_end=None, history=None, hint=None, fixed=None, shift_interval=None, minimal_changes=False,
+                    solver_params=None, progress=None, should_stop=None, unavailable=None, demand=None, symmetry_breaking=True):
+    """
+    Schedules the days from schedule_period to period_end (inclusive). If
+    period_end is not given the schedule covers the month of schedule_period.
+
+    history, hint and fixed map iso dates to sets of employee ids working that day:
+    history -- days outside the period, usually before it. They count towards the
+               fairness totals and the shift interval windows that cross into
+               the period.
+    hint    -- a solution hint for days in the period, e.g. an earlier version
+               of the schedule (see models.assignment_day_map).
+    fixed   -- days in the period whose assignments must stay as given.
+
+    With minimal_changes the number of hinted assignments that are dropped is
+    minimized before everything else, so re-planning keeps the hint stable.
+
+    solver_params are CP-SAT parameters applied to every solve, see
+    apply_solver_params. progress is called with every improving solution,
+    see ProgressCallback. should_stop is polled while the solver runs, the
+    search stops with the best schedule so far once it returns True, see
+    StopWatcher. unavailable maps employee ids to the iso dates they
+    can't work, by default it is read from the Unavailability rows of the period.
+    demand holds the shifts of every day and their headcounts (see demand.py),
+    by default the ShiftType and StaffingDemand rows of the period.
+    symmetry_breaking orders large groups of interchangeable workers, see
+    interchangeable_workers.
+    """
+    if objective_mode not in OBJECTIVE_MODES:
+        raise ValueError(f'unknown objective mode: {objective_mode}')
+
+    build_start = time.perf_counter()
+
+    employees = list(employees)
+    history = history or {}
+    hint = hint or {}
+    fixed = fixed or {}
+
+    if period_end is None:
+        period_end = month_end(schedule_period)
 
-def create_schedule(schedule_period: datetime.date, employees):
     model = cp_model.CpModel()
 
-    num_days = calendar.monthrange(schedule_period.year, schedule_period.month)[1]
-    shift_interval = math.floor(num_days/math.ceil((num_days*2)/employees.count()))
-    shift_interval_violations = []
+    num_days = (period_end - schedule_period).days + 1
+    dates = [schedule_period + datetime.timedelta(days=day - 1) for day in range(1, num_days + 1)]
+    iso_dates = [None] + [d.isoformat() for d in dates] # iso_dates[day] is the date string of day, 1-based like the days
+
+    if demand is None:
+        demand = load_demand(schedule_period, period_end)
+
+    shift_names = [shift['name'] for shift in demand['shifts']]
+    num_shifts = len(shift_names)
+    headcount = headcount_matrix(demand, dates) # (days x shifts)
+    day_headcount = headcount.sum(axis=1)
+
+    if shift_interval is None:
+        shift_interval = compute_shift_interval(num_days, len(employees), int(day_headcount.sum()))
+    shift_interval_violations = [] # (violation, window sum) pairs, see add_interval_violations
     max_shift_violations = []
     max_wknd_shift_violations = []
 
-    month_cal = calendar.monthcalendar(schedule_period.year, schedule_period.month)
-    weekends = []
-    for week in month_cal:
-        for i, day in enumerate(week):
-            if i >= 5 and day != 0:
-                weekends.append(day)
+    weekends = [day for day in range(1, num_days + 1) if dates[day - 1].weekday() >= 5]
+
+    # shifts worked before the period, they carry over into the fairness objectives
+    prior_shifts = {e.id: 0 for e in employees}
+    prior_wknd_shifts = {e.id: 0 for e in employees}
+    for iso_date, employee_ids in history.items():
+        is_weekend = datetime.date.fromisoformat(iso_date).weekday() >= 5
+        for e_id in employee_ids:
+            if e_id in prior_shifts:
+                prior_shifts[e_id] += 1
+                prior_wknd_shifts[e_id] += is_weekend
+
+    max_total = num_days + max(prior_shifts.values(), default=0)
+    max_wknd_total = len(weekends) + max(prior_wknd_shifts.values(), default=0)
+
+    # interval windows may reach up to shift_interval - 1 days outside the period
+    # when we know what happened on those days
+    first_interval_start = 1
+    last_interval_start = num_days - shift_interval + 1
+    if shift_interval >= 2:
+        if any(iso_date < iso_dates[1] for iso_date in history):
+            first_interval_start = 2 - shift_interval
+        if any(iso_date > iso_dates[num_days] for iso_date in history):
+            last_interval_start = num_days
+
+    # availability, eligibility and weekends for every (worker, day, shift) in
+    # one pass. Days without a choice become 0/1 constants instead of variables.
+    if unavailable is None:
+        unavailable = unavailability_map([e.id for e in employees], schedule_period, period_end)
+
+    available = availability_matrix(employees, iso_dates[1:], unavailable)
+    eligible = eligibility_matrix(demand, employees)
+    weekend_mask = np.array([d.weekday() >= 5 for d in dates], dtype=bool)
+    fixed_mask = np.array([iso_date in fixed for iso_date in iso_dates[1:]], dtype=bool)
+    fixed_member = np.array(
+        [[e.id in fixed.get(iso_date, ()) for iso_date in iso_dates[1:]] for e in employees], dtype=bool
+    ).reshape(len(employees), num_days)
+
+    # candidates[worker, day, shift]: the worker can take the shift. On a fixed
+    # day only its workers can, which of the day's shifts they take is still open.
+    candidates = (
+        np.where(fixed_mask, fixed_member, available)[:, :, np.newaxis]
+        & eligible[:, np.newaxis, :]
+        & (headcount > 0)[np.newaxis, :, :]
+    )
+
+    # a day that can't be staffed leaves nothing to solve, see diagnosis.py
+    # for the explanation
+    day_workers = candidates.any(axis=2).sum(axis=0)
+    fixed_ok = (day_workers == day_headcount) & (fixed_member.sum(axis=0) == day_headcount)
+    staffed = np.where(fixed_mask, fixed_ok, day_workers >= day_headcount) & (candidates.sum(axis=0) >= headcount).all(axis=1)
+    if not staffed.all():
+        return None
+
+    free = candidates & ~fixed_mask[np.newaxis, :, np.newaxis]
+
+    # bounds from the availability alone, see flow.py: no complete schedule
+    # has a maximum below shift_bounds[1] or a minimum above shift_bounds[0],
+    # the same for the weekend shifts, so the spreads can't be smaller than
+    # the differences. The largest minimum and the smallest maximum are
+    # reached by one schedule, so every fairest schedule keeps all shift
+    # counts within shift_bounds: they become the count variables' domains
+    # and the spread of the first stage is known before solving. Not when
+    # keeping the hint comes before fairness.
+    free_headcount = np.where(fixed_mask[:, np.newaxis], 0, headcount)
+    offsets = np.array([prior_shifts[e.id] for e in employees], dtype=np.int64) + fixed_member.sum(axis=1)
+    shift_bounds = shift_count_bounds(free, free_headcount, offsets)
+    if shift_bounds is None:
+        return None
+
+    wknd_offsets = np.array([prior_wknd_shifts[e.id] for e in employees], dtype=np.int64) + (fixed_member & weekend_mask).sum(axis=1)
+    wknd_bounds = shift_count_bounds(free[:, weekend_mask], free_headcount[weekend_mask], wknd_offsets)
+
+    count_bounds = shift_bounds if not minimal_changes else None
+
+    outside_days = [*range(first_interval_start, 1), *range(num_days + 1, last_interval_start + shift_interval)]
+    outside_iso_dates = {day: (schedule_period + datetime.timedelta(days=day - 1)).isoformat() for day in outside_days}
 
     # decision variables
-    decision_vars = {}
+    decision_vars = {} # decision_vars[e.id][day] is 1 if e works that day: a BoolVar, a sum of BoolVars or a 0/1 constant
+    shift_vars = {} # shift_vars[e.id][day] are (shift, BoolVar or 1) pairs of the shifts e may take that day
+    slot_vars = [[[] for _ in range(num_shifts)] for _ in range(num_days + 1)] # slot_vars[day][shift] are the variables of that shift
+    slot_constants = np.zeros((num_days + 1, num_shifts), dtype=np.int64) # fixed shifts of that day and shift
+    free_vars = []
+    free_var_keys = [] # (employee row, day) of every free_vars entry, for the LNS neighbourhoods
+    kept_assignments = [] # hinted assignments, used by minimal_changes
     
     # auxiliary variables
     employee_shift_count = {}
     employee_wknd_shift_count = {}
-    max_shifts = model.new_int_var(0, num_days, 'max_shifts')
-    min_shifts = model.new_int_var(0, num_days, 'min_shifts')
-    min_wknd_shifts = model.new_int_var(0, len(weekends), 'min_wknd_shifts')
-    max_wknd_shifts = model.new_int_var(0, len(weekends), 'max_wknd_shifts')
+    if count_bounds is not None:
+        min_shifts = model.new_int_var(count_bounds[0], count_bounds[0], 'min_shifts')
+        max_shifts = model.new_int_var(count_bounds[1], count_bounds[1], 'max_shifts')
+    else:
+        min_shifts = model.new_int_var(0, shift_bounds[0], 'min_shifts')
+        max_shifts = model.new_int_var(shift_bounds[1], max_total, 'max_shifts')
+    min_wknd_shifts = model.new_int_var(0, wknd_bounds[0], 'min_wknd_shifts')
+    max_wknd_shifts = model.new_int_var(wknd_bounds[1], max_wknd_total, 'max_wknd_shifts')
 
-    for e in employees:
-        decision_vars[e.id] = {}
-        employee_shift_count[e.id] = model.new_int_var(0, num_days, f'{e.id}_shift_count')
-        employee_wknd_shift_count[e.id] = model.new_int_var(0, len(weekends), f'{e.id}_wknd_shift_count')
+    for row, e in enumerate(employees):
+        employee_vars = {day: int(e.id in history.get(iso_date, ())) for day, iso_date in outside_iso_dates.items()}
+        employee_vars.update(dict.fromkeys(range(1, num_days + 1), 0))
+        employee_shifts = {}
+
+        work_days = (np.flatnonzero(candidates[row].any(axis=1)) + 1).tolist()
+        var_days = [day for day in work_days if not fixed_mask[day - 1]]
+        var_wknd_days = [day for day in var_days if weekend_mask[day - 1]]
+
+        fixed_shifts = int(fixed_member[row].sum())
+        fixed_wknd_shifts = int((fixed_member[row] & weekend_mask).sum())
+        shift_count_min = prior_shifts[e.id] + fixed_shifts
+        wknd_count_min = prior_wknd_shifts[e.id] + fixed_wknd_shifts
+        # the counts are created before the day variables, CP-SAT's search
+        # depends on the variable order and this one works noticeably better
+        count_low, count_high = shift_count_min, shift_count_min + len(var_days)
+        if count_bounds is not None:
+            count_low, count_high = max(count_low, count_bounds[0]), min(count_high, count_bounds[1])
+        employee_shift_count[e.id] = model.new_int_var(count_low, count_high, f'{e.id}_shift_count')
+        # the weekday shifts are the difference of the counts, they can't take
+        # more than the weekdays with a choice or less than the fixed ones
+        weekday_min = shift_count_min - wknd_count_min
+        weekday_max = weekday_min + len(var_days) - len(var_wknd_days)
+        wknd_low = max(wknd_count_min, count_low - weekday_max)
+        wknd_high = min(wknd_count_min + len(var_wknd_days), count_high - weekday_min)
+        employee_wknd_shift_count[e.id] = model.new_int_var(wknd_low, wknd_high, f'{e.id}_wknd_shift_count')
+
+        for day in work_days:
+            iso_date = iso_dates[day]
+            shifts = np.flatnonzero(candidates[row, day - 1]).tolist()
+            is_fixed = fixed_mask[day - 1]
+
+            if is_fixed and len(shifts) == 1:
+                employee_vars[day] = 1
+                employee_shifts[day] = [(shifts[0], 1)]
+                slot_constants[day, shifts[0]] += 1
+                continue
 
-        for day in range(1, num_days + 1):
-            decision_vars[e.id][day] = model.new_bool_var(f'empl_{e.id}_on_{day}')
+            day_shift_vars = []
+            for shift in shifts:
+                var = model.new_bool_var(f'empl_{e.id}_on_{day}' if num_shifts == 1 else f'empl_{e.id}_on_{day}_shift_{shift}')
+                day_shift_vars.append(var)
+                slot_vars[day][shift].append(var)
+                free_vars.append(var)
+                free_var_keys.append((row, day))
 
-            cur_date = datetime.date(schedule_period.year, schedule_period.month, day).strftime("%Y-%m-%d") # a date string in 'YYY-MM-DD' format, same as the e.unavailable_dates list elements
+                # the hint says who works, not which shift
+                if iso_date in hint and (len(shifts) == 1 or e.id not in hint[iso_date]):
+                    model.add_hint(var, e.id in hint[iso_date])
 
-            if cur_date in e.unavailable_dates:
-                model.add(decision_vars[e.id][day] == 0)
+            employee_shifts[day] = list(zip(shifts, day_shift_vars))
+
+            if is_fixed:
+                model.add_exactly_one(day_shift_vars)
+                employee_vars[day] = 1
+            elif len(day_shift_vars) > 1:
+                model.add_at_most_one(day_shift_vars)
+                employee_vars[day] = cp_model.LinearExpr.sum(day_shift_vars)
+            else:
+                employee_vars[day] = day_shift_vars[0]
+
+        decision_vars[e.id] = employee_vars
+        shift_vars[e.id] = employee_shifts
+
+        if minimal_changes:
+            kept_assignments.extend(employee_vars[day] for day in range(1, num_days + 1) if e.id in hint.get(iso_dates[day], ()))
                     
-        model.add(employee_shift_count[e.id] == sum(decision_vars[e.id][day] for day in range(1, num_days + 1)))
+        model.add(employee_shift_count[e.id] == shift_count_min + cp_model.LinearExpr.sum([employee_vars[day] for day in var_days]))
         if e.assign_least_shifts:
             violation = model.new_bool_var(f'max_shifts_violation_for_{e.id}')
             model.add(employee_shift_count[e.id] == max_shifts).only_enforce_if(violation)
             model.add(employee_shift_count[e.id] < max_shifts).only_enforce_if(violation.Not())
             max_shift_violations.append(violation)
 
-        model.add(employee_wknd_shift_count[e.id] == sum(decision_vars[e.id][day] for day in weekends))
+        model.add(employee_wknd_shift_count[e.id] == wknd_count_min + cp_model.LinearExpr.sum([employee_vars[day] for day in var_wknd_days]))
         if e.assign_least_weekends:
             violation = model.new_bool_var(f'max_wknd_shifts_violation_for_{e.id}')
             model.add(employee_wknd_shift_count[e.id] == max_wknd_shifts).only_enforce_if(violation)
@@ -59,54 +777,93 @@ def create_schedule(schedule_period: datetime.date, employees):
 
 
         if shift_interval >= 2:
-            for interval_start in range(1, num_days - shift_interval + 2):
-                interval_end = interval_start + shift_interval - 1
+            shift_interval_violations.extend(
+                add_interval_violations(
+                    model, employee_vars, e.id, num_days, shift_interval, interval_encoding, first_interval_start, last_interval_start
+                )
+            )
+        
+    symmetry_groups = []
+    if symmetry_breaking and num_shifts == 1:
+        # everything that tells two workers apart in the model
+        keys = [
+            (
+                candidates[row].tobytes(),
+                fixed_member[row].tobytes(),
+                prior_shifts[e.id],
+                prior_wknd_shifts[e.id],
+                tuple(e.id in history.get(iso_date, ()) for iso_date in outside_iso_dates.values()),
+                e.assign_least_shifts,
+                e.assign_least_weekends,
+                # the changes objective counts each worker's own hinted days
+                tuple(e.id in hint.get(iso_date, ()) for iso_date in iso_dates[1:]) if minimal_changes else None,
+            )
+            for row, e in enumerate(employees)
+        ]
+        hinted = None
+        if hint:
+            hinted = [tuple(e.id in hint.get(iso_date, ()) for iso_date in iso_dates[1:]) for e in employees]
+        min_size = max(SYMMETRY_MIN_GROUP, math.ceil(SYMMETRY_MIN_SHARE * len(employees)))
+        symmetry_groups = interchangeable_workers(keys, min_size, hinted)
 
-                violation = model.new_bool_var(f'interval_violation_for_{e.id}_from_{interval_start}_to_{interval_end}')
-                
-                model.add(sum(decision_vars[e.id][day] for day in range(interval_start, interval_end + 1)) >= 2).only_enforce_if(violation)
-                model.add(sum(decision_vars[e.id][day] for day in range(interval_start, interval_end + 1)) < 2).only_enforce_if(violation.Not())
+        day_vars = {}
+        for row in (row for rows in symmetry_groups for row in rows):
+            e_vars = decision_vars[employees[row].id]
+            day_vars[row] = [e_vars[day] for day in range(1, num_days + 1) if not isinstance(e_vars[day], int)][:SYMMETRY_LEX_DAYS]
+        add_symmetry_breaking(model, symmetry_groups, day_vars)
 
-                shift_interval_violations.append(violation)
-        
     for day in range(1, num_days + 1):
-        model.add(sum(decision_vars[e.id][day] for e in employees) == 2)
+        for shift in range(num_shifts):
+            needed = int(headcount[day - 1, shift] - slot_constants[day, shift])
+            if slot_vars[day][shift]:
+                model.add(cp_model.LinearExpr.sum(slot_vars[day][shift]) == needed)
+            elif needed != 0:
+                return None
     
     model.add_min_equality(min_shifts, employee_shift_count.values())
     model.add_max_equality(max_shifts, employee_shift_count.values())
     model.add_min_equality(min_wknd_shifts, employee_wknd_shift_count.values())
     model.add_max_equality(max_wknd_shifts, employee_wknd_shift_count.values())
     
-    obj_1 = max_shifts - min_shifts
+    # known already when the counts are within count_bounds, the stage is skipped
+    obj_1 = max_shifts - min_shifts if count_bounds is None else count_bounds[1] - count_bounds[0]
     obj_2 = max_wknd_shifts - min_wknd_shifts
     obj_3 = sum(max_shift_violations)
     obj_4 = sum(max_wknd_shift_violations)
-    obj_5 = sum(shift_interval_violations)
+    obj_5 = sum(violation for violation, _ in shift_interval_violations)
 
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 5
-    
-    model.minimize(obj_1)
-    solver.solve(model)
-    model.add(obj_1 == int(solver.objective_value))
+    # (name, expression, upper bound) in priority order. Stages whose expression
+    # is a constant (no violation variables were created) are skipped.
+    objectives = [
+        ('obj_1', obj_1, max_total),
+        ('obj_2', obj_2, max_wknd_total),
+        ('obj_3', obj_3, len(max_shift_violations)),
+        ('obj_4', obj_4, len(max_wknd_shift_violations)),
+        ('obj_5', obj_5, len(shift_interval_violations)),
+    ]
+    if kept_assignments:
+        # every day has a fixed number of shifts, so each dropped assignment is
+        # replaced by exactly one new one and counting the dropped ones is enough
+        objectives.insert(0, ('changes', len(kept_assignments) - sum(kept_assignments), len(kept_assignments)))
 
-    model.minimize(obj_2)
-    solver.solve(model)
-    model.add(obj_2 == int(solver.objective_value))
+    objectives = [o for o in objectives if not isinstance(o[1], int)]
 
-    model.minimize(obj_3)
-    solver.solve(model)
-    model.add(obj_3 == int(solver.objective_value))
 
-    model.minimize(obj_4)
-    solver.solve(model)
-    model.add(obj_4 == int(solver.objective_value))
+    solver = cp_model.CpSolver()
+    apply_solver_params(solver, solver_params)
 
-    if shift_interval_violations:
-        model.minimize(obj_5)
-        solver.solve(model)
-    
-    status = solver.Solve(model)
+    build_time = time.perf_counter() - build_start
+    # the size before solving, the sequential stages add an equality each
+    model_size = {'variables': len(model.proto.variables), 'constraints': len(model.proto.constraints)}
+
+    if objective_mode == 'weighted':
+        status, stage_times = solve_weighted(model, solver, objectives, progress, should_stop)
+    elif objective_mode == 'lns':
+        status, stage_times = solve_lns(model, solver, objectives, free_vars, free_var_keys, len(employees), num_days, progress, should_stop)
+    else:
+        status, stage_times = solve_lexicographic(model, solver, objectives, free_vars if objective_mode == 'hinted' else None, progress, should_stop)
+
+    log_solve(schedule_period, period_end, len(employees), model_size, build_time, stage_times)
 
     if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
         return None
@@ -116,27 +873,33 @@ def create_schedule(schedule_period: datetime.date, employees):
 
     employee_day_map = {}
     for day in range(1, num_days + 1):
-        iso_date = datetime.date(schedule_period.year, schedule_period.month, day).strftime('%Y-%m-%d')
+        iso_date = iso_dates[day]
         day_data = {'iso_date': iso_date, 'daily_employees': []}
 
-        for e in employees:
-            if solver.value(decision_vars[e.id][day]) == 1:
-                day_data['daily_employees'].append({'id': e.id, 'name': str(e)})
-                
-                if e.id not in employee_day_map:
-                    employee_day_map[e.id] = []
-                
-                employee_day_map[e.id].append(iso_date)
+        for shift in range(num_shifts):
+            for e in employees:
+                if any(s == shift and solver.value(var) == 1 for s, var in shift_vars[e.id].get(day, ())):
+                    employee = {'id': e.id, 'name': str(e)}
+                    if num_shifts > 1:
+                        employee['shift'] = shift_names[shift]
+                    day_data['daily_employees'].append(employee)
+
+                    if e.id not in employee_day_map:
+                        employee_day_map[e.id] = []
+
+                    employee_day_map[e.id].append(iso_date)
         
         per_day_schedule.append(day_data)
 
     for e in employees:
-        per_employee_schedule.append({'id': e.id, 'name': str(e), 'days': employee_day_map[e.id]})
+        per_employee_schedule.append({'id': e.id, 'name': str(e), 'days': employee_day_map.get(e.id, [])})
 
+    # from the assignments, a violation bool alone may be set without two
+    # shifts in its window, see add_interval_violations
     interval_violations = []
-    for i in range(len(shift_interval_violations)):
-        if solver.value(shift_interval_violations[i]) == 1:
-            interval_violations.append(shift_interval_violations[i].Name())
+    for violation, window_sum in shift_interval_violations:
+        if solver.value(window_sum) >= 2:
+            interval_violations.append(violation.Name())
     
     shift_violations = []
     for i in range(len(max_shift_violations)):
@@ -154,7 +917,21 @@ def create_schedule(schedule_period: datetime.date, employees):
         'interval_violations': interval_violations,
         'shift_violations': shift_violations,
         'wknd_shift_violations': wknd_shift_violations,
-        'theoretical_intervals': solver.value(shift_interval),
+        'theoretical_intervals': shift_interval,
+        'objective_mode': objective_mode,
+        'interval_encoding': interval_encoding,
+        'solver_params': {**DEFAULT_SOLVER_PARAMS, **(solver_params or {})},
+        'build_time': build_time,
+        'model_size': model_size,
+        'stage_times': stage_times,
     }
+
+    if symmetry_breaking:
+        # the groups of interchangeable workers that were ordered
+        schedule_stats['symmetry_groups'] = len(symmetry_groups)
+        schedule_stats['symmetry_workers'] = sum(len(rows) for rows in symmetry_groups)
+
+    if kept_assignments:
+        schedule_stats['changes'] = len(kept_assignments) - sum(solver.value(var) for var in kept_assignments)
             
     return per_day_schedule, per_employee_schedule, schedule_stats
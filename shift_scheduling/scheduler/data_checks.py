@@ -1,62 +1,75 @@
 from datetime import date, timedelta
-from collections import defaultdict
+from .models import unavailability_map
+from .create_schedule import availability_matrix
+from .flow import AssignmentFlow
+from .demand import headcount_matrix, eligibility_matrix
+from .teams import team_groups, team_demands
 
 
 # First check if there are enough employees to satisfy the shift constraints,
-# which in this case means that for every day there must be at least 2 available
-# employees, even the same 2.
+# which in this case means that every day must have as many available
+# employees as its shifts need (see demand.py), 2 by default. Every team is
+# checked against its own shifts.
 
-# First check if there are at least 2 employees in the DB.
-# Then go through each day and check that the number of available
-# employees is at least 2.
+# First check if there are as many employees in the DB as the busiest day
+# needs. Then go through each day and check that the number of available
+# employees covers the day and each of its shifts, and finally that all days
+# can be covered together.
 
-def data_checks(employees, schedule_period):
+def data_checks(employees, schedule_period, period_end=None):
 
     employees_num = employees.count()
     
 
-    # Test 1: are there enough employees in the db to begin with
-    if employees_num < 2:
+    # Test 1: are there any employees in the db to begin with, the teams'
+    # demand decides below how many are enough
+    if employees_num == 0:
         return {'code': 1, 'msg': 'not enough employees in the DB'}
     
-    # compute first day of next month
-    if schedule_period.month == 12:
+    # compute the first day after the period, by default the first day of next month
+    if period_end is not None:
+        next_month = period_end + timedelta(days=1)
+
+    elif schedule_period.month == 12:
         next_month = date(schedule_period.year + 1, 1, 1)
     
     else:
         next_month = date(schedule_period.year, schedule_period.month + 1, 1)
     
-    # Pre-build a counter for unavailable employees per date in the month
-    unavailable_count = defaultdict(int) # date -> count
-    
     start = schedule_period
     end = next_month
 
-    unavailable_dates_lists = employees.values_list('unavailable_dates', flat=True)
+    # one query for the period's unavailable days, both tests below run on the
+    # resulting workers x days availability matrix of every team
+    employee_list = list(employees)
+    iso_dates = [(start + timedelta(days=day)).isoformat() for day in range((end - start).days)]
+    unavailable = unavailability_map([e.id for e in employee_list], start, end - timedelta(days=1))
+    groups = team_groups(employee_list)
 
-    for unavailable_dates_list in unavailable_dates_lists:
-        if not unavailable_dates_list:
-            continue
-    
-        dataset = set() # a set of date objects within the schedule period e is unavailable
-        
-        for iso_date in unavailable_dates_list:
-            dt = date.fromisoformat(iso_date)
-            if start <= dt < end:
-                dataset.add(dt)
-            
-        for dt in dataset:
-            unavailable_count[dt] += 1
-    
-    current = start
+    for (team, members), demand in zip(groups, team_demands(groups, start, end - timedelta(days=1))):
+        # teams don't share workers or shifts, each one has to be staffed on its own
+        prefix = f'{team or "without team"}: ' if len(groups) > 1 else ''
+        available = availability_matrix(members, iso_dates, unavailable)
+        headcount = headcount_matrix(demand, [start + timedelta(days=day) for day in range(len(iso_dates))])
+        candidates = available[:, :, None] & eligibility_matrix(demand, members)[:, None, :] & (headcount > 0)[None, :, :]
 
-    while current < end:
-        unavailable = unavailable_count.get(current, 0)
-        if employees_num - unavailable < 2:
-            return {'code': 2, 'msg': f'not enough available employees on {current.isoformat()}'}
-        
-        current += timedelta(days=1)
+        # Test 1: enough employees for the busiest day, available or not
+        needed = int(headcount.sum(axis=1).max(initial=0))
+        if len(members) < needed:
+            return {'code': 1, 'msg': f'{prefix}not enough employees in the DB, {needed} are needed on the busiest day'}
 
-    
+        # Test 2: enough available employees for every day and every shift
+        for column, available_num in enumerate(candidates.any(axis=2).sum(axis=0)):
+            shift_nums = candidates[:, column].sum(axis=0)
+            if available_num < headcount[column].sum() or (shift_nums < headcount[column]).any():
+                names = [str(e) for row, e in enumerate(members) if not available[row, column]]
+                return {'code': 2, 'msg': f'{prefix}not enough available employees on {iso_dates[column]}, unavailable: {", ".join(names)}'}
+
+        # Test 3: all days covered at the same time, as a max flow from the
+        # employees to the days and shifts (see flow.py). Test 2 implies it while
+        # every day has a single shift, the flow keeps the check exact when the
+        # shifts of a day compete for the same employees.
+        if not AssignmentFlow(candidates, headcount).feasible():
+            return {'code': 3, 'msg': f'{prefix}the available employees cannot cover every day of the period'}
 
-    return {'code': 0, 'msg': 'tests_succesfull'}
\ No newline at end of file
+    return {'code': 0, 'msg': 'tests_succesfull'}
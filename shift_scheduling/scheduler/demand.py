@@ -0,0 +1,81 @@
+import numpy as np
+from .models import ShiftType, StaffingDemand
+
+
+# What a schedule has to staff: the shifts of every day and how many workers
+# each of them needs. It is passed around as a plain dict, so it can go into
+# the schedule fingerprint and to the solver processes:
+#
+#   {'shifts': [{'name': 'Day', 'headcount': 2, 'weekend_headcount': 2,
+#                'eligible': None or [worker ids]}, ...],
+#    'dates': {iso date: [headcount of each shift, None for the default]}}
+#
+# A worker works at most one shift per day.
+
+DEFAULT_DEMAND = {
+    'shifts': [{'name': 'Shift', 'headcount': 2, 'weekend_headcount': 2, 'eligible': None}],
+    'dates': {},
+}
+
+
+def load_demand(start, end, team_id=None):
+    """
+    The demand of the days from start to end (inclusive) as stored in the
+    ShiftType and StaffingDemand tables for the team (the shift types without
+    a team if None), DEFAULT_DEMAND if it has no shift types.
+    """
+    shift_types = list(ShiftType.objects.filter(team_id=team_id))
+    if not shift_types:
+        return DEFAULT_DEMAND
+
+    eligible = {}
+    for shift_type_id, worker_id in ShiftType.eligible_workers.through.objects.filter(shifttype__in=shift_types).values_list('shifttype_id', 'worker_id'):
+        eligible.setdefault(shift_type_id, []).append(worker_id)
+
+    column = {shift_type.id: i for i, shift_type in enumerate(shift_types)}
+    dates = {}
+    for date, shift_type_id, headcount in StaffingDemand.objects.filter(shift_type__in=shift_types, date__range=(start, end)).values_list('date', 'shift_type_id', 'headcount'):
+        dates.setdefault(date.isoformat(), [None] * len(shift_types))[column[shift_type_id]] = headcount
+
+    return {
+        'shifts': [
+            {
+                'name': shift_type.name,
+                'headcount': shift_type.headcount,
+                'weekend_headcount': shift_type.headcount if shift_type.weekend_headcount is None else shift_type.weekend_headcount,
+                'eligible': sorted(eligible[shift_type.id]) if shift_type.id in eligible else None,
+            }
+            for shift_type in shift_types
+        ],
+        'dates': dates,
+    }
+
+
+def headcount_matrix(demand, dates):
+    """
+    A (days x shifts) integer array with the number of workers each shift
+    needs on each of dates (datetime.date objects).
+    """
+    headcount = np.array(
+        [[shift['weekend_headcount'] if d.weekday() >= 5 else shift['headcount'] for shift in demand['shifts']] for d in dates],
+        dtype=np.int64,
+    ).reshape(len(dates), len(demand['shifts']))
+
+    for row, d in enumerate(dates):
+        for column, count in enumerate(demand['dates'].get(d.isoformat(), ())):
+            if count is not None:
+                headcount[row, column] = count
+
+    return headcount
+
+
+def eligibility_matrix(demand, employees):
+    # (workers x shifts) boolean array, True where the worker may work the shift
+    eligible = np.ones((len(employees), len(demand['shifts'])), dtype=bool)
+
+    for column, shift in enumerate(demand['shifts']):
+        if shift['eligible'] is not None:
+            allowed = set(shift['eligible'])
+            eligible[:, column] = [e.id in allowed for e in employees]
+
+    return eligible
@@ -0,0 +1,206 @@
+import datetime
+from ortools.sat.python import cp_model
+from .create_schedule import availability_matrix, month_end
+from .models import unavailability_map
+from .demand import load_demand, headcount_matrix, eligibility_matrix
+
+
+# Explains why a period has no schedule at all, instead of a bare failure.
+#
+# The only hard rules of create_schedule are the headcount of every shift
+# (see demand.py), the workers' unavailable days and the fixed days,
+# everything else is an objective. Days don't share hard rules, so the cheap
+# check below (count the available workers per day and shift) already finds
+# most conflicts without building a
+# model. When it finds none, explain_infeasibility solves just the hard rules
+# with one assumption literal per rule and asks CP-SAT for a small set of
+# rules that can't hold together.
+#
+# Every conflict is a dict:
+#   {'date': iso date, 'rule': 'coverage' | 'unavailable' | 'fixed',
+#    'workers': [names], 'msg': a sentence for the planner}
+
+
+def coverage_conflicts(employees, iso_dates, unavailable, demand, fixed=None):
+    """
+    Days that can't be staffed: fewer available workers than the day or one of
+    its shifts needs, or a fixed assignment with the wrong number of workers.
+    Runs on the availability matrix, no solver involved.
+    """
+    fixed = fixed or {}
+    names = [str(e) for e in employees]
+    available = availability_matrix(employees, iso_dates, unavailable)
+    eligible = eligibility_matrix(demand, employees)
+    headcount = headcount_matrix(demand, [datetime.date.fromisoformat(iso_date) for iso_date in iso_dates])
+    conflicts = []
+
+    for column, iso_date in enumerate(iso_dates):
+        needed = int(headcount[column].sum())
+        # workers that can take at least one of the day's shifts
+        can_work = available[:, column] & (eligible & (headcount[column] > 0)).any(axis=1)
+
+        if iso_date in fixed:
+            fixed_names = [str(e) for e in employees if e.id in fixed[iso_date]]
+            if len(fixed_names) != needed:
+                conflicts.append({
+                    'date': iso_date,
+                    'rule': 'fixed',
+                    'workers': fixed_names,
+                    'msg': f'{iso_date}: the fixed assignment has {len(fixed_names)} workers, {needed} are needed.',
+                })
+
+        elif can_work.sum() < needed:
+            unavailable_names = [names[row] for row in range(len(employees)) if not available[row, column]]
+            conflicts.append({
+                'date': iso_date,
+                'rule': 'coverage',
+                'workers': unavailable_names,
+                'msg': (
+                    f'{iso_date}: only {can_work.sum()} of {len(employees)} workers are available, '
+                    f'{needed} are needed. Unavailable: {", ".join(unavailable_names)}.'
+                ),
+            })
+
+        else:
+            for shift, shift_data in enumerate(demand['shifts']):
+                shift_available = available[:, column] & eligible[:, shift]
+                if shift_available.sum() < headcount[column, shift]:
+                    unavailable_names = [names[row] for row in range(len(employees)) if eligible[row, shift] and not available[row, column]]
+                    conflicts.append({
+                        'date': iso_date,
+                        'rule': 'coverage',
+                        'workers': unavailable_names,
+                        'msg': (
+                            f'{iso_date}: only {shift_available.sum()} workers can take the {shift_data["name"]} shift, '
+                            f'{headcount[column, shift]} are needed. Unavailable: {", ".join(unavailable_names) or "nobody"}.'
+                        ),
+                    })
+
+    return conflicts
+
+
+def explain_infeasibility(employees, iso_dates, unavailable, demand, fixed=None, time_limit=10):
+    """
+    Solves only the hard rules, each unavailable day, each fixed day and each
+    shift's headcount behind its own assumption literal. Returns the conflicts of an infeasible core,
+    or [] if the hard rules can be met (the schedule failed on time instead).
+    """
+    fixed = fixed or {}
+    model = cp_model.CpModel()
+    columns = range(len(iso_dates))
+    shifts = range(len(demand['shifts']))
+    literals = []
+    assumptions = {} # literal index -> (rule, iso date, employee, shift name or None)
+
+    eligible = eligibility_matrix(demand, employees)
+    headcount = headcount_matrix(demand, [datetime.date.fromisoformat(iso_date) for iso_date in iso_dates])
+
+    # x[row][column] maps the shifts the worker may take that day to their variables
+    x = [
+        [
+            {shift: model.new_bool_var(f'empl_{e.id}_on_{iso_date}_shift_{shift}') for shift in shifts if eligible[row, shift] and headcount[column, shift] > 0}
+            for column, iso_date in enumerate(iso_dates)
+        ]
+        for row, e in enumerate(employees)
+    ]
+
+    for column, iso_date in enumerate(iso_dates):
+        for shift in shifts:
+            shift_vars = [x[row][column][shift] for row in range(len(employees)) if shift in x[row][column]]
+            if not shift_vars and headcount[column, shift] == 0:
+                continue
+            literal = model.new_bool_var(f'headcount_{iso_date}_shift_{shift}')
+            model.add(cp_model.LinearExpr.sum(shift_vars) == int(headcount[column, shift])).only_enforce_if(literal)
+            literals.append(literal)
+            assumptions[literal.index] = ('headcount', iso_date, None, demand['shifts'][shift]['name'])
+        for row in range(len(employees)):
+            model.add_at_most_one(list(x[row][column].values()))
+
+    available = availability_matrix(employees, iso_dates, unavailable)
+    for row, e in enumerate(employees):
+        for column in columns:
+            if not available[row, column] and iso_dates[column] not in fixed and x[row][column]:
+                literal = model.new_bool_var(f'unavailable_{e.id}_on_{iso_dates[column]}')
+                model.add(cp_model.LinearExpr.sum(list(x[row][column].values())) == 0).only_enforce_if(literal)
+                literals.append(literal)
+                assumptions[literal.index] = ('unavailable', iso_dates[column], e, None)
+
+    for column, iso_date in enumerate(iso_dates):
+        if iso_date in fixed:
+            literal = model.new_bool_var(f'fixed_{iso_date}')
+            for row, e in enumerate(employees):
+                model.add(cp_model.LinearExpr.sum(list(x[row][column].values())) == int(e.id in fixed[iso_date])).only_enforce_if(literal)
+            literals.append(literal)
+            assumptions[literal.index] = ('fixed', iso_date, None, None)
+
+    model.add_assumptions(literals)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    # cores are only reported by a single search worker
+    solver.parameters.num_workers = 1
+
+    if solver.solve(model) != cp_model.INFEASIBLE:
+        return []
+
+    by_date = {}
+    for index in solver.sufficient_assumptions_for_infeasibility():
+        rule, iso_date, e, shift_name = assumptions[index]
+        by_date.setdefault(iso_date, {'fixed': False, 'unavailable': [], 'shifts': []})
+        if rule == 'fixed':
+            by_date[iso_date]['fixed'] = True
+        elif rule == 'headcount':
+            by_date[iso_date]['shifts'].append(shift_name)
+        else:
+            by_date[iso_date]['unavailable'].append(str(e))
+
+    conflicts = []
+    for iso_date, rules in sorted(by_date.items()):
+        needed = int(headcount[iso_dates.index(iso_date)].sum())
+        if rules['fixed']:
+            conflicts.append({
+                'date': iso_date,
+                'rule': 'fixed',
+                'workers': rules['unavailable'],
+                'msg': f'{iso_date}: the fixed assignment conflicts with the other rules of that day.',
+            })
+        elif not rules['unavailable']:
+            # the day's shifts compete for the same eligible workers
+            conflicts.append({
+                'date': iso_date,
+                'rule': 'coverage',
+                'workers': [],
+                'msg': f'{iso_date}: the eligible workers can\'t staff the {", ".join(rules["shifts"])} shifts at the same time.',
+            })
+        else:
+            conflicts.append({
+                'date': iso_date,
+                'rule': 'unavailable',
+                'workers': rules['unavailable'],
+                'msg': f'{iso_date}: {needed} workers are needed, but {", ".join(rules["unavailable"])} are unavailable.',
+            })
+
+    return conflicts
+
+
+def diagnose_schedule(schedule_period, employees, period_end=None, unavailable=None, fixed=None, time_limit=10, demand=None):
+    """
+    Conflicts that keep the period from having any schedule, the cheap
+    coverage check first and the solver only if that finds nothing.
+    """
+    employees = list(employees)
+    period_end = period_end or month_end(schedule_period)
+    num_days = (period_end - schedule_period).days + 1
+    iso_dates = [(schedule_period + datetime.timedelta(days=day)).isoformat() for day in range(num_days)]
+
+    if unavailable is None:
+        unavailable = unavailability_map([e.id for e in employees], schedule_period, period_end)
+
+    if demand is None:
+        demand = load_demand(schedule_period, period_end)
+
+    conflicts = coverage_conflicts(employees, iso_dates, unavailable, demand, fixed)
+    if conflicts:
+        return conflicts
+
+    return explain_infeasibility(employees, iso_dates, unavailable, demand, fixed, time_limit)
@@ -0,0 +1,204 @@
+import csv
+import datetime
+import itertools
+import tempfile
+
+try:
+    import xlsxwriter
+except ImportError: # optional, only the XLSX export needs it
+    xlsxwriter = None
+
+from django.db.models import Max, Min
+from .models import Assignment, Schedule
+
+
+# Exports are generators of rows fed to a writer that streams them out, so a
+# year of schedules for a large roster never sits in memory as a whole:
+#
+#   assignments (queryset, read in chunks) -> rows -> csv / xlsx / pdf
+#
+# Two layouts: 'rows' has one line per assignment, 'workers' one line per
+# worker with a column per date (the shift on that date, 'x' without shift
+# types).
+
+EXPORT_FORMATS = ['csv', 'xlsx', 'pdf']
+EXPORT_LAYOUTS = ['rows', 'workers']
+
+CHUNK_SIZE = 2000
+
+
+def export_assignments(schedule_ids=None, start=None, end=None):
+    """
+    The assignments of the given schedules (all of them if None) from start
+    to end (inclusive, open ends if None).
+    """
+    assignments = Assignment.objects.all()
+    if schedule_ids is not None:
+        assignments = assignments.filter(schedule_id__in=schedule_ids)
+    if start is not None:
+        assignments = assignments.filter(date__gte=start)
+    if end is not None:
+        assignments = assignments.filter(date__lte=end)
+    return assignments
+
+
+def export_dates(schedule_ids=None, start=None, end=None):
+    # the date columns of the workers layout: the range asked for, or the
+    # periods of the schedules when it is open
+    if start is None or end is None:
+        schedules = Schedule.objects.all() if schedule_ids is None else Schedule.objects.filter(id__in=schedule_ids)
+        periods = schedules.aggregate(first=Min('schedule_period'), last_month=Max('schedule_period'), last_end=Max('period_end'))
+        if periods['first'] is None:
+            return []
+        last_day = Schedule(schedule_period=periods['last_month']).last_day()
+        start = start or periods['first']
+        end = end or max(last_day, periods['last_end'] or last_day)
+
+    return [start + datetime.timedelta(days=day) for day in range((end - start).days + 1)]
+
+
+def assignment_rows(assignments, with_schedule=False):
+    """
+    One row per assignment, by schedule and date. The header comes first.
+    """
+    yield ['date', 'id', 'name', 'shift'] + (['schedule'] if with_schedule else [])
+
+    rows = assignments.order_by('schedule_id', 'date', 'id').values_list('schedule_id', 'date', 'worker_id', 'worker_name', 'shift')
+    for schedule_id, date, worker_id, worker_name, shift in rows.iterator(chunk_size=CHUNK_SIZE):
+        row = [date.isoformat(), worker_id or '', worker_name, shift]
+        if with_schedule:
+            row.append(schedule_id)
+        yield row
+
+
+def worker_rows(assignments, dates, with_schedule=False):
+    """
+    One row per worker (and schedule) with a column per date. The assignments
+    are read sorted by worker, so only the current worker's row is kept.
+    """
+    yield (['schedule'] if with_schedule else []) + ['id', 'name'] + [d.isoformat() for d in dates]
+
+    column = {d: i for i, d in enumerate(dates)}
+    rows = assignments.order_by('schedule_id', 'worker_name', 'worker_id', 'date').values_list('schedule_id', 'worker_id', 'worker_name', 'date', 'shift')
+
+    for (schedule_id, worker_id, worker_name), worker_days in itertools.groupby(rows.iterator(chunk_size=CHUNK_SIZE), key=lambda row: row[:3]):
+        cells = [''] * len(dates)
+        for *_, date, shift in worker_days:
+            if date in column:
+                cells[column[date]] = shift or 'x'
+
+        yield ([schedule_id] if with_schedule else []) + [worker_id or '', worker_name] + cells
+
+
+class Echo:
+    # csv.writer needs a file, this one hands every line back instead of storing it
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(Echo(), delimiter=';')
+    yield '\ufeff'
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def xlsx_file(rows, sheet_name='Schedule'):
+    """
+    Writes rows to a temporary .xlsx file and returns it opened at the start,
+    it is deleted when closed. In constant_memory mode xlsxwriter flushes
+    every finished row to disk.
+    """
+    if xlsxwriter is None:
+        raise RuntimeError('the XLSX export needs the xlsxwriter package')
+
+    output = tempfile.NamedTemporaryFile(suffix='.xlsx')
+    workbook = xlsxwriter.Workbook(output.name, {'constant_memory': True, 'tmpdir': tempfile.gettempdir()})
+    worksheet = workbook.add_worksheet(sheet_name)
+    bold = workbook.add_format({'bold': True})
+
+    for row_number, row in enumerate(rows):
+        worksheet.write_row(row_number, 0, row, bold if row_number == 0 else None)
+
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+# A PDF is a list of numbered objects followed by a table of their byte
+# offsets, so it can be written page by page as long as the offsets are
+# counted along. Objects 1-3 (catalog, page tree, font) are referenced by
+# every page and written last.
+
+PDF_PAGE_SIZE = (595, 842) # A4 in points
+PDF_MARGIN = 40
+PDF_FONT_SIZE = 9
+PDF_LINE_HEIGHT = 12
+PDF_COLUMN_WIDTHS = [10, 6, 32, 20, 8] # characters, Courier has a fixed width
+
+
+def pdf_text(value):
+    # a PDF string literal in the font's WinAnsi encoding
+    text = str(value).encode('cp1252', errors='replace')
+    return b'(' + text.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def pdf_line(row):
+    return '  '.join(str(cell)[:width].ljust(width) for cell, width in zip(row, PDF_COLUMN_WIDTHS)).rstrip()
+
+
+class PdfWriter:
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+
+    def chunk(self, data):
+        self.position += len(data)
+        return data
+
+    def object(self, number, body):
+        self.offsets[number] = self.position
+        return self.chunk(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+
+def pdf_stream(rows, title):
+    """
+    A text PDF of the rows of the 'rows' layout, the header row repeated on
+    every page. Yields the file in pieces, one page at a time.
+    """
+    pdf = PdfWriter()
+    width, height = PDF_PAGE_SIZE
+    lines_per_page = (height - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT - 2
+
+    rows = iter(rows)
+    header = pdf_line(next(rows))
+    page_numbers = []
+    number = 4
+
+    yield pdf.chunk(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    while True:
+        lines = [pdf_line(row) for row in itertools.islice(rows, lines_per_page)]
+        if not lines and page_numbers:
+            break
+
+        content = b'BT /F1 %d Tf %d TL %d %d Td ' % (PDF_FONT_SIZE, PDF_LINE_HEIGHT, PDF_MARGIN, height - PDF_MARGIN)
+        content += b' T* '.join(pdf_text(line) + b' Tj' for line in [f'{title} - page {len(page_numbers) + 1}', header, *lines])
+        content += b' ET'
+
+        yield pdf.object(number, b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        yield pdf.object(number + 1, (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (width, height, number)
+        ))
+        page_numbers.append(number + 1)
+        number += 2
+
+    yield pdf.object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield pdf.object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % n for n in page_numbers), len(page_numbers)))
+    yield pdf.object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>')
+
+    xref_position = pdf.position
+    xref = b'xref\n0 %d\n0000000000 65535 f \n' % number
+    xref += b''.join(b'%010d 00000 n \n' % pdf.offsets[n] for n in range(1, number))
+    yield xref + b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (number, xref_position)
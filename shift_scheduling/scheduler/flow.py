@@ -0,0 +1,154 @@
+import numpy as np
+from ortools.graph.python import max_flow
+
+
+# Assigning shifts is a flow problem once the objectives are left out:
+#
+#   source -> worker (shifts the worker takes) -> day (capacity 1, only on the
+#   worker's available days) -> sink (the day's demand)
+#
+# With several shifts per day the day becomes one node per (day, shift) and a
+# (worker, day) node with capacity 1 sits in between, so nobody works two
+# shifts of a day:
+#
+#   source -> worker -> (worker, day) -> (day, shift) -> sink
+#
+# Every day is covered exactly when the max flow saturates the day arcs. Bounds
+# on a worker's number of shifts are bounds on their source arc, lower bounds
+# are handled with the usual reduction to a second source/sink pair.
+#
+# The sets of shift counts a complete assignment can give the workers is
+# M-convex (degree sequences of a bipartite b-matching, shifted by the shifts
+# the workers already have). In such a set one assignment has both the lowest
+# possible maximum and the highest possible minimum, which is what makes the
+# bounds of shift_count_bounds safe to use as variable domains.
+
+SOURCE, SINK, LOWER_SOURCE, LOWER_SINK = 0, 1, 2, 3
+
+
+class AssignmentFlow:
+    """
+    The flow network of an availability matrix (workers x days, True where the
+    worker can be assigned) and the number of workers each day needs, or of a
+    (workers x days x shifts) matrix and a (days x shifts) demand. Built once,
+    feasible() only changes the worker arcs.
+    """
+
+    def __init__(self, available, demand):
+        available = np.asarray(available, dtype=bool)
+        demand = np.asarray(demand, dtype=np.int64)
+        if available.ndim == 2:
+            available, demand = available[:, :, np.newaxis], demand.reshape(-1, 1)
+
+        num_workers, num_days, num_shifts = available.shape
+        num_slots = num_days * num_shifts
+        first_worker = 4
+        first_slot = first_worker + num_workers
+        self.num_workers = num_workers
+        self.needed = int(demand.sum())
+
+        workers = np.arange(num_workers, dtype=np.int32) + first_worker
+        slots = np.arange(num_slots, dtype=np.int32) + first_slot
+
+        self.flow = max_flow.SimpleMaxFlow()
+        # source -> worker, upper minus lower bound
+        self.upper_arcs = self.flow.add_arcs_with_capacity(
+            np.full(num_workers, SOURCE, dtype=np.int32), workers, np.zeros(num_workers, dtype=np.int64)
+        )
+        # lower bound part of source -> worker
+        self.lower_arcs = self.flow.add_arcs_with_capacity(
+            np.full(num_workers, LOWER_SOURCE, dtype=np.int32), workers, np.zeros(num_workers, dtype=np.int64)
+        )
+        self.lower_total_arc = self.flow.add_arc_with_capacity(SOURCE, LOWER_SINK, 0)
+
+        rows, days, shifts = np.nonzero(available)
+        slot_nodes = (first_slot + days * num_shifts + shifts).astype(np.int32)
+        if num_shifts == 1:
+            # worker -> day
+            self.flow.add_arcs_with_capacity((rows + first_worker).astype(np.int32), slot_nodes, np.ones(len(rows), dtype=np.int64))
+        else:
+            # worker -> (worker, day) -> (day, shift)
+            worker_days = np.flatnonzero(available.any(axis=2).ravel())
+            first_worker_day = first_slot + num_slots
+            self.flow.add_arcs_with_capacity(
+                (worker_days // num_days + first_worker).astype(np.int32),
+                np.arange(len(worker_days), dtype=np.int32) + first_worker_day,
+                np.ones(len(worker_days), dtype=np.int64),
+            )
+            worker_day_nodes = (np.searchsorted(worker_days, rows * num_days + days) + first_worker_day).astype(np.int32)
+            self.flow.add_arcs_with_capacity(worker_day_nodes, slot_nodes, np.ones(len(rows), dtype=np.int64))
+
+        # day -> sink is exactly the demand, all of it goes through the lower bound part
+        demand = demand.ravel()
+        self.flow.add_arcs_with_capacity(np.full(num_slots, LOWER_SOURCE, dtype=np.int32), np.full(num_slots, SINK, dtype=np.int32), demand)
+        self.flow.add_arcs_with_capacity(slots, np.full(num_slots, LOWER_SINK, dtype=np.int32), demand)
+        self.flow.add_arc_with_capacity(SINK, SOURCE, self.needed)
+
+    def assigned(self, lower, upper):
+        """
+        How many of the required units (the lower bounds plus all of the
+        demand) can be routed with worker i taking lower[i] to upper[i] shifts.
+        """
+        lower = np.asarray(lower, dtype=np.int64)
+        upper = np.asarray(upper, dtype=np.int64)
+
+        self.flow.set_arcs_capacity(self.upper_arcs, upper - lower)
+        self.flow.set_arcs_capacity(self.lower_arcs, lower)
+        self.flow.set_arc_capacity(self.lower_total_arc, int(lower.sum()))
+
+        if self.flow.solve(LOWER_SOURCE, LOWER_SINK) != self.flow.OPTIMAL:
+            return 0
+        return self.flow.optimal_flow()
+
+    def feasible(self, lower=None, upper=None):
+        """
+        True if every day can get its demand with worker i taking lower[i] to
+        upper[i] shifts, by default any number.
+        """
+        lower = np.zeros(self.num_workers, dtype=np.int64) if lower is None else np.asarray(lower, dtype=np.int64)
+        upper = np.full(self.num_workers, self.needed, dtype=np.int64) if upper is None else np.asarray(upper, dtype=np.int64)
+
+        if (lower > upper).any():
+            return False
+        return self.assigned(lower, upper) == lower.sum() + self.needed
+
+
+def shift_count_bounds(available, demand, offsets=None):
+    """
+    Returns (lower, upper): the largest minimum and the smallest maximum of
+    offsets + assigned shifts over all complete assignments, or None if there
+    is no complete assignment. offsets are shifts the workers have anyway
+    (history, fixed days).
+
+    Every assignment that minimizes max - min gives all workers between lower
+    and upper shifts, see the note at the top.
+    """
+    network = AssignmentFlow(available, demand)
+    offsets = np.zeros(available.shape[0], dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+    most = offsets + (available.any(axis=2) if available.ndim == 3 else available).sum(axis=1)
+
+    if not network.feasible():
+        return None
+
+    # smallest maximum: the least U with everyone at most U
+    low, high = int(offsets.max()), int(most.max())
+    while low < high:
+        middle = (low + high) // 2
+        if network.feasible(upper=middle - offsets):
+            high = middle
+        else:
+            low = middle + 1
+    lowest_max = low
+
+    # largest minimum with that maximum: the most L with everyone in [L, lowest_max]
+    upper = lowest_max - offsets
+    low, high = int(offsets.min()), lowest_max
+    while low < high:
+        middle = (low + high + 1) // 2
+        if network.feasible(lower=np.maximum(middle - offsets, 0), upper=upper):
+            low = middle
+        else:
+            high = middle - 1
+    highest_min = low
+
+    return highest_min, lowest_max
@@ -1,28 +1,93 @@
+import calendar
+import datetime
 from django import forms
-from .models import Worker
+from django.conf import settings
+from .models import Worker, Schedule
+from .exports import EXPORT_FORMATS
 from django.contrib.auth.forms import AuthenticationForm
 
 class WorkerDataForm(forms.ModelForm):
+    # the dates picked in the calendar, as a JSON list of iso dates. Only dates
+    # from edit_from on are shown and saved, older ones are kept as history.
+    unavailable_dates = forms.JSONField(required=False, widget=forms.HiddenInput())
+
+    def __init__(self, *args, edit_from=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.edit_from = edit_from or datetime.date.today().replace(day=1)
+
+        if self.instance.pk:
+            dates = self.instance.unavailabilities.filter(date__gte=self.edit_from).order_by('date').values_list('date', flat=True)
+            self.fields['unavailable_dates'].initial = [d.isoformat() for d in dates]
+
+    def clean_unavailable_dates(self):
+        iso_dates = self.cleaned_data['unavailable_dates'] or []
+
+        try:
+            return {datetime.date.fromisoformat(iso_date) for iso_date in iso_dates}
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Dates must be YYYY-MM-DD')
+
+    def save(self, commit=True):
+        worker = super().save(commit)
+        if commit:
+            worker.set_unavailable_dates(self.cleaned_data['unavailable_dates'], self.edit_from)
+        return worker
 
     class Meta:
         model = Worker
         fields = [
-            'unavailable_dates',
             'first_name',
             'last_name',
+            'team',
             'assign_least_shifts',
             'assign_least_weekends',
         ]
         
         widgets = {
-            'unavailable_dates': forms.HiddenInput(),
             'first_name': forms.TextInput(attrs={'class': 'form-input-field'}),
             'last_name': forms.TextInput(attrs={'class': 'form-input-field'}),
+            'team': forms.Select(attrs={'class': 'action-selection'}),
             'assign_least_shifts': forms.CheckboxInput(),
             'assign_least_weekends': forms.CheckboxInput(),
         }
 
 
+class WorkerApiForm(forms.Form):
+    # one worker of the API's bulk upsert, see api.py. A worker is matched by
+    # external_id, or by id when there is none, and created if nothing matches.
+    id = forms.IntegerField(required=False)
+    external_id = forms.CharField(max_length=100, required=False)
+    first_name = forms.CharField(max_length=100)
+    last_name = forms.CharField(max_length=100)
+    assign_least_shifts = forms.BooleanField(required=False)
+    assign_least_weekends = forms.BooleanField(required=False)
+    unavailable_dates = forms.JSONField(required=False)
+
+    def clean_unavailable_dates(self):
+        iso_dates = self.cleaned_data['unavailable_dates'] or []
+
+        try:
+            return {datetime.date.fromisoformat(iso_date) for iso_date in iso_dates}
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Dates must be YYYY-MM-DD')
+
+
+class WorkerImportForm(forms.Form):
+    # a CSV or XLSX file of workers, see imports.py for the columns
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx', 'class': 'form-input-field'}))
+    unavailable_since = forms.DateField(
+        label="Replace unavailable dates from",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input-field'}),
+        help_text='Default: the first of this month, older dates are kept',
+    )
+    dry_run = forms.BooleanField(
+        label="Dry run",
+        required=False,
+        help_text='Check the file and report what would change without saving anything',
+    )
+
+
 class MonthForm(forms.Form):
     schedule_period = forms.DateField(
         label="Select month",
@@ -30,6 +95,136 @@ class MonthForm(forms.Form):
         input_formats=['%Y-%m'],
         help_text='Choose scheduling period'
     )
+    period_end = forms.DateField(
+        label="Until month (optional)",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'month', 'class': 'form-input-field'}),
+        input_formats=['%Y-%m'],
+        help_text='Last month of a multi-month schedule'
+    )
+
+    # optional solver settings, empty fields fall back to settings.SCHEDULER_SOLVER.
+    # Capped, a job holds a solver worker process until it is done.
+    time_limit = forms.FloatField(
+        label="Seconds per objective",
+        required=False,
+        min_value=0.1,
+        max_value=getattr(settings, 'SCHEDULER_MAX_TIME_LIMIT', 60),
+        widget=forms.NumberInput(attrs={'class': 'form-input-field'}),
+    )
+    num_workers = forms.IntegerField(
+        label="Solver threads",
+        required=False,
+        min_value=1,
+        max_value=getattr(settings, 'SCHEDULER_MAX_NUM_WORKERS', 8),
+        widget=forms.NumberInput(attrs={'class': 'form-input-field'}),
+    )
+    random_seed = forms.IntegerField(
+        label="Random seed",
+        required=False,
+        min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-input-field'}),
+    )
+    portfolio_size = forms.IntegerField(
+        label="Parallel seeds",
+        required=False,
+        min_value=1,
+        max_value=getattr(settings, 'SCHEDULER_MAX_PORTFOLIO_SIZE', 8),
+        widget=forms.NumberInput(attrs={'class': 'form-input-field'}),
+        help_text='Solve with this many seeds at once and keep the best schedule'
+    )
+
+    def solver_options(self):
+        names = ['time_limit', 'num_workers', 'random_seed', 'portfolio_size']
+        return {name: self.cleaned_data[name] for name in names if self.cleaned_data.get(name) is not None}
+
+    def clean_period_end(self):
+        # the form gives the first of the month, the schedule runs to its last day
+        period_end = self.cleaned_data['period_end']
+        if period_end:
+            period_end = period_end.replace(day=calendar.monthrange(period_end.year, period_end.month)[1])
+        return period_end
+
+    def clean(self):
+        cleaned_data = super().clean()
+        schedule_period = cleaned_data.get('schedule_period')
+        period_end = cleaned_data.get('period_end')
+
+        if schedule_period and period_end and period_end < schedule_period:
+            self.add_error('period_end', 'The last month must not be before the first one.')
+
+        return cleaned_data
+
+
+class ScheduleDeltaForm(forms.Form):
+    delta_type = forms.ChoiceField(
+        label="Change",
+        choices=[('unavailable', 'Worker is unavailable'), ('swap', 'Swap two workers')],
+        widget=forms.Select(attrs={'class': 'action-selection'}),
+    )
+    worker = forms.ModelChoiceField(
+        queryset=Worker.objects.all(),
+        widget=forms.Select(attrs={'class': 'action-selection'}),
+    )
+    other_worker = forms.ModelChoiceField(
+        queryset=Worker.objects.all(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'action-selection'}),
+        help_text='Only for swaps',
+    )
+    date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input-field'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        if cleaned_data.get('delta_type') == 'swap' and not cleaned_data.get('other_worker'):
+            self.add_error('other_worker', 'Choose the worker to swap with.')
+
+        return cleaned_data
+
+
+class ScheduleExportForm(forms.Form):
+    # the selected schedules, a date range, or both
+    schedules = forms.ModelMultipleChoiceField(queryset=Schedule.objects.all(), required=False)
+    start = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input-field'}),
+    )
+    end = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input-field'}),
+    )
+    export_format = forms.ChoiceField(
+        label="Format",
+        choices=[(export_format, export_format.upper()) for export_format in EXPORT_FORMATS],
+        widget=forms.Select(attrs={'class': 'action-selection'}),
+    )
+    layout = forms.ChoiceField(
+        choices=[('rows', 'One row per shift'), ('workers', 'One row per worker')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'action-selection'}),
+    )
+
+    def clean_layout(self):
+        return self.cleaned_data['layout'] or 'rows'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+
+        if not cleaned_data.get('schedules') and not (start and end):
+            raise forms.ValidationError('Select schedules or a date range to export.')
+
+        if start and end and end < start:
+            self.add_error('end', 'The end must not be before the start.')
+
+        if cleaned_data.get('export_format') == 'pdf' and cleaned_data.get('layout') == 'workers':
+            self.add_error('layout', 'The PDF export has one row per shift.')
+
+        return cleaned_data
 
 
 class StyledAuthenticationForm(AuthenticationForm):
@@ -0,0 +1,162 @@
+import datetime
+from .create_schedule import create_schedule, compute_shift_interval
+from .models import unavailability_map
+from .demand import load_demand, headcount_matrix
+
+
+# Long periods (a quarter, a year) are not solved as one model, the model would
+# grow with every day. Instead the period is cut into overlapping windows that
+# are solved one after the other:
+#
+#   window 1: |---- committed ----|-- overlap --|
+#   window 2:                     |---- committed ----|-- overlap --|
+#
+# Only the first window_days - overlap_days days of a window are committed, the
+# overlap is solved again by the next window, starting from the previous answer
+# as a hint (carry='hint') or keeping it as it is (carry='fix'). All committed
+# days are passed on as history, so fairness and shift spacing carry over from
+# one window to the next.
+
+CARRY_MODES = ['hint', 'fix']
+
+
+def create_horizon_schedule(period_start, period_end, employees, window_days=35, overlap_days=7, carry='hint', hint=None, **solve_options):
+    """
+    Returns the same (per_day_schedule, per_employee_schedule, schedule_stats)
+    triple as create_schedule for the days from period_start to period_end,
+    or None if one of the windows could not be solved.
+    hint and solve_options are passed on to create_schedule, the overlap of the
+    previous window takes precedence over hint.
+    """
+    hint = hint or {}
+
+    if carry not in CARRY_MODES:
+        raise ValueError(f'unknown carry mode: {carry}')
+
+    if not 0 <= overlap_days < window_days:
+        raise ValueError('overlap_days must be smaller than window_days')
+
+    employees = list(employees)
+    horizon_days = (period_end - period_start).days + 1
+
+    if horizon_days <= window_days:
+        return create_schedule(period_start, employees, period_end=period_end, hint=hint, **solve_options)
+
+    # one query for the whole horizon instead of one per window
+    if solve_options.get('unavailable') is None:
+        solve_options['unavailable'] = unavailability_map([e.id for e in employees], period_start, period_end)
+    if solve_options.get('demand') is None:
+        solve_options['demand'] = load_demand(period_start, period_end)
+
+    # one interval for the whole horizon, so all windows space shifts the same way
+    horizon_dates = [period_start + datetime.timedelta(days=day) for day in range(horizon_days)]
+    total_shifts = int(headcount_matrix(solve_options['demand'], horizon_dates).sum())
+    shift_interval = compute_shift_interval(horizon_days, len(employees), total_shifts)
+    step = datetime.timedelta(days=window_days - overlap_days)
+
+    committed = {} # iso date -> set of employee ids, the history of the next window
+    carried = {}   # the previous window's solution for the overlap days
+    per_day_schedule = []
+    windows = []
+
+    window_start = period_start
+    while window_start <= period_end:
+        window_end = min(window_start + datetime.timedelta(days=window_days - 1), period_end)
+
+        result = create_schedule(
+            window_start,
+            employees,
+            period_end=window_end,
+            history=committed,
+            hint={**hint, **carried} if carry == 'hint' else hint,
+            fixed=carried if carry == 'fix' else None,
+            shift_interval=shift_interval,
+            **solve_options,
+        )
+
+        if result is None:
+            return None
+
+        window_per_day, _, window_stats = result
+        commit_end = window_end if window_end == period_end else window_start + step - datetime.timedelta(days=1)
+        carried = {}
+
+        for day_data in window_per_day:
+            employee_ids = {employee['id'] for employee in day_data['daily_employees']}
+
+            if day_data['iso_date'] <= commit_end.isoformat():
+                committed[day_data['iso_date']] = employee_ids
+                per_day_schedule.append(day_data)
+            else:
+                carried[day_data['iso_date']] = employee_ids
+
+        windows.append({
+            'start': window_start.isoformat(),
+            'end': window_end.isoformat(),
+            'build_time': window_stats['build_time'],
+            'model_size': window_stats['model_size'],
+            'stage_times': window_stats['stage_times'],
+            'solver_params': window_stats['solver_params'],
+        })
+
+        if window_end == period_end:
+            break
+
+        window_start += step
+
+    per_employee_schedule, schedule_stats = summarize_schedule(employees, per_day_schedule, shift_interval)
+    schedule_stats['objective_mode'] = solve_options.get('objective_mode', 'sequential')
+    schedule_stats['interval_encoding'] = solve_options.get('interval_encoding', 'implication')
+    schedule_stats['solver_params'] = windows[0]['solver_params']
+    schedule_stats['windows'] = windows
+    schedule_stats['build_time'] = sum(window['build_time'] for window in windows)
+    # the largest window, the windows are solved one after the other
+    schedule_stats['model_size'] = max((window['model_size'] for window in windows), key=lambda size: size['variables'])
+    schedule_stats['stage_times'] = [stage for window in windows for stage in window['stage_times']]
+
+    return per_day_schedule, per_employee_schedule, schedule_stats
+
+
+def summarize_schedule(employees, per_day_schedule, shift_interval):
+    """
+    Builds the per employee view and the create_schedule stats of an already
+    assigned per day schedule.
+    """
+    employee_days = {e.id: [] for e in employees}
+    employee_day_numbers = {e.id: set() for e in employees}
+    weekend_counts = {e.id: 0 for e in employees}
+
+    for day, day_data in enumerate(per_day_schedule, start=1):
+        is_weekend = datetime.date.fromisoformat(day_data['iso_date']).weekday() >= 5
+
+        for employee in day_data['daily_employees']:
+            employee_days[employee['id']].append(day_data['iso_date'])
+            employee_day_numbers[employee['id']].add(day)
+            weekend_counts[employee['id']] += is_weekend
+
+    shift_counts = {e_id: len(days) for e_id, days in employee_days.items()}
+    max_shifts = max(shift_counts.values())
+    max_wknd_shifts = max(weekend_counts.values())
+
+    interval_violations = []
+    if shift_interval >= 2:
+        for e in employees:
+            for interval_start in range(1, len(per_day_schedule) - shift_interval + 2):
+                interval_end = interval_start + shift_interval - 1
+                worked = sum(1 for day in range(interval_start, interval_end + 1) if day in employee_day_numbers[e.id])
+
+                if worked >= 2:
+                    interval_violations.append(f'interval_violation_for_{e.id}_from_{interval_start}_to_{interval_end}')
+
+    per_employee_schedule = [{'id': e.id, 'name': str(e), 'days': employee_days[e.id]} for e in employees]
+
+    schedule_stats = {
+        'max_shifts_min_shifts': max_shifts - min(shift_counts.values()),
+        'max_wknd_shifts_min_wknd_shifts': max_wknd_shifts - min(weekend_counts.values()),
+        'interval_violations': interval_violations,
+        'shift_violations': [f'max_shifts_violation_for_{e.id}' for e in employees if e.assign_least_shifts and shift_counts[e.id] == max_shifts],
+        'wknd_shift_violations': [f'max_wknd_shifts_violation_for_{e.id}' for e in employees if e.assign_least_weekends and weekend_counts[e.id] == max_wknd_shifts],
+        'theoretical_intervals': shift_interval,
+    }
+
+    return per_employee_schedule, schedule_stats
@@ -0,0 +1,281 @@
+import csv
+import datetime
+import io
+import itertools
+import re
+import zipfile
+
+try:
+    import openpyxl
+except ImportError: # optional, only the XLSX import needs it
+    openpyxl = None
+
+from django.db import transaction
+from .models import Worker, Unavailability
+from .forms import WorkerApiForm
+from .jobs import invalidate_cached_schedules
+
+
+# Creates and updates many workers at once, from the API's bulk endpoint or
+# from a CSV/XLSX file (one worker per row):
+#
+#   file (read row by row) -> chunks of CHUNK_SIZE rows -> WorkerApiForm ->
+#   bulk_create / bulk_update
+#
+# A file is imported in one transaction. After the first invalid row the
+# remaining chunks are only validated, so the report lists every error, and
+# the transaction is rolled back. A dry run does all the writes and rolls
+# them back too, its report counts what an import would do.
+#
+# Columns: first_name and last_name are required. external_id (the key rows
+# are matched on, see Worker.external_id) or id, assign_least_shifts and
+# assign_least_weekends (1/0, yes/no, true/false, x) and unavailable_dates
+# (dates separated by commas or spaces) are optional. Without an
+# unavailable_dates column the workers' dates are left as they are.
+
+WORKER_FIELDS = ['first_name', 'last_name', 'assign_least_shifts', 'assign_least_weekends']
+
+IMPORT_FORMATS = ['csv', 'xlsx']
+IMPORT_COLUMNS = ['id', 'external_id', 'first_name', 'last_name', 'assign_least_shifts', 'assign_least_weekends', 'unavailable_dates']
+REQUIRED_COLUMNS = ['first_name', 'last_name']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x'}
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+
+def match_workers(rows):
+    """
+    The Worker of every row (cleaned WorkerApiForm data) with its fields set:
+    the one with the row's external_id, or its id when it has none, or a new
+    one. Returns (workers, indexes of rows whose id doesn't exist).
+    """
+    external_ids = [row['external_id'] for row in rows if row['external_id']]
+    by_external_id = Worker.objects.in_bulk(external_ids, field_name='external_id')
+    by_id = Worker.objects.in_bulk([row['id'] for row in rows if row['id'] and not row['external_id']])
+
+    workers = []
+    missing = []
+    for index, row in enumerate(rows):
+        if row['external_id']:
+            worker = by_external_id.get(row['external_id']) or Worker(external_id=row['external_id'])
+        elif row['id']:
+            if row['id'] not in by_id:
+                missing.append(index)
+                continue
+            worker = by_id[row['id']]
+        else:
+            worker = Worker()
+
+        for field in WORKER_FIELDS:
+            setattr(worker, field, row[field])
+        workers.append(worker)
+
+    return workers, missing
+
+
+def save_workers(workers, rows, since):
+    """
+    Writes the workers of match_workers in a constant number of queries and
+    replaces their unavailable dates from since on, except for rows whose
+    unavailable_dates are None. Returns (created, updated, new unavailable
+    dates), dates the workers already had are not counted.
+    Call it inside a transaction.
+    """
+    new_workers = [worker for worker in workers if worker.pk is None]
+    changed_workers = [worker for worker in workers if worker.pk is not None]
+
+    Worker.objects.bulk_create(new_workers, batch_size=500)
+    Worker.objects.bulk_update(changed_workers, WORKER_FIELDS, batch_size=500)
+
+    dated = [(worker, row['unavailable_dates']) for worker, row in zip(workers, rows) if row['unavailable_dates'] is not None]
+    wanted = {(worker.pk, d) for worker, dates in dated for d in dates if d >= since}
+    existing = {
+        (worker_id, d): pk
+        for pk, worker_id, d in Unavailability.objects.filter(worker__in=[worker for worker, _ in dated], date__gte=since).values_list('pk', 'worker_id', 'date')
+    }
+
+    # only the dates that changed are written
+    Unavailability.objects.filter(pk__in=[pk for pair, pk in existing.items() if pair not in wanted]).delete()
+    new_dates = [pair for pair in wanted if pair not in existing]
+    Unavailability.objects.bulk_create(
+        [Unavailability(worker_id=worker_id, date=d) for worker_id, d in new_dates],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    return len(new_workers), len(changed_workers), len(new_dates)
+
+
+def import_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f'Unknown file type .{extension}, expected one of {", ".join(IMPORT_FORMATS)}.')
+    return extension
+
+
+def column_name(value):
+    # 'Assign least shifts' -> 'assign_least_shifts'
+    return re.sub(r'\W+', '_', str(value or '').strip().lower()).strip('_')
+
+
+def csv_table(file):
+    # a binary file -> rows of strings, the delimiter (';' as in the exports,
+    # ',' or tab) taken from the header line
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    header_line = text.readline()
+    delimiter = max([';', ',', '\t'], key=header_line.count)
+    return csv.reader(itertools.chain([header_line], text), delimiter=delimiter)
+
+
+def xlsx_table(file):
+    # the first sheet's rows, read_only streams them from the file
+    if openpyxl is None:
+        raise ValueError('The XLSX import needs the openpyxl package.')
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError):
+        raise ValueError('The file is not an XLSX workbook.')
+    return workbook.worksheets[0].iter_rows(values_only=True)
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def cell_bool(value):
+    if isinstance(value, bool):
+        return value
+    return cell_text(value).lower() in TRUE_VALUES
+
+
+def cell_dates(value):
+    if isinstance(value, datetime.datetime):
+        return [value.date().isoformat()]
+    if isinstance(value, datetime.date):
+        return [value.isoformat()]
+    return [iso_date for iso_date in re.split(r'[\s,;]+', cell_text(value)) if iso_date]
+
+
+def worker_items(table):
+    """
+    Returns (columns, items): the known columns of the table's header and a
+    generator of (line number, WorkerApiForm data) for the rows after it,
+    empty rows skipped.
+    """
+    header = [column_name(value) for value in next(iter(table), [])]
+    columns = [column for column in IMPORT_COLUMNS if column in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f'The file has no {", ".join(missing)} column.')
+
+    positions = {column: header.index(column) for column in columns}
+
+    def items():
+        for line, values in enumerate(table, start=2):
+            values = list(values)
+            if not any(cell_text(value) for value in values):
+                continue
+            values += [None] * (len(header) - len(values))
+            row = {column: values[position] for column, position in positions.items()}
+
+            item = {column: cell_text(row.get(column)) for column in ['id', 'external_id', 'first_name', 'last_name']}
+            item['assign_least_shifts'] = cell_bool(row.get('assign_least_shifts'))
+            item['assign_least_weekends'] = cell_bool(row.get('assign_least_weekends'))
+            if 'unavailable_dates' in row:
+                item['unavailable_dates'] = cell_dates(row['unavailable_dates'])
+            yield line, item
+
+    return columns, items()
+
+
+def add_error(report, line, errors):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line, 'errors': errors})
+
+
+def import_workers(items, since, dry_run=False):
+    """
+    Validates and saves (line, WorkerApiForm data) items chunk by chunk in one
+    transaction, see the note at the top. Returns the report:
+
+        {'rows': n, 'created': n, 'updated': n, 'unavailable_dates': n (new ones),
+         'errors': [{'line': n, 'errors': {field: [messages]}}, ...],
+         'error_count': n, 'dry_run': bool, 'saved': bool}
+
+    import_workers_file adds the recognized 'columns'. errors holds the first MAX_REPORTED_ERRORS, error_count all of them.
+    """
+    report = {'rows': 0, 'created': 0, 'updated': 0, 'unavailable_dates': 0, 'errors': [], 'error_count': 0, 'dry_run': dry_run, 'saved': False}
+    # keys seen in earlier chunks, a second row for the same worker would
+    # silently overwrite the first one
+    seen = set()
+
+    with transaction.atomic():
+        while chunk := list(itertools.islice(items, CHUNK_SIZE)):
+            report['rows'] += len(chunk)
+            lines = []
+            rows = []
+
+            for line, item in chunk:
+                form = WorkerApiForm(item)
+                if not form.is_valid():
+                    add_error(report, line, {field: list(messages) for field, messages in form.errors.items()})
+                    continue
+
+                row = form.cleaned_data
+                key = ('external_id', row['external_id']) if row['external_id'] else ('id', row['id']) if row['id'] else None
+                if key in seen:
+                    add_error(report, line, {key[0]: [f'A previous row has the same {key[0]}.']})
+                    continue
+                if key is not None:
+                    seen.add(key)
+
+                if 'unavailable_dates' not in item:
+                    row['unavailable_dates'] = None
+                lines.append(line)
+                rows.append(row)
+
+            workers, missing = match_workers(rows)
+            for index in missing:
+                add_error(report, lines[index], {'id': ['No such worker.']})
+
+            # once a row failed nothing will be saved, the rest is only validated
+            if report['error_count']:
+                continue
+
+            created, updated, dates = save_workers(workers, rows, since)
+            report['created'] += created
+            report['updated'] += updated
+            report['unavailable_dates'] += dates
+
+        if report['error_count'] or dry_run:
+            transaction.set_rollback(True)
+        else:
+            # bulk writes don't send the signals that usually do this
+            invalidate_cached_schedules()
+            report['saved'] = True
+
+    return report
+
+
+def import_workers_file(file, file_format, since=None, dry_run=False):
+    """
+    Imports the workers of a binary CSV or XLSX file. Raises ValueError when
+    the file can't be read as a table of workers at all.
+    """
+    since = since or datetime.date.today().replace(day=1)
+
+    try:
+        table = xlsx_table(file) if file_format == 'xlsx' else csv_table(file)
+        columns, items = worker_items(table)
+        report = import_workers(items, since, dry_run)
+    except UnicodeDecodeError:
+        raise ValueError('The CSV file must be UTF-8 encoded.')
+
+    report['columns'] = columns
+    return report
@@ -0,0 +1,161 @@
+import datetime
+from django.db import transaction
+from .models import Worker, Schedule, Unavailability, unavailability_map, assignment_day_map, schedule_roster
+from .create_schedule import create_schedule, compute_shift_interval
+from .teams import summarize_teams, team_interval
+from .diagnosis import coverage_conflicts
+from .demand import load_demand
+from .metrics import solve_metrics
+
+
+# Small edits to a stored schedule (a sick call, two workers trading a shift)
+# don't need the whole period solved again. Only the days around the change
+# are re-optimized, every other day of the schedule is passed to the solver as
+# history, so it still counts towards fairness and shift spacing but adds no
+# variables to the model.
+
+DELTA_TYPES = ['unavailable', 'swap']
+
+
+def resolve_schedule_delta(schedule, delta_type, worker, date, other_worker=None, radius=3, **solve_options):
+    """
+    Applies a change to schedule and stores the result as a new version of it.
+
+    delta_type 'unavailable' -- worker can't work on date, their shift there is
+                                given to someone else. The date is saved as
+                                one of the worker's unavailable dates.
+    delta_type 'swap'        -- worker and other_worker exchange their
+                                assignments on date.
+
+    The days within radius of date are re-solved, changing as few of the
+    existing assignments as possible.
+    Raises ValueError for a change that can't be applied, returns None if the
+    solver failed and the new Schedule otherwise.
+    """
+    if delta_type not in DELTA_TYPES:
+        raise ValueError(f'unknown change: {delta_type}')
+
+    day_map = assignment_day_map(schedule.id)
+    period_start = schedule.schedule_period
+    period_end = schedule.last_day()
+    iso_date = date.isoformat()
+
+    if not period_start <= date <= period_end:
+        raise ValueError(f'{iso_date} is not part of this schedule')
+
+    # the roster also lists the workers without shifts
+    employee_ids = [employee['id'] for employee in schedule.roster] or sorted({e_id for ids in day_map.values() for e_id in ids})
+    workers_by_id = Worker.objects.in_bulk(employee_ids)
+
+    if len(workers_by_id) != len(employee_ids):
+        raise ValueError('some workers of this schedule were deleted, create a new schedule instead')
+
+    # e.g. hired after the schedule was made, the solver would only fail on them
+    for w in [worker, other_worker]:
+        if w is not None and w.id not in workers_by_id:
+            raise ValueError(f'{w} is not part of this schedule')
+
+    all_employees = [workers_by_id[e_id] for e_id in employee_ids]
+
+    # teams are independent (see teams.py), only the worker's team is re-solved
+    if other_worker is not None and other_worker.team_id != worker.team_id:
+        raise ValueError(f'{worker} and {other_worker} are in different teams')
+    employees = [e for e in all_employees if e.team_id == worker.team_id]
+    team_ids = {e.id for e in employees}
+
+    working = day_map.get(iso_date, set())
+    fixed = {}
+
+    window_start = max(period_start, date - datetime.timedelta(days=radius))
+    window_end = min(period_end, date + datetime.timedelta(days=radius))
+    unavailable = unavailability_map(list(team_ids), window_start, window_end)
+    demand = load_demand(window_start, window_end, worker.team_id)
+
+    if delta_type == 'unavailable':
+        if worker.id not in working:
+            raise ValueError(f'{worker} does not work on {iso_date}')
+
+        # saved with the new schedule below, so later solves of the period
+        # don't put the worker back on this day
+        unavailable.setdefault(worker.id, []).append(iso_date)
+
+        conflicts = coverage_conflicts(employees, [iso_date], unavailable, demand)
+        if conflicts:
+            raise ValueError(conflicts[0]['msg'])
+
+    else:
+        if other_worker is None or (worker.id in working) == (other_worker.id in working):
+            raise ValueError(f'exactly one of the two workers must work on {iso_date}')
+
+        incoming = other_worker if worker.id in working else worker
+        if not incoming.is_available_on(date):
+            raise ValueError(f'{incoming} is not available on {iso_date}')
+
+        fixed[iso_date] = (working & team_ids) ^ {worker.id, other_worker.id}
+
+    shift_interval = team_interval(schedule.schedule_stats, worker.team)
+    if shift_interval is None:
+        total_shifts = schedule.assignments.filter(worker_id__in=team_ids).count()
+        shift_interval = compute_shift_interval((period_end - period_start).days + 1, len(employees), total_shifts)
+
+    history = {d: ids for d, ids in day_map.items() if not window_start.isoformat() <= d <= window_end.isoformat()}
+
+    result = create_schedule(
+        window_start,
+        employees,
+        period_end=window_end,
+        history=history,
+        hint=day_map,
+        fixed=fixed,
+        shift_interval=shift_interval,
+        minimal_changes=True,
+        unavailable=unavailable,
+        demand=demand,
+        **solve_options,
+    )
+
+    if result is None:
+        return None
+
+    window_per_day, _, window_stats = result
+    window_days = {day_data['iso_date']: day_data for day_data in window_per_day}
+    # the other teams keep their assignments on the re-solved days
+    per_day_schedule = [
+        {
+            **day_data,
+            'daily_employees': [employee for employee in day_data['daily_employees'] if employee['id'] not in team_ids] + window_days[day_data['iso_date']]['daily_employees'],
+        }
+        if day_data['iso_date'] in window_days else day_data
+        for day_data in schedule.per_day()
+    ]
+
+    per_employee_schedule, schedule_stats = summarize_teams(all_employees, per_day_schedule, schedule.schedule_stats, shift_interval)
+    schedule_stats['changes'] = window_stats.get('changes', 0)
+    schedule_stats['build_time'] = window_stats['build_time']
+    schedule_stats['model_size'] = window_stats['model_size']
+    schedule_stats['stage_times'] = window_stats['stage_times']
+    schedule_stats['delta'] = {
+        'type': delta_type,
+        'date': iso_date,
+        'worker': worker.id,
+        'other_worker': other_worker.id if other_worker else None,
+        'window': [window_start.isoformat(), window_end.isoformat()],
+    }
+
+    with transaction.atomic():
+        new_schedule = Schedule.objects.create(
+            schedule_period=schedule.schedule_period,
+            period_end=schedule.period_end,
+            per_day_schedule=per_day_schedule,
+            per_employee_schedule=per_employee_schedule,
+            roster=schedule_roster(per_employee_schedule),
+            schedule_stats=schedule_stats,
+            parent=schedule,
+            **solve_metrics(schedule_stats),
+        )
+        new_schedule.set_assignments(per_day_schedule)
+
+        if delta_type == 'unavailable':
+            Unavailability.objects.get_or_create(worker=worker, date=date)
+
+    return new_schedule
@@ -0,0 +1,424 @@
+import datetime
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.urls import reverse
+from .models import Worker, Schedule, SolveJob, unavailability_map, assignment_day_map, schedule_roster
+from .create_schedule import month_end
+from .portfolio import seed_portfolio
+from .data_checks import data_checks
+from .teams import solve_teams, team_conflicts, team_groups, team_demands
+from .metrics import solve_metrics
+
+
+# Schedule generation runs outside of the HTTP request. The view only stores a
+# SolveJob row (status 'queued') and redirects to a status page, the
+# `run_solver_worker` management command picks queued jobs up and solves them in
+# a local process pool.
+#
+# While a job runs, its process writes a heartbeat to the row. A worker that is
+# killed or crashes stops writing it, and recover_stale_jobs fails its running
+# jobs once the heartbeat is older than SCHEDULER_JOB_STALE_AFTER seconds.
+
+# solver_params a job may override
+JOB_SOLVER_PARAMS = ['time_limit', 'num_workers', 'random_seed']
+
+
+def enqueue_schedule_job(schedule_period, period_end=None, base_schedule=None, minimal_changes=False, solver_options=None, input_fingerprint=''):
+    return SolveJob.objects.create(
+        schedule_period=schedule_period,
+        period_end=period_end,
+        base_schedule=base_schedule,
+        minimal_changes=minimal_changes,
+        solver_options=solver_options or {},
+        input_fingerprint=input_fingerprint,
+    )
+
+
+def schedule_fingerprint(schedule_period, period_end, employees, solver_options=None, base_schedule_id=None, minimal_changes=False,
+                         unavailable=None, demands=None):
+    """
+    A hash of everything a solve depends on: the period, the workers with their
+    names, teams, flags and unavailable dates inside the period, the staffing demand of every team,
+    the base schedule and the solver configuration. Two requests with the same fingerprint get
+    the same schedule, so the second one can reuse the first one's result.
+
+    unavailable and demands (see team_demands) are read from the database
+    unless they are given, a job passes the ones it solves with.
+    """
+    period_end = period_end or month_end(schedule_period)
+    start, end = schedule_period.isoformat(), period_end.isoformat()
+
+    employees = sorted(employees, key=lambda e: e.id)
+    if unavailable is None:
+        unavailable = unavailability_map([e.id for e in employees], schedule_period, period_end)
+    if demands is None:
+        demands = team_demands(team_groups(employees), schedule_period, period_end)
+
+    workers = [
+        [
+            e.id,
+            e.team_id,
+            str(e),
+            sorted(unavailable.get(e.id, [])),
+            e.assign_least_shifts,
+            e.assign_least_weekends,
+        ]
+        for e in employees
+    ]
+
+    solve_options = get_solve_options()
+    payload = {
+        'period': [start, end],
+        'workers': workers,
+        'demand': demands,
+        'base_schedule': [base_schedule_id, minimal_changes],
+        'objective_mode': solve_options['objective_mode'],
+        'interval_encoding': solve_options['interval_encoding'],
+        'symmetry_breaking': solve_options['symmetry_breaking'],
+        'portfolio': get_portfolio(solve_options['solver_params'], solver_options or {}),
+        'horizon': [
+            getattr(settings, 'SCHEDULER_HORIZON_WINDOW_DAYS', 35),
+            getattr(settings, 'SCHEDULER_HORIZON_OVERLAP_DAYS', 7),
+        ],
+    }
+
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def get_or_enqueue_schedule_job(schedule_period, period_end=None, base_schedule=None, minimal_changes=False, solver_options=None):
+    """
+    Returns (schedule, None) if a stored schedule was solved from exactly the
+    same input, otherwise (None, job) with a job that is already queued or
+    running for the same input, or a new one.
+    """
+    if not getattr(settings, 'SCHEDULER_CACHE_RESULTS', True):
+        return None, enqueue_schedule_job(schedule_period, period_end, base_schedule, minimal_changes, solver_options)
+
+    fingerprint = schedule_fingerprint(
+        schedule_period,
+        period_end,
+        Worker.objects.all(),
+        solver_options,
+        base_schedule.pk if base_schedule else None,
+        minimal_changes,
+    )
+
+    schedule = Schedule.objects.filter(input_fingerprint=fingerprint).only('pk').order_by('-pk').first()
+    if schedule is not None:
+        return schedule, None
+
+    # a job of a dead worker would never finish, don't attach anyone to it
+    recover_stale_jobs()
+
+    job = SolveJob.objects.filter(
+        input_fingerprint=fingerprint,
+        status__in=[SolveJob.QUEUED, SolveJob.RUNNING],
+        stop_requested=False,
+    ).first()
+
+    if job is None:
+        job = enqueue_schedule_job(schedule_period, period_end, base_schedule, minimal_changes, solver_options, fingerprint)
+
+    return None, job
+
+
+def invalidate_cached_schedules():
+    # called when workers change, stored results no longer match any new request
+    Schedule.objects.exclude(input_fingerprint='').update(input_fingerprint='')
+
+
+def get_solve_options():
+    # the create_schedule options configured in the Django settings
+    return {
+        'objective_mode': getattr(settings, 'SCHEDULER_OBJECTIVE_MODE', 'sequential'),
+        'interval_encoding': getattr(settings, 'SCHEDULER_INTERVAL_ENCODING', 'implication'),
+        'symmetry_breaking': getattr(settings, 'SCHEDULER_SYMMETRY_BREAKING', True),
+        'solver_params': dict(getattr(settings, 'SCHEDULER_SOLVER', {})),
+    }
+
+
+def get_portfolio(solver_params, solver_options):
+    """
+    Returns the list of solver_params to run for a job. A portfolio_size in the
+    job's solver_options runs that many seeds, otherwise
+    settings.SCHEDULER_SOLVER_PORTFOLIO (a list of parameter overrides) is
+    used, and without either there is a single run.
+    """
+    solver_params = {
+        **solver_params,
+        **{name: solver_options[name] for name in JOB_SOLVER_PARAMS if solver_options.get(name) is not None},
+    }
+
+    if solver_options.get('portfolio_size'):
+        return seed_portfolio(solver_params, solver_options['portfolio_size'])
+
+    configured = getattr(settings, 'SCHEDULER_SOLVER_PORTFOLIO', [])
+    if configured:
+        return [{**solver_params, **overrides} for overrides in configured]
+
+    return [solver_params]
+
+
+def stale_jobs():
+    # running jobs whose heartbeat stopped, jobs claimed before the heartbeat
+    # was recorded go by their start time
+    cutoff = timezone.now() - datetime.timedelta(seconds=getattr(settings, 'SCHEDULER_JOB_STALE_AFTER', 120))
+    return SolveJob.objects.filter(status=SolveJob.RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+
+def recover_stale_jobs():
+    """
+    Fails the running jobs whose worker died and returns how many there were.
+    They are not queued again: a job that crashed its worker, e.g. by running
+    out of memory, would most likely crash the next one as well.
+    """
+    return stale_jobs().update(
+        status=SolveJob.FAILED,
+        error_msg='The solver worker stopped while running this job.',
+        finished_at=timezone.now(),
+    )
+
+
+def claim_next_job():
+    """
+    Atomically moves the oldest queued job to 'running' and returns it,
+    or None if the queue is empty. Several worker commands may poll the same
+    table, the conditional update makes sure only one of them gets the job.
+    """
+    for job in SolveJob.objects.filter(status=SolveJob.QUEUED).order_by('created_at')[:10]:
+        now = timezone.now()
+        claimed = SolveJob.objects.filter(pk=job.pk, status=SolveJob.QUEUED).update(
+            status=SolveJob.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+        )
+
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+def release_job(job_id):
+    # puts a claimed job that never reached a solver process back in the queue
+    SolveJob.objects.filter(pk=job_id, status=SolveJob.RUNNING).update(
+        status=SolveJob.QUEUED,
+        started_at=None,
+        heartbeat_at=None,
+    )
+
+
+class JobProgress:
+    """
+    The create_schedule progress callable of a job. Solutions come in much
+    faster than anyone can watch them, so the job row is written at most every
+    `interval` seconds. stop_requested is the job's should_stop, the solver
+    polls it on its own schedule, with or without new solutions.
+    """
+
+    def __init__(self, job_id, interval=0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.last_update = 0
+        self.stop = False
+
+    def __call__(self, event):
+        now = time.monotonic()
+
+        if now - self.last_update >= self.interval:
+            self.last_update = now
+            SolveJob.objects.filter(pk=self.job_id).update(progress=event)
+            self.close_connection()
+
+        return self.stop
+
+    def stop_requested(self):
+        if not self.stop:
+            self.stop = SolveJob.objects.filter(pk=self.job_id, stop_requested=True).exists()
+            self.close_connection()
+        return self.stop
+
+    def close_connection(self):
+        # solution callbacks and the stop watcher run in threads of their own,
+        # don't leave a connection open in each of them
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+class JobHeartbeat:
+    """
+    Writes the job's heartbeat_at every `interval` seconds from a thread of its
+    own, for as long as the with block runs. The solver releases the GIL, so
+    the thread keeps beating during long solves.
+    """
+
+    def __init__(self, job_id, interval):
+        self.job_id = job_id
+        self.interval = interval
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            SolveJob.objects.filter(pk=self.job_id).update(heartbeat_at=timezone.now())
+        connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.thread.join()
+
+
+def request_stop(job):
+    SolveJob.objects.filter(pk=job.pk).update(stop_requested=True)
+
+
+def finish_job(job_id, status, schedule=None, error_msg='', diagnosis=None):
+    SolveJob.objects.filter(pk=job_id).update(
+        status=status,
+        schedule=schedule,
+        error_msg=error_msg[:255],
+        diagnosis=diagnosis or [],
+        finished_at=timezone.now(),
+    )
+
+
+def execute_job(job_id):
+    """
+    Runs a claimed job to completion. Called inside a pool process, so it
+    only receives the job id and loads everything else from the DB.
+    """
+    close_old_connections()
+
+    with JobHeartbeat(job_id, getattr(settings, 'SCHEDULER_JOB_HEARTBEAT_INTERVAL', 10)):
+        solve_job(job_id)
+
+
+def solve_job(job_id):
+    job = SolveJob.objects.get(pk=job_id)
+    period_end = job.period_end or month_end(job.schedule_period)
+    employees = Worker.objects.all()
+
+    # the checks already ran when the job was created, but workers may have
+    # changed while the job was waiting in the queue
+    test_results = data_checks(employees, job.schedule_period, job.period_end)
+
+    if test_results['code'] != 0:
+        finish_job(job_id, SolveJob.FAILED, error_msg=test_results['msg'])
+        return
+
+    # the workers the checks ran on, from the queryset's cache
+    employees = list(employees)
+
+    # everything the solve reads from the database is loaded once, here. The
+    # fingerprint is taken from the same data, so edits made while the job
+    # runs can't end up in the fingerprint of a schedule solved without them.
+    unavailable = unavailability_map([e.id for e in employees], job.schedule_period, period_end)
+    demands = team_demands(team_groups(employees), job.schedule_period, period_end)
+
+    input_fingerprint = ''
+    if job.input_fingerprint:
+        input_fingerprint = schedule_fingerprint(
+            job.schedule_period,
+            job.period_end,
+            employees,
+            job.solver_options,
+            job.base_schedule_id,
+            job.minimal_changes,
+            unavailable=unavailable,
+            demands=demands,
+        )
+
+    hint = None
+    if job.base_schedule_id:
+        hint = assignment_day_map(job.base_schedule_id)
+
+    solve_options = get_solve_options()
+    portfolio = get_portfolio(solve_options.pop('solver_params'), job.solver_options)
+    progress = JobProgress(job_id)
+
+    result = solve_teams(
+        job.schedule_period,
+        period_end,
+        employees,
+        portfolio,
+        demands=demands,
+        unavailable=unavailable,
+        window_days=getattr(settings, 'SCHEDULER_HORIZON_WINDOW_DAYS', 35),
+        overlap_days=getattr(settings, 'SCHEDULER_HORIZON_OVERLAP_DAYS', 7),
+        hint=hint,
+        minimal_changes=job.minimal_changes and hint is not None,
+        progress=progress,
+        should_stop=progress.stop_requested,
+        **solve_options,
+    )
+
+    if result is None and progress.stop_requested():
+        finish_job(job_id, SolveJob.FAILED, error_msg='Stopped before a schedule was found.')
+        return
+
+    if result is None:
+        # tell an impossible period apart from one that ran out of time
+        conflicts = team_conflicts(
+            job.schedule_period,
+            period_end,
+            employees,
+            time_limit=getattr(settings, 'SCHEDULER_DIAGNOSIS_TIME_LIMIT', 10),
+        )
+
+        if conflicts:
+            error_msg = f'No schedule exists for this period, {len(conflicts)} conflicting rule(s) found.'
+        else:
+            error_msg = 'Solver found no schedule within the time limit.'
+
+        finish_job(job_id, SolveJob.FAILED, error_msg=error_msg, diagnosis=conflicts)
+        return
+
+    # a stopped solve is not the answer to its input, so it isn't reused
+    if SolveJob.objects.filter(pk=job_id, stop_requested=True).exists():
+        input_fingerprint = ''
+
+    per_day_schedule, per_employee_schedule, schedule_stats = result
+    with transaction.atomic():
+        new_schedule = Schedule.objects.create(
+            schedule_period=job.schedule_period,
+            period_end=job.period_end,
+            per_day_schedule=per_day_schedule,
+            per_employee_schedule=per_employee_schedule,
+            roster=schedule_roster(per_employee_schedule),
+            schedule_stats=schedule_stats,
+            input_fingerprint=input_fingerprint,
+            **solve_metrics(schedule_stats),
+        )
+        new_schedule.set_assignments(per_day_schedule)
+
+    finish_job(job_id, SolveJob.DONE, schedule=new_schedule)
+
+
+def job_status(job):
+    data = {
+        'id': job.id,
+        'status': job.status,
+        'error_msg': job.error_msg,
+        'diagnosis': job.diagnosis,
+        'progress': job.progress,
+        'stop_requested': job.stop_requested,
+        'schedule_url': None,
+    }
+
+    if job.status == SolveJob.DONE and job.schedule_id:
+        data['schedule_url'] = reverse('display_schedule', args=[str(job.schedule_id)])
+
+    return data
@@ -0,0 +1,222 @@
+import datetime
+import itertools
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import ortools
+from django.core.management.base import BaseCommand
+
+from scheduler.create_schedule import month_end, OBJECTIVE_MODES, INTERVAL_ENCODINGS
+from scheduler.demand import DEFAULT_DEMAND
+from scheduler.horizon import create_horizon_schedule
+from scheduler.models import Worker
+from scheduler.portfolio import schedule_score
+
+
+# Synthetic rosters are built from unsaved Worker objects, an in-memory
+# unavailability map and the default demand, so a benchmark never touches the
+# database. Every roster
+# is derived from --seed and its own parameters only, the same command line
+# gives the same rosters on any commit.
+
+def make_roster(num_workers, density, least_shifts_share, least_weekends_share, period_start, period_end, seed):
+    rng = random.Random(f'{seed}-{num_workers}-{density}-{least_shifts_share}-{least_weekends_share}')
+    num_days = (period_end - period_start).days + 1
+    dates = [(period_start + datetime.timedelta(days=day)).isoformat() for day in range(num_days)]
+
+    roster = []
+    unavailable = {}
+    for i in range(1, num_workers + 1):
+        unavailable[i] = [d for d in dates if rng.random() < density]
+        roster.append(Worker(
+            id=i,
+            first_name='Worker',
+            last_name=str(i),
+            assign_least_shifts=rng.random() < least_shifts_share,
+            assign_least_weekends=rng.random() < least_weekends_share,
+        ))
+
+    return roster, unavailable
+
+
+def run_case(case, period_start, period_end, seed, solve_options):
+    """
+    Solves one synthetic roster. Runs in its own process, so the peak RSS
+    reported by the OS belongs to this case alone.
+    """
+    roster, unavailable = make_roster(
+        case['workers'],
+        case['density'],
+        case['least_shifts_share'],
+        case['least_weekends_share'],
+        period_start,
+        period_end,
+        seed,
+    )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = create_horizon_schedule(period_start, period_end, roster, unavailable=unavailable, demand=DEFAULT_DEMAND, **solve_options)
+    total_time = time.perf_counter() - start
+    python_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    record = {
+        **case,
+        'status': 'solved' if result is not None else 'failed',
+        'total_time': total_time,
+        'python_peak_kb': python_peak // 1024,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+    if result is not None:
+        schedule_stats = result[2]
+        record.update({
+            'build_time': schedule_stats['build_time'],
+            'solve_time': sum(stage['wall_time'] for stage in schedule_stats['stage_times']),
+            'deterministic_time': sum(stage['deterministic_time'] for stage in schedule_stats['stage_times']),
+            'windows': len(schedule_stats.get('windows', [])) or 1,
+            'score': schedule_score(schedule_stats),
+            'stage_times': schedule_stats['stage_times'],
+            'objectives': {
+                'max_shifts_min_shifts': schedule_stats['max_shifts_min_shifts'],
+                'max_wknd_shifts_min_wknd_shifts': schedule_stats['max_wknd_shifts_min_wknd_shifts'],
+                'shift_violations': len(schedule_stats['shift_violations']),
+                'wknd_shift_violations': len(schedule_stats['wknd_shift_violations']),
+                'interval_violations': len(schedule_stats['interval_violations']),
+            },
+        })
+
+    return record
+
+
+def weighted_options(solve_options, record):
+    # the solve options of a weighted solve with the budget record's solve
+    # used, spread over the windows of a horizon (every window is one stage)
+    solver_params = dict(solve_options['solver_params'])
+    if solver_params['deterministic_time'] is not None:
+        solver_params['deterministic_time'] = record['deterministic_time'] / record['windows']
+    else:
+        solver_params['time_limit'] = record['solve_time'] / record['windows']
+
+    return {**solve_options, 'objective_mode': 'weighted', 'solver_params': solver_params}
+
+
+def compare_scores(record, weighted):
+    # record's schedule compared to the weighted one, lower scores are better
+    if weighted['status'] != 'solved' or tuple(record['score']) < tuple(weighted['score']):
+        return 'better than'
+    if tuple(record['score']) > tuple(weighted['score']):
+        return 'worse than'
+    return 'as good as'
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks create_schedule on synthetic rosters and writes the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', default='2026-01', help='First month to schedule, YYYY-MM.')
+        parser.add_argument('--months', type=int, default=1, help='Number of months to schedule.')
+        parser.add_argument('--workers', type=int, nargs='+', default=[5, 10, 20, 50, 100, 200, 500])
+        parser.add_argument('--densities', type=float, nargs='+', default=[0.0, 0.1, 0.3],
+                            help='Share of days each worker is unavailable.')
+        parser.add_argument('--least-shifts', type=float, nargs='+', default=[0.0, 0.2],
+                            help='Share of workers with assign_least_shifts.')
+        parser.add_argument('--least-weekends', type=float, nargs='+', default=[0.0, 0.2],
+                            help='Share of workers with assign_least_weekends.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the rosters and the solver.')
+        parser.add_argument('--objective-mode', choices=OBJECTIVE_MODES, default='sequential')
+        parser.add_argument('--interval-encoding', choices=INTERVAL_ENCODINGS, default='implication')
+        parser.add_argument('--no-symmetry-breaking', dest='symmetry_breaking', action='store_false',
+                            help='Don\'t order interchangeable workers.')
+        parser.add_argument('--time-limit', type=float, default=5, help='Seconds per objective stage.')
+        parser.add_argument('--deterministic-time', type=float, default=None,
+                            help='Deterministic time limit per stage, use it instead of --time-limit for comparable objectives.')
+        parser.add_argument('--num-workers', type=int, default=8, help='CP-SAT search workers.')
+        parser.add_argument('--compare-weighted', action='store_true',
+                            help='Solve every case again in weighted mode with the time the first solve took, '
+                                 'e.g. to compare --objective-mode lns with a single solve of the same budget.')
+        parser.add_argument('--output', default='bench_output.json')
+
+    def handle(self, *args, **options):
+        period_start = datetime.datetime.strptime(options['month'], '%Y-%m').date()
+        period_end = period_start
+        for _ in range(options['months']):
+            period_end = month_end(period_end) + datetime.timedelta(days=1)
+        period_end -= datetime.timedelta(days=1)
+
+        solver_params = {
+            'num_workers': options['num_workers'],
+            'random_seed': options['seed'],
+            'time_limit': options['time_limit'] if options['deterministic_time'] is None else None,
+            'deterministic_time': options['deterministic_time'],
+        }
+        solve_options = {
+            'objective_mode': options['objective_mode'],
+            'interval_encoding': options['interval_encoding'],
+            'symmetry_breaking': options['symmetry_breaking'],
+            'solver_params': solver_params,
+        }
+
+        cases = [
+            {'workers': w, 'density': d, 'least_shifts_share': s, 'least_weekends_share': ws}
+            for w, d, s, ws in itertools.product(
+                options['workers'], options['densities'], options['least_shifts'], options['least_weekends']
+            )
+        ]
+
+        results = []
+
+        # one fresh process per case (max_tasks_per_child=1) keeps the memory
+        # numbers apart, see run_solver_worker on why it is spawned
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=django.setup, max_tasks_per_child=1) as pool:
+            for case in cases:
+                record = pool.submit(run_case, case, period_start, period_end, options['seed'], solve_options).result()
+                results.append(record)
+
+                comparison = ''
+                if options['compare_weighted'] and record['status'] == 'solved':
+                    record['weighted'] = pool.submit(
+                        run_case, case, period_start, period_end, options['seed'], weighted_options(solve_options, record),
+                    ).result()
+                    comparison = f", {compare_scores(record, record['weighted'])} weighted with the same budget"
+
+                self.stdout.write(
+                    f"{case['workers']:>4} workers, density {case['density']:.2f}, "
+                    f"least {case['least_shifts_share']:.2f}/{case['least_weekends_share']:.2f}: "
+                    f"{record['status']} in {record['total_time']:.2f}s{comparison}"
+                )
+
+        report = {
+            'meta': {
+                'git_revision': git_revision(),
+                'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'ortools': ortools.__version__,
+                'period': [period_start.isoformat(), period_end.isoformat()],
+                'seed': options['seed'],
+                'solve_options': solve_options,
+            },
+            'results': results,
+        }
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(f'Wrote {len(results)} results to {options["output"]}.')
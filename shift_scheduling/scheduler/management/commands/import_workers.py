@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.imports import import_format, import_workers_file
+
+
+class Command(BaseCommand):
+    help = 'Creates and updates workers from a CSV or XLSX file, see scheduler/imports.py for the columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv or .xlsx file, one worker per row')
+        parser.add_argument('--dry-run', action='store_true', help='report what would change without saving anything')
+        parser.add_argument(
+            '--unavailable-since',
+            type=datetime.date.fromisoformat,
+            default=None,
+            help='replace unavailable dates from this date (YYYY-MM-DD) on, default the first of this month',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_workers_file(file, import_format(options['path']), options['unavailable_since'], options['dry_run'])
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        self.stdout.write(f'columns: {", ".join(report["columns"])}')
+        for error in report['errors']:
+            messages = '; '.join(f'{field}: {" ".join(field_messages)}' for field, field_messages in error['errors'].items())
+            self.stderr.write(f'line {error["line"]}: {messages}')
+
+        if report['error_count']:
+            raise CommandError(f'{report["error_count"]} of {report["rows"]} rows have errors, nothing was saved.')
+
+        summary = f'{report["rows"]} rows: {report["created"]} created, {report["updated"]} updated, {report["unavailable_dates"]} new unavailable dates'
+        if report['dry_run']:
+            self.stdout.write(f'{summary} (dry run, nothing was saved)')
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,108 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from scheduler.jobs import claim_next_job, execute_job, finish_job, recover_stale_jobs, release_job
+from scheduler.models import SolveJob
+
+
+class Command(BaseCommand):
+    help = 'Runs queued schedule solve jobs in a local process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=getattr(settings, 'SCHEDULER_WORKER_PROCESSES', 2),
+            help='Number of solves that may run at the same time.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'SCHEDULER_WORKER_POLL_INTERVAL', 1.0),
+            help='Seconds to wait between queue polls when idle.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit as soon as the queue is empty and all running jobs finished.',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+
+        # 'spawn' gives every pool process a fresh interpreter, so no DB connection
+        # is shared with this process. django.setup is the pool initializer, which
+        # makes the scheduler models importable before the first job is unpickled.
+        context = multiprocessing.get_context('spawn')
+
+        # every job runs in a pool of one process. When a process is killed (out
+        # of memory, a crash in the solver) only its own pool breaks and only its
+        # own job fails, the next job gets a new pool.
+        running = {}
+
+        self.stdout.write(f'Solver worker started with {processes} processes.')
+
+        try:
+            while True:
+                for job_id, (pool, future) in list(running.items()):
+                    if not future.done():
+                        continue
+
+                    del running[job_id]
+                    pool.shutdown()
+                    error = future.exception()
+
+                    if isinstance(error, BrokenProcessPool):
+                        close_old_connections()
+                        finish_job(job_id, SolveJob.FAILED, error_msg='The solver process was killed, e.g. for running out of memory.')
+                        self.stderr.write(f'Job {job_id} failed: its process was killed.')
+                    elif error is not None:
+                        close_old_connections()
+                        finish_job(job_id, SolveJob.FAILED, error_msg=f'Solver crashed: {error}')
+                        self.stderr.write(f'Job {job_id} failed: {error}')
+                    else:
+                        self.stdout.write(f'Job {job_id} finished.')
+
+                # jobs of workers that were killed, including an earlier run of this one
+                close_old_connections()
+                recovered = recover_stale_jobs()
+                if recovered:
+                    self.stderr.write(f'{recovered} job(s) of a stopped worker failed.')
+
+                claimed = False
+                while len(running) < processes:
+                    close_old_connections()
+                    job = claim_next_job()
+
+                    if job is None:
+                        break
+
+                    pool = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=django.setup)
+                    try:
+                        future = pool.submit(execute_job, job.pk)
+                    except Exception as error:
+                        # the process couldn't be started, the job is tried again on the next poll
+                        pool.shutdown(wait=False)
+                        release_job(job.pk)
+                        self.stderr.write(f'Job {job.pk} could not be started: {error}')
+                        break
+
+                    claimed = True
+                    running[job.pk] = (pool, future)
+                    self.stdout.write(f'Job {job.pk} started ({job.schedule_period.strftime("%B %Y")}).')
+
+                if options['once'] and not running and not claimed:
+                    break
+
+                time.sleep(poll_interval)
+        finally:
+            for pool, _ in running.values():
+                pool.shutdown()
@@ -0,0 +1,145 @@
+import logging
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from .models import Schedule, SolveJob
+
+
+# What a solve cost, so slow months and rosters can be found:
+#
+#   create_schedule -> schedule_stats (model size, build time, every stage's
+#   status, wall time, gap, branches and conflicts) -> the metric columns of
+#   Schedule (solve_metrics) -> prometheus_text
+#
+# Every model solve is also logged to the 'scheduler.solver' logger, failed
+# ones included, with the numbers in the record's solve_metrics attribute for
+# handlers that ship structured logs.
+
+logger = logging.getLogger('scheduler.solver')
+# silent unless the deployment's LOGGING configures it, see settings.py
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_BUCKETS = [1, 5, 10, 30, 60, 120, 300, 600]
+
+
+def log_solve(period_start, period_end, num_workers, model_size, build_time, stage_times):
+    record = {
+        'period_start': period_start.isoformat(),
+        'period_end': period_end.isoformat(),
+        'workers': num_workers,
+        'variables': model_size['variables'],
+        'constraints': model_size['constraints'],
+        'build_time': build_time,
+        'solve_time': sum(stage['wall_time'] for stage in stage_times),
+        'status': solver_status(stage_times),
+        'stages': stage_times,
+    }
+
+    logger.info(
+        'solved %s..%s workers=%d variables=%d constraints=%d build=%.3fs solve=%.3fs status=%s',
+        record['period_start'], record['period_end'], num_workers, record['variables'], record['constraints'],
+        build_time, record['solve_time'], record['status'],
+        extra={'solve_metrics': record},
+    )
+
+
+def solver_status(stage_times):
+    # OPTIMAL if every stage was, otherwise the first stage that wasn't
+    return next((stage['status'] for stage in stage_times if stage['status'] != 'OPTIMAL'), 'OPTIMAL' if stage_times else '')
+
+
+def solve_metrics(schedule_stats):
+    """
+    The metric columns of Schedule from the stats of create_schedule (or of
+    a horizon or delta solve), None where the stats don't have them.
+    """
+    stages = schedule_stats.get('stage_times', [])
+    model_size = schedule_stats.get('model_size', {})
+    gaps = [stage['gap'] for stage in stages if stage.get('gap') is not None]
+
+    return {
+        'build_time': schedule_stats.get('build_time'),
+        # set when parts were solved side by side, see teams.solve_teams
+        'solve_time': schedule_stats.get('solve_time', sum(stage['wall_time'] for stage in stages) if stages else None),
+        'model_variables': model_size.get('variables'),
+        'model_constraints': model_size.get('constraints'),
+        'branches': sum(stage['branches'] for stage in stages) if stages and all('branches' in stage for stage in stages) else None,
+        'conflicts': sum(stage['conflicts'] for stage in stages) if stages and all('conflicts' in stage for stage in stages) else None,
+        'gap': max(gaps) if gaps else None,
+        'solver_status': solver_status(stages),
+    }
+
+
+def label_text(**labels):
+    if not labels:
+        return ''
+    escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for name, value in labels.items()}
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped.items()) + '}'
+
+
+def metric_lines(name, kind, help_text, samples):
+    # samples: (suffix, labels dict, value), the ones without a value are left out
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for suffix, labels, value in samples:
+        if value is not None:
+            lines.append(f'{name}{suffix}{label_text(**labels)} {value if isinstance(value, int) else repr(float(value))}')
+    return lines
+
+
+def histogram_samples(totals, prefix, buckets):
+    samples = [('_bucket', {'le': f'{bucket:g}'}, totals[f'{prefix}_le_{index}']) for index, bucket in enumerate(buckets)]
+    samples.append(('_bucket', {'le': '+Inf'}, totals[f'{prefix}_count']))
+    samples.append(('_sum', {}, totals[f'{prefix}_sum'] or 0.0))
+    samples.append(('_count', {}, totals[f'{prefix}_count']))
+    return samples
+
+
+def prometheus_text():
+    """
+    The metrics of the stored schedules and the job queue in the Prometheus
+    text format. Computed from the database on every scrape, so they are the
+    same whichever process answers and survive restarts.
+    """
+    buckets = getattr(settings, 'SCHEDULER_METRICS_BUCKETS', DEFAULT_BUCKETS)
+
+    aggregates = {
+        'schedules': Count('id'),
+        'branches': Sum('branches'),
+        'conflicts': Sum('conflicts'),
+    }
+    for field in ['solve_time', 'build_time']:
+        aggregates[f'{field}_count'] = Count('id', filter=Q(**{f'{field}__isnull': False}))
+        aggregates[f'{field}_sum'] = Sum(field)
+        for index, bucket in enumerate(buckets):
+            aggregates[f'{field}_le_{index}'] = Count('id', filter=Q(**{f'{field}__lte': bucket}))
+    totals = Schedule.objects.aggregate(**aggregates)
+
+    statuses = Schedule.objects.exclude(solver_status='').values_list('solver_status').annotate(count=Count('id')).order_by('solver_status')
+    jobs = dict(SolveJob.objects.values_list('status').annotate(count=Count('id')).order_by())
+    last = Schedule.objects.exclude(solve_time=None).order_by('-id').only(
+        'id', 'schedule_period', 'period_end', 'solve_time', 'build_time', 'model_variables', 'model_constraints', 'gap'
+    ).first()
+
+    lines = []
+    lines += metric_lines('scheduler_schedules', 'gauge', 'Stored schedules.', [('', {}, totals['schedules'])])
+    lines += metric_lines('scheduler_solve_seconds', 'histogram', 'Solver wall time of the stored schedules, all stages.', histogram_samples(totals, 'solve_time', buckets))
+    lines += metric_lines('scheduler_build_seconds', 'histogram', 'Model build time of the stored schedules.', histogram_samples(totals, 'build_time', buckets))
+    # sums over the stored schedules, they go down when schedules are deleted,
+    # so they are gauges and not counters
+    lines += metric_lines('scheduler_solver_branches', 'gauge', 'Search branches of the stored schedules.', [('', {}, totals['branches'] or 0)])
+    lines += metric_lines('scheduler_solver_conflicts', 'gauge', 'Search conflicts of the stored schedules.', [('', {}, totals['conflicts'] or 0)])
+    lines += metric_lines('scheduler_schedules_by_status', 'gauge', 'Stored schedules by solver status, OPTIMAL if every stage was proven optimal.', [
+        ('', {'status': status}, count) for status, count in statuses
+    ])
+    lines += metric_lines('scheduler_jobs', 'gauge', 'Solve jobs by status.', [
+        ('', {'status': status}, jobs.get(status, 0)) for status, _ in SolveJob.STATUS_CHOICES
+    ])
+
+    if last is not None:
+        labels = {'schedule': last.id, 'period_start': last.schedule_period.isoformat(), 'period_end': last.last_day().isoformat()}
+        lines += metric_lines('scheduler_last_solve_seconds', 'gauge', 'Solver wall time of the latest schedule.', [('', labels, last.solve_time)])
+        lines += metric_lines('scheduler_last_build_seconds', 'gauge', 'Model build time of the latest schedule.', [('', labels, last.build_time)])
+        lines += metric_lines('scheduler_last_model_variables', 'gauge', 'Variables of the latest schedule\'s model.', [('', labels, last.model_variables)])
+        lines += metric_lines('scheduler_last_model_constraints', 'gauge', 'Constraints of the latest schedule\'s model.', [('', labels, last.model_constraints)])
+        lines += metric_lines('scheduler_last_gap', 'gauge', 'Largest relative gap between solution and bound over the latest schedule\'s stages.', [('', labels, last.gap)])
+
+    return '\n'.join(lines) + '\n'
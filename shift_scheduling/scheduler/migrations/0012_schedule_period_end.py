@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0011_solvejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='period_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solvejob',
+            name='period_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0012_schedule_period_end'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solvejob',
+            name='base_schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='scheduler.schedule'),
+        ),
+        migrations.AddField(
+            model_name='solvejob',
+            name='minimal_changes',
+            field=models.BooleanField(default=False),
+        ),
+    ]
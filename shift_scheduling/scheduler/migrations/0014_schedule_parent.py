@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0013_solvejob_base_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='versions', to='scheduler.schedule'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0014_schedule_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solvejob',
+            name='solver_options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0015_solvejob_solver_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solvejob',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='solvejob',
+            name='stop_requested',
+            field=models.BooleanField(default=False),
+        ),
+    ]
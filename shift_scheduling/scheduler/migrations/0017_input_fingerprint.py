@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0016_solvejob_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='solvejob',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:06
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_unavailable_dates(apps, schema_editor):
+    Worker = apps.get_model('scheduler', 'Worker')
+    Unavailability = apps.get_model('scheduler', 'Unavailability')
+
+    rows = []
+    for worker in Worker.objects.all():
+        for iso_date in set(worker.unavailable_dates or []):
+            rows.append(Unavailability(worker=worker, date=datetime.date.fromisoformat(iso_date)))
+
+    Unavailability.objects.bulk_create(rows, batch_size=1000)
+
+
+def restore_unavailable_dates(apps, schema_editor):
+    Worker = apps.get_model('scheduler', 'Worker')
+    Unavailability = apps.get_model('scheduler', 'Unavailability')
+
+    dates = {}
+    for worker_id, date in Unavailability.objects.order_by('date').values_list('worker_id', 'date'):
+        dates.setdefault(worker_id, []).append(date.isoformat())
+
+    for worker in Worker.objects.all():
+        worker.unavailable_dates = dates.get(worker.id, [])
+        worker.save(update_fields=['unavailable_dates'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0017_input_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Unavailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unavailabilities', to='scheduler.worker')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'worker'], name='unavailability_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('worker', 'date'), name='unique_worker_unavailability')],
+            },
+        ),
+        migrations.RunPython(copy_unavailable_dates, restore_unavailable_dates),
+        migrations.RemoveField(
+            model_name='worker',
+            name='unavailable_dates',
+        ),
+    ]
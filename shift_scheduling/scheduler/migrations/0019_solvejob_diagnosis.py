@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0018_unavailability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solvejob',
+            name='diagnosis',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
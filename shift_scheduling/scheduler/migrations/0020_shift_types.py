@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0019_solvejob_diagnosis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('headcount', models.PositiveSmallIntegerField(default=2, help_text='Workers needed on weekdays')),
+                ('weekend_headcount', models.PositiveSmallIntegerField(blank=True, help_text='Workers needed on weekends, the weekday headcount if empty', null=True)),
+                ('eligible_workers', models.ManyToManyField(blank=True, related_name='shift_types', to='scheduler.worker')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StaffingDemand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('headcount', models.PositiveSmallIntegerField()),
+                ('shift_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demands', to='scheduler.shifttype')),
+            ],
+            options={
+                'ordering': ['date', 'shift_type'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'shift_type'), name='unique_staffing_demand')],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:22
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_assignments(apps, schema_editor):
+    Worker = apps.get_model('scheduler', 'Worker')
+    Schedule = apps.get_model('scheduler', 'Schedule')
+    Assignment = apps.get_model('scheduler', 'Assignment')
+
+    worker_ids = set(Worker.objects.values_list('id', flat=True))
+
+    rows = []
+    for schedule in Schedule.objects.all():
+        for day_data in schedule.per_day_schedule or []:
+            for employee in day_data['daily_employees']:
+                rows.append(Assignment(
+                    schedule=schedule,
+                    worker_id=employee['id'] if employee['id'] in worker_ids else None,
+                    worker_name=employee['name'],
+                    date=datetime.date.fromisoformat(day_data['iso_date']),
+                    shift=employee.get('shift', ''),
+                ))
+
+    Assignment.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0020_shift_types'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schedule',
+            name='per_day_schedule',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='schedule',
+            name='per_employee_schedule',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='Assignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker_name', models.CharField(max_length=201)),
+                ('date', models.DateField()),
+                ('shift', models.CharField(blank=True, max_length=100)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='scheduler.schedule')),
+                ('worker', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assignments', to='scheduler.worker')),
+            ],
+            options={
+                'ordering': ['date', 'id'],
+                'indexes': [models.Index(fields=['date'], name='assignment_date_idx'), models.Index(fields=['worker', 'date'], name='assignment_worker_date_idx')],
+            },
+        ),
+        migrations.RunPython(copy_assignments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0021_assignment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0022_schedule_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worker',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
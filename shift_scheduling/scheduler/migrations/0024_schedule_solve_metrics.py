@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+def copy_stats(apps, schema_editor):
+    # what the old stats already have: build time, stage times and statuses
+    Schedule = apps.get_model('scheduler', 'Schedule')
+
+    schedules = []
+    for schedule in Schedule.objects.only('id', 'schedule_stats'):
+        stats = schedule.schedule_stats if isinstance(schedule.schedule_stats, dict) else {}
+        stages = stats.get('stage_times') or []
+        schedule.build_time = stats.get('build_time')
+        schedule.solve_time = sum(stage['wall_time'] for stage in stages) if stages else None
+        schedule.solver_status = next((stage['status'] for stage in stages if stage['status'] != 'OPTIMAL'), 'OPTIMAL' if stages else '')
+        schedules.append(schedule)
+
+    Schedule.objects.bulk_update(schedules, ['build_time', 'solve_time', 'solver_status'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0023_worker_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='branches',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='build_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='conflicts',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='gap',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='model_constraints',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='model_variables',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='solve_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='solver_status',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.RunPython(copy_stats, migrations.RunPython.noop),
+    ]
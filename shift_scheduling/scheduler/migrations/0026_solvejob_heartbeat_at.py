@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0025_teams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solvejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
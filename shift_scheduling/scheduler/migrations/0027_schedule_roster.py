@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+def copy_roster(apps, schema_editor):
+    Schedule = apps.get_model('scheduler', 'Schedule')
+
+    schedules = []
+    for schedule in Schedule.objects.only('id', 'per_employee_schedule').iterator(chunk_size=100):
+        schedule.roster = [{'id': employee['id'], 'name': employee['name']} for employee in schedule.per_employee_schedule or []]
+        schedules.append(schedule)
+
+    Schedule.objects.bulk_update(schedules, ['roster'], batch_size=100)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0026_solvejob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='roster',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(copy_roster, migrations.RunPython.noop),
+    ]
@@ -1,22 +1,55 @@
+import calendar
+import datetime
 from django.db import models
+from django.db.models import Count, Q
 from django.urls import reverse
 
 # Create your models here.
 
+class Team(models.Model):
+    # a team or site with its own shifts (ShiftType.team). Teams share no
+    # workers and no shifts, so each one is solved as a model of its own,
+    # see teams.py.
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class Worker(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
 
-    unavailable_dates = models.JSONField(default=list, blank=True)
+    # workers without a team are scheduled together, on the shift types without a team
+    team = models.ForeignKey(Team, null=True, blank=True, on_delete=models.SET_NULL, related_name='workers')
+
     assign_least_shifts = models.BooleanField(default=False)
     assign_least_weekends = models.BooleanField(default=False)
 
+    # the worker's id in an outside system (HR), the key of the API's bulk upsert
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
     def is_available_on(self, date_obj):
         """
         date_obj: datetime.date
         returns True if worker is available on that date.
         """
-        return date_obj.isoformat() not in (self.unavailable_dates or [])
+        return not self.unavailabilities.filter(date=date_obj).exists()
+
+    def set_unavailable_dates(self, dates, since):
+        """
+        Makes dates the worker's unavailable dates from since on, dates
+        before since are left as they are.
+        """
+        dates = {d for d in dates if d >= since}
+        self.unavailabilities.filter(date__gte=since).exclude(date__in=dates).delete()
+        Unavailability.objects.bulk_create(
+            [Unavailability(worker=self, date=d) for d in dates],
+            ignore_conflicts=True,
+        )
 
     class Meta:
         ordering = ['last_name', 'first_name']
@@ -28,17 +61,290 @@ class Worker(models.Model):
         return f'{self.first_name} {self.last_name}'
 
 
+class Unavailability(models.Model):
+    # one row per day a worker can't work. Solving a period only reads the
+    # rows inside it, however many dates a worker has collected over the years.
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='unavailabilities')
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['worker', 'date'], name='unique_worker_unavailability'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'worker'], name='unavailability_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.worker} {self.date.isoformat()}'
+
+
+def unavailability_map(worker_ids, start, end):
+    """
+    {worker id: [iso dates]} of the workers' unavailable days from start to
+    end (inclusive), read with one query on the date index.
+    """
+    unavailable = {}
+    rows = Unavailability.objects.filter(worker_id__in=worker_ids, date__range=(start, end)).values_list('worker_id', 'date')
+    for worker_id, date in rows:
+        unavailable.setdefault(worker_id, []).append(date.isoformat())
+    return unavailable
+
+
+class ShiftType(models.Model):
+    # a shift worked on every day of a schedule, e.g. "Day" and "Night". Without
+    # any shift types every day has one shift for 2 workers, see demand.py.
+    # Every team has its own shift types, the ones without a team are for the
+    # workers without a team.
+    team = models.ForeignKey(Team, null=True, blank=True, on_delete=models.CASCADE, related_name='shift_types')
+    name = models.CharField(max_length=100)
+    headcount = models.PositiveSmallIntegerField(default=2, help_text='Workers needed on weekdays')
+    weekend_headcount = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Workers needed on weekends, the weekday headcount if empty')
+
+    # who may work this shift, every worker if empty
+    eligible_workers = models.ManyToManyField(Worker, blank=True, related_name='shift_types')
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.name
+
+
+class StaffingDemand(models.Model):
+    # the headcount of a shift on one date (holidays, peak days), instead of
+    # the shift type's default
+    date = models.DateField()
+    shift_type = models.ForeignKey(ShiftType, on_delete=models.CASCADE, related_name='demands')
+    headcount = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['date', 'shift_type']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'shift_type'], name='unique_staffing_demand'),
+        ]
+
+    def __str__(self):
+        return f'{self.date.isoformat()} {self.shift_type}: {self.headcount}'
+
+
 class Schedule(models.Model):
     schedule_period = models.DateField()
-    per_day_schedule = models.JSONField(default=list)
-    per_employee_schedule = models.JSONField(default=list)
+    period_end = models.DateField(null=True, blank=True) # set for schedules longer than one month
+
+    # the assignments as the solver returned them. The Assignment rows are what
+    # pages and exports read, these are a denormalized copy.
+    per_day_schedule = models.JSONField(default=list, blank=True)
+    per_employee_schedule = models.JSONField(default=list, blank=True)
     schedule_stats = models.JSONField(default=list)
+    # every worker the schedule was solved for, [{'id': ..., 'name': ...}],
+    # those without a shift have no Assignment rows. See schedule_roster.
+    roster = models.JSONField(default=list, blank=True)
+
+    # hash of everything the schedule was solved from, see jobs.schedule_fingerprint.
+    # Cleared whenever a worker changes.
+    input_fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+
+    # set on schedules created by editing another one, see incremental.py
+    parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='versions')
+
+    # part of the display cache key, see display_schedule.html
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # what the solve cost, see metrics.solve_metrics. Empty on schedules
+    # stored before these were recorded.
+    build_time = models.FloatField(null=True, blank=True)
+    solve_time = models.FloatField(null=True, blank=True)
+    model_variables = models.IntegerField(null=True, blank=True)
+    model_constraints = models.IntegerField(null=True, blank=True)
+    branches = models.BigIntegerField(null=True, blank=True)
+    conflicts = models.BigIntegerField(null=True, blank=True)
+    gap = models.FloatField(null=True, blank=True)
+    solver_status = models.CharField(max_length=20, blank=True)
 
     def get_absolute_url(self):
         return reverse('display_schedule', args=[str(self.id)])
 
+    def last_day(self):
+        if self.period_end:
+            return self.period_end
+        return self.schedule_period.replace(day=calendar.monthrange(self.schedule_period.year, self.schedule_period.month)[1])
+
+    def set_assignments(self, per_day_schedule):
+        """
+        Replaces the schedule's Assignment rows with the days of a
+        per_day_schedule as returned by create_schedule.
+        """
+        self.assignments.all().delete()
+        Assignment.objects.bulk_create(
+            [
+                Assignment(
+                    schedule=self,
+                    worker_id=employee['id'],
+                    worker_name=employee['name'],
+                    date=datetime.date.fromisoformat(day_data['iso_date']),
+                    shift=employee.get('shift', ''),
+                )
+                for day_data in per_day_schedule
+                for employee in day_data['daily_employees']
+            ],
+            batch_size=1000,
+        )
+        self.save(update_fields=['updated_at'])
+
+    def per_day(self):
+        """
+        The per_day_schedule of the Assignment rows, every day of the period
+        in order, days without assignments included.
+        """
+        days = {}
+        for date, worker_id, worker_name, shift in self.assignments.values_list('date', 'worker_id', 'worker_name', 'shift'):
+            employee = {'id': worker_id, 'name': worker_name}
+            if shift:
+                employee['shift'] = shift
+            days.setdefault(date, []).append(employee)
+
+        num_days = (self.last_day() - self.schedule_period).days + 1
+        dates = [self.schedule_period + datetime.timedelta(days=day) for day in range(num_days)]
+        return [{'iso_date': d.isoformat(), 'daily_employees': days.get(d, [])} for d in dates]
+
+    def per_employee(self):
+        """
+        Every worker of the roster with their days, shift and weekend shift
+        counts, the counts are aggregated by the database. Workers without a
+        shift are listed with 0.
+        """
+        counts = (
+            self.assignments.values('worker_id', 'worker_name')
+            .annotate(shifts=Count('id'), weekend_shifts=Count('id', filter=Q(date__week_day__in=[1, 7])))
+            .order_by('worker_name', 'worker_id')
+        )
+        employees = {
+            (row['worker_id'], row['worker_name']): {
+                'id': row['worker_id'],
+                'name': row['worker_name'],
+                'days': [],
+                'shifts': row['shifts'],
+                'weekend_shifts': row['weekend_shifts'],
+            }
+            for row in counts
+        }
+
+        for worker_id, worker_name, date in self.assignments.values_list('worker_id', 'worker_name', 'date'):
+            employees[worker_id, worker_name]['days'].append(date.isoformat())
+
+        # the rows of a deleted worker have no id any more, only the name
+        assigned = {worker_id for worker_id, _ in employees} | {worker_name for worker_id, worker_name in employees if worker_id is None}
+        idle = [
+            {'id': employee['id'], 'name': employee['name'], 'days': [], 'shifts': 0, 'weekend_shifts': 0}
+            for employee in self.roster if employee['id'] not in assigned and employee['name'] not in assigned
+        ]
+
+        return sorted([*employees.values(), *idle], key=lambda employee: (employee['name'], employee['id'] or 0))
+
     def __str__(self):
+        if self.period_end and (self.period_end.year, self.period_end.month) != (self.schedule_period.year, self.schedule_period.month):
+            return f'{self.schedule_period.strftime("%B %Y")} - {self.period_end.strftime("%B %Y")}'
         return self.schedule_period.strftime("%B %Y")
     
     class Meta:
         ordering = ['-schedule_period']
+
+
+class Assignment(models.Model):
+    # one row per worker and day of a schedule, so "who works on this date" or
+    # "all of a worker's shifts this year" is an index lookup
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name='assignments')
+    # the (worker, date) index below covers lookups by worker
+    worker = models.ForeignKey(Worker, null=True, on_delete=models.SET_NULL, related_name='assignments', db_index=False)
+    # the name when the schedule was made, kept after the worker is deleted
+    worker_name = models.CharField(max_length=201)
+    date = models.DateField()
+    shift = models.CharField(max_length=100, blank=True) # the shift type's name, empty without shift types
+
+    class Meta:
+        ordering = ['date', 'id']
+        indexes = [
+            models.Index(fields=['date'], name='assignment_date_idx'),
+            models.Index(fields=['worker', 'date'], name='assignment_worker_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date.isoformat()} {self.worker_name}'
+
+
+def schedule_roster(per_employee_schedule):
+    # the Schedule.roster of a per_employee_schedule, without the days
+    return [{'id': employee['id'], 'name': employee['name']} for employee in per_employee_schedule]
+
+
+def assignment_day_map(schedule_id):
+    """
+    {iso date: set of worker ids} of a stored schedule, the day map that
+    create_schedule takes as hint or history.
+    """
+    day_map = {}
+    for date, worker_id in Assignment.objects.filter(schedule_id=schedule_id, worker__isnull=False).values_list('date', 'worker_id'):
+        day_map.setdefault(date.isoformat(), set()).add(worker_id)
+    return day_map
+
+
+
+class SolveJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    schedule_period = models.DateField()
+    period_end = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    schedule = models.ForeignKey(Schedule, null=True, blank=True, on_delete=models.SET_NULL)
+
+    # re-planning an existing schedule: it is used as the solution hint and,
+    # with minimal_changes, as the reference the new schedule should stay close to
+    base_schedule = models.ForeignKey(Schedule, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    minimal_changes = models.BooleanField(default=False)
+
+    # per job solver settings (time_limit, num_workers, random_seed, portfolio_size)
+    # on top of settings.SCHEDULER_SOLVER
+    solver_options = models.JSONField(default=dict, blank=True)
+
+    # the latest solution reported by the solver while the job runs, and the
+    # planner's request to stop and keep the best schedule found so far
+    progress = models.JSONField(default=dict, blank=True)
+    stop_requested = models.BooleanField(default=False)
+
+    input_fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+
+    error_msg = models.CharField(max_length=255, blank=True)
+
+    # why a failed job has no schedule, the conflicts found by diagnosis.diagnose_schedule
+    diagnosis = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # written regularly by the process running the job, see jobs.JobHeartbeat.
+    # A running job without recent heartbeats lost its worker.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def get_absolute_url(self):
+        return reverse('schedule_job', args=[str(self.id)])
+
+    def __str__(self):
+        return f'{self.schedule_period.strftime("%B %Y")} ({self.status})'
+
+    class Meta:
+        ordering = ['created_at']
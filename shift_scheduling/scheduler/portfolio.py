@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from .horizon import create_horizon_schedule
+
+
+# A portfolio runs the same schedule with several solver configurations (usually
+# different random seeds) at the same time and keeps the best result. Each
+# configuration gets its own process, so they don't compete for the GIL.
+
+def schedule_score(schedule_stats):
+    """
+    Sort key of a finished schedule, lower is better. Follows the priority
+    order of the objectives in create_schedule.
+    """
+    return (
+        schedule_stats.get('changes', 0),
+        schedule_stats['max_shifts_min_shifts'],
+        schedule_stats['max_wknd_shifts_min_wknd_shifts'],
+        len(schedule_stats['shift_violations']),
+        len(schedule_stats['wknd_shift_violations']),
+        len(schedule_stats['interval_violations']),
+    )
+
+
+def seed_portfolio(solver_params, size):
+    # size copies of solver_params that only differ in their random seed
+    first_seed = (solver_params or {}).get('random_seed', 0)
+    return [{**(solver_params or {}), 'random_seed': first_seed + i} for i in range(size)]
+
+
+def solve_portfolio(period_start, period_end, employees, portfolio, processes=None, **solve_options):
+    """
+    Solves the period once per solver_params dict in portfolio and returns the
+    result with the best schedule_score, or None if every run failed.
+    solve_options are passed on to create_horizon_schedule.
+    """
+    employees = list(employees)
+
+    if len(portfolio) == 1:
+        return create_horizon_schedule(period_start, period_end, employees, solver_params=portfolio[0], **solve_options)
+
+    # see the run_solver_worker command on why the pool is spawned
+    context = multiprocessing.get_context('spawn')
+    max_workers = processes or min(len(portfolio), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=django.setup) as pool:
+        futures = [
+            pool.submit(create_horizon_schedule, period_start, period_end, employees, solver_params=solver_params, **solve_options)
+            for solver_params in portfolio
+        ]
+        results = [future.result() for future in futures]
+
+    runs = []
+    best = None
+    for solver_params, result in zip(portfolio, results):
+        score = schedule_score(result[2]) if result is not None else None
+        runs.append({'solver_params': solver_params, 'score': score})
+
+        if result is not None and (best is None or score < schedule_score(best[2])):
+            best = result
+
+    if best is not None:
+        best[2]['portfolio'] = runs
+
+    return best
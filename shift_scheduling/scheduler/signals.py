@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Worker, ShiftType, StaffingDemand
+from .jobs import invalidate_cached_schedules
+
+
+# Stored schedules are reused for identical requests (see
+# jobs.get_or_enqueue_schedule_job). Any change to a worker or to the staffing
+# demand drops them from that cache.
+
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+def worker_changed(sender, **kwargs):
+    invalidate_cached_schedules()
+
+
+@receiver(post_save, sender=ShiftType)
+@receiver(post_delete, sender=ShiftType)
+@receiver(post_save, sender=StaffingDemand)
+@receiver(post_delete, sender=StaffingDemand)
+def demand_changed(sender, **kwargs):
+    invalidate_cached_schedules()
@@ -0,0 +1,230 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from .models import Team, unavailability_map
+from .demand import load_demand
+from .horizon import create_horizon_schedule, summarize_schedule
+from .portfolio import schedule_score, solve_portfolio
+from .diagnosis import diagnose_schedule
+
+
+# Teams (sites) share neither workers nor shifts, so a schedule of several
+# teams falls apart into one independent model per team:
+#
+#   workers -> one group per team -> create_horizon_schedule for every group
+#   and portfolio configuration, side by side in a process pool -> the best
+#   run of every team -> one merged schedule
+#
+# The solve time then grows with the largest team instead of the whole roster.
+# Fairness (shift and weekend differences, the interval) holds within a team,
+# each team's numbers are kept in schedule_stats['teams']. A roster without
+# teams is one group and solved exactly as before.
+
+
+def team_groups(employees):
+    """
+    [(team or None, [workers])] of the employees, the workers without a team
+    first and the teams by name.
+    """
+    members = {}
+    for e in employees:
+        members.setdefault(e.team_id, []).append(e)
+
+    teams = Team.objects.in_bulk([team_id for team_id in members if team_id is not None])
+    order = sorted(members, key=lambda team_id: (team_id is not None, str(teams.get(team_id, ''))))
+    return [(teams.get(team_id), members[team_id]) for team_id in order]
+
+
+def team_demands(groups, start, end):
+    # the demand of every group, see demand.load_demand
+    return [load_demand(start, end, team.id if team else None) for team, _ in groups]
+
+
+def team_days(per_day_schedule, employee_ids):
+    # the per day schedule with only the given workers, every day kept
+    return [
+        {**day_data, 'daily_employees': [employee for employee in day_data['daily_employees'] if employee['id'] in employee_ids]}
+        for day_data in per_day_schedule
+    ]
+
+
+def team_interval(schedule_stats, team):
+    # the shift interval a team was solved with, None if it isn't known
+    for team_stats in schedule_stats.get('teams', []):
+        if team_stats['team'] == (team.id if team else None):
+            return team_stats['theoretical_intervals']
+    if not schedule_stats.get('teams'):
+        return schedule_stats.get('theoretical_intervals')
+    return None
+
+
+def merge_team_results(groups, results):
+    """
+    One (per_day_schedule, per_employee_schedule, schedule_stats) triple from
+    the results of the groups, in the same order. The stats have the worst
+    value of the teams at the top level and every team's own under 'teams'.
+    A single group's result is returned as it is.
+    """
+    if len(results) == 1:
+        return results[0]
+
+    per_day_schedule = [
+        {'iso_date': days[0]['iso_date'], 'daily_employees': [employee for day_data in days for employee in day_data['daily_employees']]}
+        for days in zip(*(per_day for per_day, _, _ in results))
+    ]
+    per_employee_schedule = [employee for _, per_employee, _ in results for employee in per_employee]
+    stats = [schedule_stats for _, _, schedule_stats in results]
+
+    schedule_stats = {
+        'max_shifts_min_shifts': max(team_stats['max_shifts_min_shifts'] for team_stats in stats),
+        'max_wknd_shifts_min_wknd_shifts': max(team_stats['max_wknd_shifts_min_wknd_shifts'] for team_stats in stats),
+        'interval_violations': [violation for team_stats in stats for violation in team_stats['interval_violations']],
+        'shift_violations': [violation for team_stats in stats for violation in team_stats['shift_violations']],
+        'wknd_shift_violations': [violation for team_stats in stats for violation in team_stats['wknd_shift_violations']],
+        # the interval differs from team to team, the smallest one is shown
+        'theoretical_intervals': min(team_stats['theoretical_intervals'] for team_stats in stats),
+        'teams': [
+            {
+                'team': team.id if team else None,
+                'name': str(team) if team else '',
+                'workers': len(members),
+                'max_shifts_min_shifts': team_stats['max_shifts_min_shifts'],
+                'max_wknd_shifts_min_wknd_shifts': team_stats['max_wknd_shifts_min_wknd_shifts'],
+                'theoretical_intervals': team_stats['theoretical_intervals'],
+            }
+            for (team, members), team_stats in zip(groups, stats)
+        ],
+    }
+
+    for key in ['objective_mode', 'interval_encoding', 'solver_params']:
+        if key in stats[0]:
+            schedule_stats[key] = stats[0][key]
+
+    if all('stage_times' in team_stats for team_stats in stats):
+        schedule_stats['build_time'] = max(team_stats['build_time'] for team_stats in stats)
+        schedule_stats['model_size'] = max((team_stats['model_size'] for team_stats in stats), key=lambda size: size['variables'])
+        schedule_stats['stage_times'] = [
+            {**stage, 'team': team.id if team else None} for (team, _), team_stats in zip(groups, stats) for stage in team_stats['stage_times']
+        ]
+        for team_entry, team_stats in zip(schedule_stats['teams'], stats):
+            team_entry['build_time'] = team_stats['build_time']
+            team_entry['model_size'] = team_stats['model_size']
+            team_entry['solve_time'] = sum(stage['wall_time'] for stage in team_stats['stage_times'])
+            if 'portfolio' in team_stats:
+                team_entry['portfolio'] = team_stats['portfolio']
+
+    if any('changes' in team_stats for team_stats in stats):
+        schedule_stats['changes'] = sum(team_stats.get('changes', 0) for team_stats in stats)
+
+    return per_day_schedule, per_employee_schedule, schedule_stats
+
+
+def summarize_teams(employees, per_day_schedule, schedule_stats, default_interval):
+    """
+    The per employee view and the stats of an already assigned schedule,
+    team by team with the intervals of schedule_stats like
+    merge_team_results.
+    """
+    groups = team_groups(employees)
+    results = []
+    for team, members in groups:
+        per_day = team_days(per_day_schedule, {e.id for e in members})
+        shift_interval = team_interval(schedule_stats, team) or default_interval
+        results.append((per_day, *summarize_schedule(members, per_day, shift_interval)))
+
+    _, per_employee_schedule, merged_stats = merge_team_results(groups, results)
+    return per_employee_schedule, merged_stats
+
+
+def solve_teams(period_start, period_end, employees, portfolio, processes=None, hint=None, demands=None, **solve_options):
+    """
+    Solves every team of the employees with every solver_params dict of
+    portfolio, the runs side by side in up to processes processes (by default
+    one per run, at most one per CPU). Returns the merged result, or None if a
+    team could not be solved. demands are the team_demands of the groups,
+    read from the database if not given. solve_options are passed on to
+    create_horizon_schedule.
+    """
+    employees = list(employees)
+    groups = team_groups(employees)
+    if demands is None:
+        demands = team_demands(groups, period_start, period_end)
+
+    if len(groups) == 1:
+        return solve_portfolio(period_start, period_end, employees, portfolio, processes, hint=hint, demand=demands[0], **solve_options)
+
+    started = time.perf_counter()
+    # one query for all teams, each process gets its team's part
+    if solve_options.get('unavailable') is None:
+        solve_options['unavailable'] = unavailability_map([e.id for e in employees], period_start, period_end)
+
+    tasks = []
+    for (team, members), demand in zip(groups, demands):
+        member_ids = {e.id for e in members}
+        team_hint = {iso_date: set(ids) & member_ids for iso_date, ids in (hint or {}).items()}
+        team_unavailable = {e_id: dates for e_id, dates in solve_options['unavailable'].items() if e_id in member_ids}
+        for solver_params in portfolio:
+            tasks.append((members, demand, team_hint, team_unavailable, solver_params))
+
+    # see the run_solver_worker command on why the pool is spawned
+    context = multiprocessing.get_context('spawn')
+    max_workers = processes or min(len(tasks), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=django.setup) as pool:
+        futures = [
+            pool.submit(
+                create_horizon_schedule,
+                period_start,
+                period_end,
+                members,
+                hint=team_hint,
+                solver_params=solver_params,
+                **{**solve_options, 'demand': demand, 'unavailable': team_unavailable},
+            )
+            for members, demand, team_hint, team_unavailable, solver_params in tasks
+        ]
+        runs = [future.result() for future in futures]
+
+    # the best run of every team, the runs of a team are consecutive
+    results = []
+    for index in range(len(groups)):
+        team_runs = runs[index * len(portfolio):(index + 1) * len(portfolio)]
+        solved = [result for result in team_runs if result is not None]
+        if not solved:
+            return None
+
+        best = min(solved, key=lambda result: schedule_score(result[2]))
+        if len(portfolio) > 1:
+            best[2]['portfolio'] = [
+                {'solver_params': solver_params, 'score': schedule_score(result[2]) if result is not None else None}
+                for solver_params, result in zip(portfolio, team_runs)
+            ]
+        results.append(best)
+
+    merged = merge_team_results(groups, results)
+    # the teams ran side by side, the sum of their stage times would overstate it
+    merged[2]['solve_time'] = time.perf_counter() - started
+    return merged
+
+
+def team_conflicts(period_start, period_end, employees, time_limit=10):
+    """
+    diagnose_schedule for every team, the conflicts of a team carry its name
+    in 'team' and in front of the message.
+    """
+    groups = team_groups(employees)
+    demands = team_demands(groups, period_start, period_end)
+    conflicts = []
+
+    for (team, members), demand in zip(groups, demands):
+        for conflict in diagnose_schedule(period_start, members, period_end, time_limit=time_limit, demand=demand):
+            if len(groups) > 1:
+                conflict['team'] = str(team) if team else ''
+                conflict['msg'] = f'{team or "Without team"}: {conflict["msg"]}'
+            conflicts.append(conflict)
+
+    return conflicts
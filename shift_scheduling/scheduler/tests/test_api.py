@@ -0,0 +1,32 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from scheduler.models import Worker, Schedule, SolveJob
+
+
+class SolveApiTests(TestCase):
+    def setUp(self):
+        for i in range(6):
+            Worker.objects.create(first_name=f'Worker{i}', last_name='Test')
+        self.client.force_login(User.objects.create_user('planner', password='planner'))
+        self.schedule = Schedule.objects.create(pk=1, schedule_period=datetime.date(2026, 1, 1))
+
+    def post_solve(self, **data):
+        return self.client.post(reverse('api_solve'), json.dumps({'schedule_period': '2026-01', **data}), content_type='application/json')
+
+    def test_base_schedule_id(self):
+        response = self.post_solve(base_schedule=self.schedule.pk)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(SolveJob.objects.get(pk=response.json()['id']).base_schedule_id, self.schedule.pk)
+
+    def test_bool_is_no_base_schedule(self):
+        # schedule 1 exists, true must not be read as its id
+        for value in [True, False]:
+            response = self.post_solve(base_schedule=value)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'no such base_schedule')
+        self.assertFalse(SolveJob.objects.exists())
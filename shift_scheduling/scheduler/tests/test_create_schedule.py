@@ -0,0 +1,321 @@
+import datetime
+import random
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from ortools.sat.python import cp_model
+
+from scheduler.create_schedule import (
+    INTERVAL_ENCODINGS, create_schedule, restore_solution, solve_lexicographic, solve_stage,
+)
+from scheduler.demand import DEFAULT_DEMAND
+from scheduler.horizon import create_horizon_schedule
+from scheduler.models import Worker
+from scheduler.portfolio import schedule_score
+
+
+def golomb_ruler(marks):
+    # a small model whose optimum takes far longer to prove than to find
+    model = cp_model.CpModel()
+    limit = marks * marks
+    positions = [model.new_int_var(0, limit, f'mark_{i}') for i in range(marks)]
+    model.add(positions[0] == 0)
+    differences = []
+    for i in range(marks):
+        for j in range(i + 1, marks):
+            difference = model.new_int_var(1, limit, f'difference_{i}_{j}')
+            model.add(difference == positions[j] - positions[i])
+            differences.append(difference)
+    model.add_all_different(differences)
+    for i in range(marks - 1):
+        model.add(positions[i] < positions[i + 1])
+    return model, positions
+
+
+class StopTests(SimpleTestCase):
+    def test_stop_without_new_solutions(self):
+        model, positions = golomb_ruler(11)
+        model.minimize(positions[-1])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = 60
+        solver.parameters.num_workers = 2
+
+        started = time.perf_counter()
+        status, stage, stopped = solve_stage(model, solver, 'test', should_stop=lambda: time.perf_counter() - started > 1)
+
+        self.assertTrue(stopped)
+        self.assertTrue(stage['stopped'])
+        self.assertLess(time.perf_counter() - started, 10)
+        self.assertEqual(status, cp_model.FEASIBLE)
+
+    def test_stop_between_stages_keeps_schedule(self):
+        model = cp_model.CpModel()
+        x = [model.new_bool_var(f'x_{i}') for i in range(6)]
+        model.add(sum(x) == 3)
+        objectives = [('first', x[0] + x[1], 2), ('second', 2 - x[4] - x[5], 2)]
+
+        stop = []
+        solver = cp_model.CpSolver()
+        status, stage_times = solve_lexicographic(model, solver, objectives, progress=lambda event: stop.append(event['stage']) and False, should_stop=lambda: bool(stop))
+
+        self.assertEqual(status, cp_model.OPTIMAL)
+        self.assertEqual([stage['stage'] for stage in stage_times], ['first'])
+        self.assertEqual(solver.value(x[0] + x[1]), 0)
+
+    def test_restore_solution(self):
+        model = cp_model.CpModel()
+        x = [model.new_bool_var(f'x_{i}') for i in range(6)]
+        model.add(sum(x) == 3)
+        model.minimize(x[0] + x[1])
+        solver = cp_model.CpSolver()
+        solver.solve(model)
+        solution = list(solver.response_proto.solution)
+
+        model.minimize(-x[0] - x[1])
+        status = restore_solution(model, solver, solution)
+
+        self.assertEqual(status, cp_model.OPTIMAL)
+        self.assertEqual(list(solver.response_proto.solution), solution)
+        self.assertFalse(solver.parameters.fix_variables_to_their_hinted_value)
+        self.assertFalse(model.proto.solution_hint.vars)
+
+
+def corpus_instance(seed):
+    """
+    A small random roster: period, workers, unavailable dates, demand and
+    history, small enough to be solved to the optimum in about a second.
+    """
+    rng = random.Random(seed)
+    period = datetime.date(2025, rng.randint(1, 12), rng.randint(1, 10))
+    num_days = rng.randint(10, 16)
+    period_end = period + datetime.timedelta(days=num_days - 1)
+
+    employees = [
+        Worker(id=i, first_name=f'Worker{i}', last_name='Test', assign_least_shifts=rng.random() < 0.25, assign_least_weekends=rng.random() < 0.25)
+        for i in range(1, rng.randint(5, 7) + 1)
+    ]
+
+    unavailable = {}
+    for e in employees:
+        days = rng.sample(range(num_days), rng.randint(0, 5))
+        unavailable[e.id] = [(period + datetime.timedelta(days=day)).isoformat() for day in days]
+
+    demand = DEFAULT_DEMAND
+    if seed % 3 == 2:
+        demand = {
+            'shifts': [
+                {'name': 'Day', 'headcount': 1, 'weekend_headcount': 1, 'eligible': None},
+                {'name': 'Night', 'headcount': 1, 'weekend_headcount': 1, 'eligible': [e.id for e in employees[1:]]},
+            ],
+            'dates': {},
+        }
+
+    # a week before the period for some of them, it reaches into the first windows
+    history = {}
+    if seed % 2:
+        for day in range(1, 8):
+            history[(period - datetime.timedelta(days=day)).isoformat()] = set(rng.sample([e.id for e in employees], 2))
+
+    return period, period_end, employees, unavailable, demand, history
+
+
+def interval_violation_count(per_employee_schedule, period, num_days, shift_interval):
+    # windows inside the period with 2 or more shifts, counted from the days
+    count = 0
+    for employee in per_employee_schedule:
+        worked = {(datetime.date.fromisoformat(d) - period).days + 1 for d in employee['days']}
+        for start in range(1, num_days - shift_interval + 2):
+            count += len(worked & set(range(start, start + shift_interval))) >= 2
+    return count
+
+
+class IntervalEncodingCorpusTests(SimpleTestCase):
+    # every encoding has to reach the same optimum, and the reported interval
+    # violations have to match the assignments
+
+    solver_params = {'time_limit': 20, 'num_workers': 8, 'random_seed': 0}
+
+    def solve(self, seed, encoding):
+        period, period_end, employees, unavailable, demand, history = corpus_instance(seed)
+        return create_schedule(
+            period, employees, period_end=period_end, interval_encoding=encoding, history=history, unavailable=unavailable, demand=demand,
+            solver_params=self.solver_params, symmetry_breaking=False,
+        )
+
+    def test_encodings_reach_the_same_optimum(self):
+        for seed in range(30):
+            period, period_end = corpus_instance(seed)[:2]
+            num_days = (period_end - period).days + 1
+            scores = {}
+
+            for encoding in INTERVAL_ENCODINGS:
+                result = self.solve(seed, encoding)
+                if result is None:
+                    # a roster that can't be staffed, with every encoding
+                    scores[encoding] = None
+                    continue
+
+                _, per_employee_schedule, schedule_stats = result
+                stage_times = schedule_stats['stage_times']
+                self.assertTrue(all(stage['status'] == 'OPTIMAL' for stage in stage_times), f'seed {seed} {encoding}: {stage_times}')
+                scores[encoding] = schedule_score(schedule_stats)
+
+                if not seed % 2:
+                    self.assertEqual(
+                        len(schedule_stats['interval_violations']),
+                        interval_violation_count(per_employee_schedule, period, num_days, schedule_stats['theoretical_intervals']),
+                        f'seed {seed} {encoding}',
+                    )
+
+            self.assertEqual(len(set(scores.values())), 1, f'seed {seed}: {scores}')
+
+
+class SymmetryBreakingTests(SimpleTestCase):
+    # the ordering only removes schedules that are permutations of others, the
+    # optimum has to stay the same
+
+    solver_params = {'time_limit': 20, 'num_workers': 8, 'random_seed': 0}
+
+    def roster(self, seed):
+        # a large group of identical workers and a few with their own days and flags
+        rng = random.Random(seed)
+        period = datetime.date(2026, 2, 1)
+        employees = [Worker(id=i, first_name=f'Worker{i}', last_name='Test') for i in range(1, 121)]
+        unavailable = {}
+        for e in employees[100:]:
+            e.assign_least_shifts = rng.random() < 0.5
+            e.assign_least_weekends = rng.random() < 0.5
+            unavailable[e.id] = [(period + datetime.timedelta(days=day)).isoformat() for day in rng.sample(range(28), 3)]
+        return period, employees, unavailable
+
+    def test_optimum_is_unchanged(self):
+        for seed in range(3):
+            period, employees, unavailable = self.roster(seed)
+            results = {}
+            for symmetry_breaking in [True, False]:
+                result = create_schedule(
+                    period, employees, unavailable=unavailable, demand=DEFAULT_DEMAND, solver_params=self.solver_params,
+                    symmetry_breaking=symmetry_breaking,
+                )
+                schedule_stats = result[2]
+                self.assertTrue(all(stage['status'] == 'OPTIMAL' for stage in schedule_stats['stage_times']), schedule_stats['stage_times'])
+                results[symmetry_breaking] = schedule_stats
+
+            self.assertEqual(results[True]['symmetry_groups'], 1)
+            self.assertEqual(results[True]['symmetry_workers'], 100)
+            self.assertEqual(schedule_score(results[True]), schedule_score(results[False]))
+
+
+def assert_feasible(test, result, unavailable, reference):
+    # staffed like the reference schedule, and nobody works on a day off
+    per_day_schedule = result[0]
+    test.assertEqual(
+        [len(day_data['daily_employees']) for day_data in per_day_schedule],
+        [len(day_data['daily_employees']) for day_data in reference[0]],
+    )
+    for day_data in per_day_schedule:
+        for employee in day_data['daily_employees']:
+            test.assertNotIn(day_data['iso_date'], unavailable.get(employee['id'], []))
+
+
+class ObjectiveModeTests(SimpleTestCase):
+    # the modes only differ in how they search, on rosters small enough to be
+    # solved to the end they have to reach the optimum of the sequential solve
+
+    solver_params = {'time_limit': 20, 'num_workers': 8, 'random_seed': 0}
+
+    def solve(self, seed, objective_mode):
+        period, period_end, employees, unavailable, demand, history = corpus_instance(seed)
+        return create_schedule(
+            period, employees, period_end=period_end, objective_mode=objective_mode, history=history, unavailable=unavailable, demand=demand,
+            solver_params=self.solver_params,
+        )
+
+    def test_single_pass_modes_reach_the_sequential_optimum(self):
+        for seed in range(5):
+            unavailable = corpus_instance(seed)[3]
+            sequential = self.solve(seed, 'sequential')
+
+            for objective_mode in ['weighted', 'hinted']:
+                result = self.solve(seed, objective_mode)
+                stage_times = result[2]['stage_times']
+                # the weighted mode solves once, the hinted one stage by stage like the sequential one
+                expected_stages = ['weighted'] if objective_mode == 'weighted' else [stage['stage'] for stage in sequential[2]['stage_times']]
+                self.assertEqual([stage['stage'] for stage in stage_times], expected_stages)
+
+                self.assertTrue(all(stage['status'] == 'OPTIMAL' for stage in stage_times), f'seed {seed} {objective_mode}: {stage_times}')
+                self.assertTrue(all(stage['wall_time'] >= 0 for stage in stage_times))
+                self.assertEqual(schedule_score(result[2]), schedule_score(sequential[2]), f'seed {seed} {objective_mode}')
+                assert_feasible(self, result, unavailable, sequential)
+
+    def test_lns_reaches_the_weighted_optimum(self):
+        for seed in range(5):
+            unavailable = corpus_instance(seed)[3]
+            weighted = self.solve(seed, 'weighted')
+            # stop the first solve at its first schedule, so the neighbourhoods do the work
+            with mock.patch('scheduler.create_schedule.LNS_FIRST_SHARE', 0):
+                lns = self.solve(seed, 'lns')
+
+            self.assertEqual(weighted[2]['stage_times'][0]['status'], 'OPTIMAL')
+            first, neighbourhoods = lns[2]['stage_times']
+            self.assertGreater(neighbourhoods['neighbourhoods'], 0)
+            self.assertEqual(neighbourhoods['status'], 'OPTIMAL', f'seed {seed}')
+            self.assertEqual(neighbourhoods['objective'], weighted[2]['stage_times'][0]['objective'])
+            self.assertEqual(schedule_score(lns[2]), schedule_score(weighted[2]))
+            assert_feasible(self, lns, unavailable, weighted)
+
+
+class HorizonTests(SimpleTestCase):
+    solver_params = {'time_limit': 5, 'num_workers': 8, 'random_seed': 0}
+
+    def test_windows_across_month_boundaries(self):
+        # 50 days from January to March in windows of three weeks
+        period_start, period_end = datetime.date(2026, 1, 20), datetime.date(2026, 3, 10)
+        employees = [Worker(id=i, first_name=f'Worker{i}', last_name='Test') for i in range(1, 7)]
+
+        for carry in ['hint', 'fix']:
+            per_day_schedule, per_employee_schedule, schedule_stats = create_horizon_schedule(
+                period_start, period_end, employees, window_days=21, overlap_days=7, carry=carry,
+                unavailable={}, demand=DEFAULT_DEMAND, solver_params=self.solver_params,
+            )
+
+            self.assertEqual(
+                [day_data['iso_date'] for day_data in per_day_schedule],
+                [(period_start + datetime.timedelta(days=day)).isoformat() for day in range(50)],
+            )
+            self.assertEqual({len(day_data['daily_employees']) for day_data in per_day_schedule}, {2})
+            self.assertEqual(
+                [(window['start'], window['end']) for window in schedule_stats['windows']],
+                [('2026-01-20', '2026-02-09'), ('2026-02-03', '2026-02-23'), ('2026-02-17', '2026-03-09'), ('2026-03-03', '2026-03-10')],
+            )
+
+            # fairness and spacing carry over from one window to the next:
+            # 100 shifts of 6 workers, nobody on two days in a row
+            self.assertEqual(sorted(len(employee['days']) for employee in per_employee_schedule), [16, 16, 17, 17, 17, 17])
+            self.assertEqual(schedule_stats['theoretical_intervals'], 2)
+            self.assertEqual(schedule_stats['interval_violations'], [])
+
+
+class MinimalChangesTests(SimpleTestCase):
+    solver_params = {'time_limit': 5, 'num_workers': 8, 'random_seed': 0}
+
+    def test_sick_call_changes_one_assignment(self):
+        period = datetime.date(2026, 2, 1)
+        employees = [Worker(id=i, first_name=f'Worker{i}', last_name='Test') for i in range(1, 7)]
+        base = create_schedule(period, employees, unavailable={}, demand=DEFAULT_DEMAND, solver_params=self.solver_params)
+        hint = {day_data['iso_date']: {employee['id'] for employee in day_data['daily_employees']} for day_data in base[0]}
+
+        # one of the workers of the 10th calls in sick
+        sick = min(hint['2026-02-10'])
+        per_day_schedule, _, schedule_stats = create_schedule(
+            period, employees, unavailable={sick: ['2026-02-10']}, demand=DEFAULT_DEMAND, solver_params=self.solver_params,
+            hint=hint, minimal_changes=True,
+        )
+        days = {day_data['iso_date']: {employee['id'] for employee in day_data['daily_employees']} for day_data in per_day_schedule}
+
+        self.assertNotIn(sick, days['2026-02-10'])
+        # only the sick worker's shift is given to someone else
+        self.assertEqual(schedule_stats['changes'], 1)
+        self.assertEqual(sum(len(hint[iso_date] - days[iso_date]) for iso_date in hint), 1)
+        self.assertEqual(schedule_stats['stage_times'][0]['stage'], 'changes')
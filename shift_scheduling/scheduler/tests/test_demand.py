@@ -0,0 +1,91 @@
+import datetime
+
+from django.test import TestCase
+
+from scheduler.data_checks import data_checks
+from scheduler.demand import DEFAULT_DEMAND, load_demand, headcount_matrix, eligibility_matrix
+from scheduler.models import Team, Worker, ShiftType, StaffingDemand, Unavailability
+
+
+class DemandTests(TestCase):
+    start = datetime.date(2026, 3, 1) # a Sunday
+    end = datetime.date(2026, 3, 7)
+
+    def setUp(self):
+        self.ann = Worker.objects.create(first_name='Ann', last_name='Smith')
+        self.bob = Worker.objects.create(first_name='Bob', last_name='Jones')
+        self.day = ShiftType.objects.create(name='Day', headcount=2, weekend_headcount=1)
+        self.night = ShiftType.objects.create(name='Night', headcount=1)
+        self.night.eligible_workers.add(self.bob)
+
+    def dates(self):
+        return [self.start + datetime.timedelta(days=day) for day in range(7)]
+
+    def test_shift_types_and_overrides(self):
+        StaffingDemand.objects.create(date=datetime.date(2026, 3, 3), shift_type=self.night, headcount=0)
+        # outside the period, not loaded
+        StaffingDemand.objects.create(date=datetime.date(2026, 3, 8), shift_type=self.day, headcount=5)
+
+        demand = load_demand(self.start, self.end)
+
+        self.assertEqual(demand, {
+            'shifts': [
+                {'name': 'Day', 'headcount': 2, 'weekend_headcount': 1, 'eligible': None},
+                {'name': 'Night', 'headcount': 1, 'weekend_headcount': 1, 'eligible': [self.bob.id]},
+            ],
+            'dates': {'2026-03-03': [None, 0]},
+        })
+        self.assertEqual(headcount_matrix(demand, self.dates()).tolist(), [
+            [1, 1], [2, 1], [2, 0], [2, 1], [2, 1], [2, 1], [1, 1],
+        ])
+
+    def test_eligible_workers(self):
+        demand = load_demand(self.start, self.end)
+        carl = Worker(id=0, first_name='Carl', last_name='New')
+
+        self.assertEqual(eligibility_matrix(demand, [self.ann, self.bob, carl]).tolist(), [
+            [True, False], [True, True], [True, False],
+        ])
+
+    def test_team_demand(self):
+        team = Team.objects.create(name='North')
+        ShiftType.objects.create(name='Ward', headcount=3, team=team)
+
+        self.assertEqual([shift['name'] for shift in load_demand(self.start, self.end, team.id)['shifts']], ['Ward'])
+        self.assertEqual(load_demand(self.start, self.end, Team.objects.create(name='South').id), DEFAULT_DEMAND)
+
+
+class DataCheckTests(TestCase):
+    period = datetime.date(2026, 3, 1)
+
+    def test_minimum_comes_from_the_demand(self):
+        ann = Worker.objects.create(first_name='Ann', last_name='Smith')
+
+        # the default demand needs two workers a day
+        self.assertEqual(data_checks(Worker.objects.all(), self.period)['code'], 1)
+
+        # one shift of one worker needs one
+        ShiftType.objects.create(name='Solo', headcount=1)
+        self.assertEqual(data_checks(Worker.objects.all(), self.period)['code'], 0)
+
+        # a peak day needs three
+        StaffingDemand.objects.create(date=datetime.date(2026, 3, 10), shift_type=ShiftType.objects.get(), headcount=3)
+        Worker.objects.create(first_name='Bob', last_name='Jones')
+        result = data_checks(Worker.objects.all(), self.period)
+        self.assertEqual(result, {'code': 1, 'msg': 'not enough employees in the DB, 3 are needed on the busiest day'})
+
+        Unavailability.objects.create(worker=ann, date=datetime.date(2026, 3, 10))
+        Worker.objects.create(first_name='Cat', last_name='Brown')
+        self.assertEqual(data_checks(Worker.objects.all(), self.period)['code'], 2)
+
+    def test_no_employees(self):
+        self.assertEqual(data_checks(Worker.objects.all(), self.period)['code'], 1)
+
+    def test_teams_are_checked_on_their_own(self):
+        team = Team.objects.create(name='North')
+        ShiftType.objects.create(name='Ward', headcount=1, team=team)
+        Worker.objects.create(first_name='Ann', last_name='Smith', team=team)
+        Worker.objects.create(first_name='Bob', last_name='Jones')
+
+        result = data_checks(Worker.objects.all(), self.period)
+        self.assertEqual(result, {'code': 1, 'msg': 'without team: not enough employees in the DB, 2 are needed on the busiest day'})
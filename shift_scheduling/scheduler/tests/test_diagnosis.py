@@ -0,0 +1,72 @@
+import datetime
+
+from django.test import SimpleTestCase
+
+from scheduler.create_schedule import create_schedule
+from scheduler.demand import DEFAULT_DEMAND
+from scheduler.diagnosis import diagnose_schedule, explain_infeasibility
+from scheduler.models import Worker
+
+
+class DiagnosisTests(SimpleTestCase):
+    period = datetime.date(2026, 3, 1)
+    period_end = datetime.date(2026, 3, 7)
+
+    def setUp(self):
+        self.ann, self.bob, self.cat = [Worker(id=i, first_name=name, last_name='Test') for i, name in enumerate(['Ann', 'Bob', 'Cat'], start=1)]
+        self.employees = [self.ann, self.bob, self.cat]
+
+    def iso_dates(self):
+        return [(self.period + datetime.timedelta(days=day)).isoformat() for day in range(7)]
+
+    def test_too_few_available_workers(self):
+        unavailable = {self.ann.id: ['2026-03-04'], self.bob.id: ['2026-03-04', '2026-03-05']}
+
+        self.assertIsNone(create_schedule(self.period, self.employees, period_end=self.period_end, unavailable=unavailable, demand=DEFAULT_DEMAND))
+        conflicts = diagnose_schedule(self.period, self.employees, self.period_end, unavailable=unavailable, demand=DEFAULT_DEMAND)
+
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0]['date'], '2026-03-04')
+        self.assertEqual(conflicts[0]['rule'], 'coverage')
+        self.assertEqual(conflicts[0]['workers'], ['Ann Test', 'Bob Test'])
+        self.assertIn('only 1 of 3 workers are available, 2 are needed', conflicts[0]['msg'])
+
+    def test_shifts_competing_for_a_worker(self):
+        # every day and every shift has enough eligible workers on its own,
+        # but on the 4th Day and Night both need Ann
+        demand = {
+            'shifts': [
+                {'name': 'Day', 'headcount': 1, 'weekend_headcount': 1, 'eligible': [self.ann.id]},
+                {'name': 'Night', 'headcount': 0, 'weekend_headcount': 0, 'eligible': [self.ann.id]},
+                {'name': 'Late', 'headcount': 1, 'weekend_headcount': 1, 'eligible': [self.bob.id, self.cat.id]},
+            ],
+            'dates': {'2026-03-04': [None, 1, None]},
+        }
+
+        self.assertIsNone(create_schedule(self.period, self.employees, period_end=self.period_end, unavailable={}, demand=demand))
+        conflicts = diagnose_schedule(self.period, self.employees, self.period_end, unavailable={}, demand=demand)
+
+        self.assertEqual(conflicts, [{
+            'date': '2026-03-04',
+            'rule': 'coverage',
+            'workers': [],
+            'msg': "2026-03-04: the eligible workers can't staff the Day, Night shifts at the same time.",
+        }])
+
+    def test_fixed_day_against_eligibility(self):
+        # the right number of workers, but nobody of them may work the Night shift
+        demand = {
+            'shifts': [
+                {'name': 'Day', 'headcount': 1, 'weekend_headcount': 1, 'eligible': None},
+                {'name': 'Night', 'headcount': 1, 'weekend_headcount': 1, 'eligible': [self.ann.id]},
+            ],
+            'dates': {},
+        }
+        fixed = {'2026-03-02': {self.bob.id, self.cat.id}}
+
+        conflicts = explain_infeasibility(self.employees, self.iso_dates(), {}, demand, fixed)
+
+        self.assertEqual([(conflict['date'], conflict['rule']) for conflict in conflicts], [('2026-03-02', 'fixed')])
+
+    def test_feasible_period_has_no_conflicts(self):
+        self.assertEqual(explain_infeasibility(self.employees, self.iso_dates(), {self.ann.id: ['2026-03-04']}, DEFAULT_DEMAND), [])
@@ -0,0 +1,112 @@
+import datetime
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from scheduler.exports import pdf_stream
+from scheduler.models import Worker, Schedule
+
+
+def pdf_objects(data):
+    """
+    Checks the cross-reference table of a PDF and returns {number: body} of
+    its objects.
+    """
+    xref_position = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', data).group(1))
+    assert data[xref_position:].startswith(b'xref\n0 ')
+    size = int(re.search(rb'/Size (\d+)', data[xref_position:]).group(1))
+
+    entries = data[xref_position:].split(b'\n')[3:3 + size - 1]
+    objects = {}
+    for number, entry in enumerate(entries, start=1):
+        offset = int(entry.split()[0])
+        header = b'%d 0 obj\n' % number
+        assert data[offset:offset + len(header)] == header, f'object {number} is not at {offset}'
+        objects[number] = data[offset + len(header):data.index(b'\nendobj\n', offset)]
+
+    return objects
+
+
+class PdfTests(SimpleTestCase):
+    header = ['date', 'id', 'name', 'shift']
+
+    def pdf(self, rows):
+        return b''.join(pdf_stream(iter([self.header, *rows]), 'schedule_2026-01'))
+
+    def pages(self, objects):
+        return [body for body in objects.values() if body.startswith(b'<< /Type /Page ')]
+
+    def test_offsets_and_pages(self):
+        rows = [['2026-01-%02d' % (i % 28 + 1), i, f'Worker ({i})', ''] for i in range(200)]
+        data = self.pdf(rows)
+        objects = pdf_objects(data)
+
+        self.assertTrue(data.startswith(b'%PDF-1.4\n'))
+        pages = self.pages(objects)
+        self.assertGreater(len(pages), 2)
+        self.assertIn(b'/Count %d' % len(pages), objects[2])
+        # every row is on one of the pages, the parentheses escaped
+        self.assertIn(b'Worker \\(199\\)', data)
+        self.assertEqual(data.count(b'(date'), len(pages))
+
+    def test_empty_schedule_gives_one_page(self):
+        objects = pdf_objects(self.pdf([]))
+        self.assertEqual(len(self.pages(objects)), 1)
+        self.assertIn(b'/Count 1', objects[2])
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('planner', password='planner'))
+        ann = Worker.objects.create(first_name='Ann', last_name='Smith')
+        bob = Worker.objects.create(first_name='Bob', last_name='Jones')
+        self.schedule = Schedule.objects.create(schedule_period=datetime.date(2026, 2, 1))
+        self.schedule.set_assignments([
+            {'iso_date': '2026-02-01', 'daily_employees': [{'id': ann.id, 'name': 'Ann Smith'}]},
+            {'iso_date': '2026-02-02', 'daily_employees': [{'id': bob.id, 'name': 'Bob Jones'}, {'id': ann.id, 'name': 'Ann Smith'}]},
+        ])
+        self.ann, self.bob = ann, bob
+
+    def download(self, export_format, **params):
+        return self.client.get(reverse('download_schedule', args=[self.schedule.pk, export_format]), params)
+
+    def csv_lines(self, response):
+        return b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+
+    def test_csv_rows(self):
+        response = self.download('csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="schedule_2026-02.csv"')
+        self.assertEqual(self.csv_lines(response), [
+            'date;id;name;shift',
+            f'2026-02-01;{self.ann.id};Ann Smith;',
+            f'2026-02-02;{self.bob.id};Bob Jones;',
+            f'2026-02-02;{self.ann.id};Ann Smith;',
+        ])
+
+    def test_csv_workers(self):
+        lines = self.csv_lines(self.download('csv', layout='workers'))
+        self.assertEqual(lines[0], 'id;name;' + ';'.join(f'2026-02-{day:02d}' for day in range(1, 29)))
+        self.assertEqual(lines[1], f'{self.ann.id};Ann Smith;x;x' + ';' * 26)
+        self.assertEqual(lines[2], f'{self.bob.id};Bob Jones;;x' + ';' * 26)
+
+    def test_pdf(self):
+        response = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        objects = pdf_objects(b''.join(response.streaming_content))
+        self.assertIn(b'/Count 1', objects[2])
+
+    def test_pdf_has_no_workers_layout(self):
+        self.assertEqual(self.download('pdf', layout='workers').status_code, 404)
+
+    def test_xlsx(self):
+        response = self.download('xlsx')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+    def test_xlsx_without_xlsxwriter(self):
+        with mock.patch('scheduler.exports.xlsxwriter', None):
+            response = self.download('xlsx')
+        self.assertEqual(response.status_code, 501)
+        self.assertIn(b'xlsxwriter', response.content)
@@ -0,0 +1,134 @@
+import datetime
+import itertools
+import random
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from scheduler.create_schedule import create_schedule
+from scheduler.demand import DEFAULT_DEMAND
+from scheduler.flow import AssignmentFlow, shift_count_bounds
+from scheduler.models import Worker
+
+
+# The flow bounds are checked against every complete assignment of small
+# random instances. create_schedule fixes the first fairness objective from
+# them and uses them as the count variables' domains, so a wrong bound would
+# make the model miss its optimum or turn infeasible without any error.
+
+
+def assignments(available, demand):
+    """
+    Every complete assignment of a (workers x days x shifts) availability
+    matrix and a (days x shifts) demand, as (workers x days) 0/1 arrays. A
+    worker takes at most one shift per day.
+    """
+    num_workers, num_days, num_shifts = available.shape
+
+    def day_options(day):
+        options = []
+        for staffing in itertools.product(*(itertools.combinations(np.flatnonzero(available[:, day, shift]).tolist(), int(demand[day, shift])) for shift in range(num_shifts))):
+            workers = [row for rows in staffing for row in rows]
+            if len(workers) == len(set(workers)):
+                options.append(workers)
+        return options
+
+    for days in itertools.product(*(day_options(day) for day in range(num_days))):
+        worked = np.zeros((num_workers, num_days), dtype=np.int64)
+        for day, workers in enumerate(days):
+            worked[workers, day] = 1
+        yield worked
+
+
+def random_instance(rng):
+    num_workers, num_days, num_shifts = rng.randint(2, 4), rng.randint(1, 4), rng.randint(1, 2)
+    available = np.array([rng.random() < 0.7 for _ in range(num_workers * num_days * num_shifts)], dtype=bool).reshape(num_workers, num_days, num_shifts)
+    demand = np.array([rng.randint(0, 2) for _ in range(num_days * num_shifts)], dtype=np.int64).reshape(num_days, num_shifts)
+    offsets = np.array([rng.randint(0, 2) for _ in range(num_workers)], dtype=np.int64)
+    return available, demand, offsets
+
+
+class FlowBruteForceTests(SimpleTestCase):
+    def test_feasible_matches_enumeration(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            available, demand, _ = random_instance(rng)
+            lower = np.array([rng.randint(0, 2) for _ in range(available.shape[0])])
+            upper = lower + np.array([rng.randint(0, 2) for _ in range(available.shape[0])])
+
+            counts = [worked.sum(axis=1) for worked in assignments(available, demand)]
+            network = AssignmentFlow(available, demand)
+
+            self.assertEqual(network.feasible(), bool(counts))
+            self.assertEqual(network.feasible(lower, upper), any(((c >= lower) & (c <= upper)).all() for c in counts))
+
+    def test_shift_count_bounds_match_enumeration(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            available, demand, offsets = random_instance(rng)
+            counts = [offsets + worked.sum(axis=1) for worked in assignments(available, demand)]
+            bounds = shift_count_bounds(available, demand, offsets)
+
+            if not counts:
+                self.assertIsNone(bounds)
+                continue
+
+            lower, upper = bounds
+            self.assertEqual(upper, min(c.max() for c in counts))
+            self.assertEqual(lower, max(c.min() for c in counts))
+
+            # what create_schedule relies on: the smallest spread is upper - lower,
+            # and every assignment with that spread stays within the bounds
+            spread = min(c.max() - c.min() for c in counts)
+            self.assertEqual(spread, upper - lower)
+            for c in counts:
+                if c.max() - c.min() == spread:
+                    self.assertTrue(lower <= c.min() and c.max() <= upper)
+
+    def test_two_dimensional_availability(self):
+        rng = random.Random(2)
+        for _ in range(100):
+            available, demand, offsets = random_instance(rng)
+            self.assertEqual(
+                shift_count_bounds(available[:, :, 0], demand[:, 0], offsets),
+                shift_count_bounds(available[:, :, :1], demand[:, :1], offsets),
+            )
+
+
+class SeededModelBruteForceTests(SimpleTestCase):
+    # create_schedule with the count domains and the first objective taken
+    # from the flow bounds, against the best spreads of every assignment
+
+    def test_fairness_optimum_matches_enumeration(self):
+        rng = random.Random(3)
+        solver_params = {'time_limit': 10, 'num_workers': 4, 'random_seed': 0}
+
+        for _ in range(40):
+            num_workers, num_days = rng.randint(3, 4), rng.randint(3, 6)
+            period = datetime.date(2025, 6, rng.randint(1, 7))
+            period_end = period + datetime.timedelta(days=num_days - 1)
+            dates = [period + datetime.timedelta(days=day) for day in range(num_days)]
+            weekend = np.array([d.weekday() >= 5 for d in dates])
+
+            employees = [Worker(id=i, first_name=f'Worker{i}', last_name='Test') for i in range(1, num_workers + 1)]
+            unavailable = {e.id: [d.isoformat() for d in dates if rng.random() < 0.25] for e in employees}
+            available = np.array([[d.isoformat() not in unavailable[e.id] for d in dates] for e in employees], dtype=bool)
+            headcount = np.full((num_days, 1), 2, dtype=np.int64)
+
+            best = min(
+                ((c := worked.sum(axis=1)).max() - c.min(), (w := worked[:, weekend].sum(axis=1)).max() - w.min())
+                for worked in assignments(available[:, :, np.newaxis], headcount)
+            ) if AssignmentFlow(available, headcount[:, 0]).feasible() else None
+
+            result = create_schedule(
+                period, employees, period_end=period_end, unavailable=unavailable, demand=DEFAULT_DEMAND,
+                shift_interval=1, solver_params=solver_params,
+            )
+
+            if best is None:
+                self.assertIsNone(result)
+                continue
+
+            self.assertIsNotNone(result, f'{unavailable} {period}')
+            schedule_stats = result[2]
+            self.assertEqual((schedule_stats['max_shifts_min_shifts'], schedule_stats['max_wknd_shifts_min_wknd_shifts']), best)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from scheduler.forms import MonthForm
+
+
+class MonthFormTests(SimpleTestCase):
+    def form(self, **data):
+        return MonthForm({'schedule_period': '2026-01', **data})
+
+    def test_solver_options_within_limits(self):
+        form = self.form(time_limit=settings.SCHEDULER_MAX_TIME_LIMIT, num_workers=settings.SCHEDULER_MAX_NUM_WORKERS, portfolio_size=settings.SCHEDULER_MAX_PORTFOLIO_SIZE)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.solver_options(), {
+            'time_limit': settings.SCHEDULER_MAX_TIME_LIMIT,
+            'num_workers': settings.SCHEDULER_MAX_NUM_WORKERS,
+            'portfolio_size': settings.SCHEDULER_MAX_PORTFOLIO_SIZE,
+        })
+
+    def test_solver_options_above_limits(self):
+        form = self.form(time_limit=settings.SCHEDULER_MAX_TIME_LIMIT + 1, num_workers=settings.SCHEDULER_MAX_NUM_WORKERS + 1, portfolio_size=settings.SCHEDULER_MAX_PORTFOLIO_SIZE + 1)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'time_limit', 'num_workers', 'portfolio_size'})
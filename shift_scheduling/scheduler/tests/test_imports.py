@@ -0,0 +1,175 @@
+import datetime
+import io
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from scheduler.imports import import_workers_file, openpyxl
+from scheduler.models import Worker, Unavailability
+
+
+SINCE = datetime.date(2026, 1, 1)
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def xlsx_file(rows):
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+class ImportWorkersTests(TestCase):
+    def setUp(self):
+        self.existing = Worker.objects.create(first_name='Ann', last_name='Old', external_id='hr-1')
+        Unavailability.objects.create(worker=self.existing, date=datetime.date(2026, 1, 5))
+        Unavailability.objects.create(worker=self.existing, date=datetime.date(2026, 1, 6))
+        # before since, kept whatever the file says
+        Unavailability.objects.create(worker=self.existing, date=datetime.date(2025, 12, 24))
+
+    def dates(self, worker):
+        return sorted(d.isoformat() for d in worker.unavailabilities.values_list('date', flat=True))
+
+    def test_csv(self):
+        report = import_workers_file(csv_file(
+            'External ID;First name;Last name;Assign least shifts;Unavailable dates\n'
+            'hr-1;Ann;New;yes;2026-01-05 2026-01-07\n'
+            '\n'
+            'hr-2;Bob;Smith;;2026-01-09, 2026-01-10\n'
+        ), 'csv', SINCE)
+
+        self.assertTrue(report['saved'])
+        self.assertEqual(report['columns'], ['external_id', 'first_name', 'last_name', 'assign_least_shifts', 'unavailable_dates'])
+        self.assertEqual((report['rows'], report['created'], report['updated']), (2, 1, 1))
+        # 2026-01-05 was there already, only the other three are new
+        self.assertEqual(report['unavailable_dates'], 3)
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.last_name, self.existing.assign_least_shifts), ('New', True))
+        self.assertEqual(self.dates(self.existing), ['2025-12-24', '2026-01-05', '2026-01-07'])
+        self.assertEqual(self.dates(Worker.objects.get(external_id='hr-2')), ['2026-01-09', '2026-01-10'])
+
+    def test_xlsx(self):
+        report = import_workers_file(xlsx_file([
+            ['external_id', 'first_name', 'last_name', 'assign_least_weekends', 'unavailable_dates'],
+            ['hr-2', 'Bob', 'Smith', True, datetime.datetime(2026, 1, 9)],
+            [None, None, None, None, None],
+            [17.0, 'Cat', 'Jones', 'x', '2026-01-10;2026-01-11'],
+        ]), 'xlsx', SINCE)
+
+        self.assertTrue(report['saved'])
+        self.assertEqual((report['rows'], report['created'], report['unavailable_dates']), (2, 2, 3))
+        bob = Worker.objects.get(external_id='hr-2')
+        self.assertTrue(bob.assign_least_weekends)
+        self.assertEqual(self.dates(bob), ['2026-01-09'])
+        # a whole number read as a float is still an id
+        self.assertEqual(self.dates(Worker.objects.get(external_id='17')), ['2026-01-10', '2026-01-11'])
+
+    def test_errors_roll_back_every_row(self):
+        report = import_workers_file(csv_file(
+            'external_id,first_name,last_name,unavailable_dates\n'
+            'hr-1,Ann,New,\n'
+            'hr-2,,Smith,\n'
+            'hr-3,Cat,Jones,2026-13-01\n'
+        ), 'csv', SINCE)
+
+        self.assertFalse(report['saved'])
+        self.assertEqual(report['error_count'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertIn('first_name', report['errors'][0]['errors'])
+        self.assertIn('unavailable_dates', report['errors'][1]['errors'])
+
+        # the valid first row wasn't saved either
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.last_name, 'Old')
+        self.assertEqual(self.dates(self.existing), ['2025-12-24', '2026-01-05', '2026-01-06'])
+        self.assertEqual(Worker.objects.count(), 1)
+
+    def test_dry_run_counts_without_saving(self):
+        report = import_workers_file(csv_file(
+            'external_id,first_name,last_name,unavailable_dates\n'
+            'hr-1,Ann,New,2026-01-05 2026-01-06\n'
+            'hr-2,Bob,Smith,2026-01-09\n'
+        ), 'csv', SINCE, dry_run=True)
+
+        self.assertFalse(report['saved'])
+        self.assertEqual((report['created'], report['updated'], report['unavailable_dates']), (1, 1, 1))
+        self.assertEqual(Worker.objects.count(), 1)
+        self.assertEqual(self.dates(self.existing), ['2025-12-24', '2026-01-05', '2026-01-06'])
+
+    def test_duplicate_keys_are_rejected(self):
+        report = import_workers_file(csv_file(
+            'id,external_id,first_name,last_name\n'
+            ',hr-2,Bob,Smith\n'
+            ',hr-2,Bob,Smythe\n'
+            f'{self.existing.id},,Ann,New\n'
+            f'{self.existing.id},,Ann,Newer\n'
+            '999,,Nobody,Here\n'
+        ), 'csv', SINCE)
+
+        self.assertFalse(report['saved'])
+        self.assertEqual([error['line'] for error in report['errors']], [3, 5, 6])
+        self.assertEqual(report['errors'][0]['errors'], {'external_id': ['A previous row has the same external_id.']})
+        self.assertEqual(report['errors'][1]['errors'], {'id': ['A previous row has the same id.']})
+        self.assertEqual(report['errors'][2]['errors'], {'id': ['No such worker.']})
+
+    def test_missing_column(self):
+        with self.assertRaisesMessage(ValueError, 'no last_name column'):
+            import_workers_file(csv_file('first_name\nAnn\n'), 'csv', SINCE)
+
+
+class ImportWorkersCommandTests(TestCase):
+    def import_file(self, text, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'workers.csv')
+            with open(path, 'w') as f:
+                f.write(text)
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_workers', path, *args, stdout=stdout, stderr=stderr)
+            return stdout.getvalue()
+
+    def test_import(self):
+        output = self.import_file('first_name,last_name,unavailable_dates\nAnn,Smith,2099-01-01\n', '--unavailable-since', '2026-01-01')
+        self.assertIn('1 rows: 1 created, 0 updated, 1 new unavailable dates', output)
+        self.assertEqual(Worker.objects.count(), 1)
+
+    def test_dry_run(self):
+        output = self.import_file('first_name,last_name\nAnn,Smith\n', '--dry-run')
+        self.assertIn('dry run, nothing was saved', output)
+        self.assertEqual(Worker.objects.count(), 0)
+
+    def test_errors(self):
+        with self.assertRaisesMessage(CommandError, '1 of 2 rows have errors'):
+            self.import_file('first_name,last_name\nAnn,Smith\n,Smith\n')
+        self.assertEqual(Worker.objects.count(), 0)
+
+
+class ImportWorkersViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('planner', password='planner'))
+
+    def upload(self, name, content, **data):
+        return self.client.post(reverse('workers_import'), {'file': SimpleUploadedFile(name, content), **data})
+
+    def test_upload(self):
+        response = self.upload('workers.csv', b'first_name,last_name\nAnn,Smith\nBob,Jones\n')
+        self.assertContains(response, 'Imported')
+        self.assertContains(response, '2 new employees')
+        self.assertEqual(Worker.objects.count(), 2)
+
+    def test_unknown_file_type(self):
+        response = self.upload('workers.txt', b'first_name,last_name\n')
+        self.assertContains(response, 'Unknown file type .txt')
+        self.assertEqual(Worker.objects.count(), 0)
@@ -0,0 +1,62 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from scheduler import jobs
+from scheduler.incremental import resolve_schedule_delta
+from scheduler.models import Worker, Schedule, Unavailability
+
+
+TEST_SOLVER = {'time_limit': 5, 'num_workers': 1, 'random_seed': 0}
+
+
+@override_settings(SCHEDULER_SOLVER=TEST_SOLVER, SCHEDULER_SOLVER_PORTFOLIO=[], SCHEDULER_DELTA_SOLVER={'time_limit': 1, 'num_workers': 2})
+class ScheduleDeltaTests(TestCase):
+    period = datetime.date(2025, 2, 1)
+
+    def setUp(self):
+        self.workers = [Worker.objects.create(first_name=f'Worker{i}', last_name='Test') for i in range(6)]
+        _, job = jobs.get_or_enqueue_schedule_job(self.period)
+        jobs.claim_next_job()
+        jobs.execute_job(job.pk)
+        job.refresh_from_db()
+        self.schedule = Schedule.objects.get(pk=job.schedule_id)
+
+    def working_on(self, schedule, date):
+        return set(schedule.assignments.filter(date=date).values_list('worker_id', flat=True))
+
+    def test_unavailable_date_is_saved(self):
+        date = self.period + datetime.timedelta(days=10)
+        worker = Worker.objects.get(pk=min(self.working_on(self.schedule, date)))
+
+        new_schedule = resolve_schedule_delta(self.schedule, 'unavailable', worker, date, **jobs.get_solve_options())
+
+        self.assertNotIn(worker.id, self.working_on(new_schedule, date))
+        self.assertTrue(Unavailability.objects.filter(worker=worker, date=date).exists())
+        self.assertFalse(worker.is_available_on(date))
+
+    def test_swap_with_a_worker_outside_the_schedule_is_refused(self):
+        date = self.period + datetime.timedelta(days=10)
+        worker = Worker.objects.get(pk=min(self.working_on(self.schedule, date)))
+        newcomer = Worker.objects.create(first_name='New', last_name='Hire')
+
+        with self.assertRaisesMessage(ValueError, 'New Hire is not part of this schedule'):
+            resolve_schedule_delta(self.schedule, 'swap', worker, date, other_worker=newcomer, **jobs.get_solve_options())
+
+    def test_view_uses_delta_solver_limits(self):
+        user = User.objects.create_user('planner', password='planner')
+        self.client.force_login(user)
+        date = self.period + datetime.timedelta(days=10)
+        worker_id = min(self.working_on(self.schedule, date))
+
+        with mock.patch('scheduler.views.resolve_schedule_delta', return_value=self.schedule) as resolve:
+            response = self.client.post(
+                reverse('schedule_delta', args=[self.schedule.pk]),
+                {'delta_type': 'unavailable', 'worker': worker_id, 'date': date.isoformat()},
+            )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(resolve.call_args.kwargs['solver_params'], {**TEST_SOLVER, 'time_limit': 1, 'num_workers': 2})
@@ -0,0 +1,154 @@
+import datetime
+import io
+import os
+import signal
+import time
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scheduler import jobs
+from scheduler.teams import solve_teams
+from scheduler.models import Worker, Unavailability, Schedule, SolveJob
+
+
+TEST_SOLVER = {'time_limit': 5, 'num_workers': 1, 'random_seed': 0}
+
+
+def crash_or_wait(job_id):
+    # stands in for execute_job in the worker's pool processes, which can't
+    # see the test database
+    if job_id == int(os.environ['CRASH_JOB']):
+        os.kill(os.getpid(), signal.SIGKILL)
+    time.sleep(2)
+
+
+@override_settings(SCHEDULER_SOLVER=TEST_SOLVER, SCHEDULER_SOLVER_PORTFOLIO=[], SCHEDULER_CACHE_RESULTS=True)
+class JobFingerprintTests(TestCase):
+    period = datetime.date(2025, 2, 1)
+
+    def setUp(self):
+        self.workers = [Worker.objects.create(first_name=f'Worker{i}', last_name='Test') for i in range(6)]
+
+    def run_job(self, job, solve=solve_teams):
+        jobs.claim_next_job()
+        with mock.patch('scheduler.jobs.solve_teams', side_effect=solve):
+            jobs.execute_job(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_cached_schedule_is_reused(self):
+        _, job = jobs.get_or_enqueue_schedule_job(self.period)
+        job = self.run_job(job)
+
+        self.assertEqual(job.status, SolveJob.DONE)
+        cached, new_job = jobs.get_or_enqueue_schedule_job(self.period)
+        self.assertEqual(cached, job.schedule)
+        self.assertIsNone(new_job)
+
+    def test_edit_during_solve_is_not_cached(self):
+        _, job = jobs.get_or_enqueue_schedule_job(self.period)
+        enqueued_fingerprint = job.input_fingerprint
+
+        def solve_then_edit(*args, **kwargs):
+            # someone marks a worker unavailable while the solver runs
+            result = solve_teams(*args, **kwargs)
+            Unavailability.objects.create(worker=self.workers[0], date=self.period)
+            return result
+
+        job = self.run_job(job, solve_then_edit)
+        self.assertEqual(job.status, SolveJob.DONE)
+
+        # the stored schedule describes the data it was solved from
+        schedule = Schedule.objects.get(pk=job.schedule_id)
+        self.assertEqual(schedule.input_fingerprint, enqueued_fingerprint)
+
+        # and a request with the edited data is solved again
+        cached, new_job = jobs.get_or_enqueue_schedule_job(self.period)
+        self.assertIsNone(cached)
+        self.assertNotEqual(new_job.pk, job.pk)
+        self.assertNotEqual(new_job.input_fingerprint, enqueued_fingerprint)
+
+
+@override_settings(SCHEDULER_SOLVER=TEST_SOLVER, SCHEDULER_SOLVER_PORTFOLIO=[], SCHEDULER_CACHE_RESULTS=True, SCHEDULER_JOB_STALE_AFTER=120)
+class StaleJobTests(TestCase):
+    period = datetime.date(2025, 2, 1)
+
+    def setUp(self):
+        for i in range(6):
+            Worker.objects.create(first_name=f'Worker{i}', last_name='Test')
+
+    def start_job(self, heartbeat_age):
+        _, job = jobs.get_or_enqueue_schedule_job(self.period)
+        jobs.claim_next_job()
+        heartbeat = timezone.now() - datetime.timedelta(seconds=heartbeat_age)
+        SolveJob.objects.filter(pk=job.pk).update(started_at=heartbeat, heartbeat_at=heartbeat)
+        return job
+
+    def test_running_job_is_shared(self):
+        job = self.start_job(heartbeat_age=10)
+
+        _, same_job = jobs.get_or_enqueue_schedule_job(self.period)
+        self.assertEqual(same_job.pk, job.pk)
+        self.assertEqual(jobs.recover_stale_jobs(), 0)
+
+    def test_stale_job_is_failed_and_requested_again(self):
+        job = self.start_job(heartbeat_age=600)
+
+        _, new_job = jobs.get_or_enqueue_schedule_job(self.period)
+        self.assertNotEqual(new_job.pk, job.pk)
+        self.assertEqual(new_job.status, SolveJob.QUEUED)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SolveJob.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_job_without_heartbeat_goes_by_start_time(self):
+        job = self.start_job(heartbeat_age=600)
+        SolveJob.objects.filter(pk=job.pk).update(heartbeat_at=None)
+
+        self.assertEqual(jobs.recover_stale_jobs(), 1)
+
+
+@override_settings(SCHEDULER_JOB_STALE_AFTER=120)
+class SolverWorkerTests(TestCase):
+    period = datetime.date(2025, 2, 1)
+
+    def run_worker(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('run_solver_worker', processes=2, poll_interval=0.1, once=True, stdout=stdout, stderr=stderr)
+        return stderr.getvalue()
+
+    def test_killed_process_fails_only_its_job(self):
+        crashing = jobs.enqueue_schedule_job(self.period)
+        innocent = jobs.enqueue_schedule_job(self.period + datetime.timedelta(days=28))
+        later = jobs.enqueue_schedule_job(self.period + datetime.timedelta(days=59))
+
+        with mock.patch('scheduler.management.commands.run_solver_worker.execute_job', crash_or_wait), \
+                mock.patch.dict(os.environ, {'CRASH_JOB': str(crashing.pk)}):
+            stderr = self.run_worker()
+
+        self.assertIn(f'Job {crashing.pk} failed', stderr)
+        crashing.refresh_from_db()
+        self.assertEqual(crashing.status, SolveJob.FAILED)
+        self.assertIn('killed', crashing.error_msg)
+
+        # the other jobs ran to the end in processes of their own (crash_or_wait
+        # doesn't finish them, that is execute_job's part)
+        for job in [innocent, later]:
+            job.refresh_from_db()
+            self.assertEqual(job.status, SolveJob.RUNNING)
+            self.assertNotIn(f'Job {job.pk} failed', stderr)
+
+    def test_job_goes_back_to_the_queue_if_it_cant_be_started(self):
+        job = jobs.enqueue_schedule_job(self.period)
+
+        with mock.patch('scheduler.management.commands.run_solver_worker.ProcessPoolExecutor.submit', side_effect=OSError('no more processes')):
+            stderr = self.run_worker()
+
+        self.assertIn('could not be started', stderr)
+        job.refresh_from_db()
+        self.assertEqual(job.status, SolveJob.QUEUED)
+        self.assertIsNone(job.started_at)
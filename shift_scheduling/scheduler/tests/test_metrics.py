@@ -0,0 +1,34 @@
+import datetime
+import logging
+
+from django.test import SimpleTestCase, TestCase
+
+from scheduler.metrics import log_solve, logger, prometheus_text
+from scheduler.models import Schedule
+
+
+class PrometheusTextTests(TestCase):
+    def test_solver_sums_are_gauges(self):
+        for branches, conflicts in [(100, 10), (50, 5)]:
+            Schedule.objects.create(schedule_period=datetime.date(2025, 1, 1), branches=branches, conflicts=conflicts)
+
+        lines = prometheus_text().splitlines()
+        self.assertIn('# TYPE scheduler_solver_branches gauge', lines)
+        self.assertIn('# TYPE scheduler_solver_conflicts gauge', lines)
+        self.assertIn('scheduler_solver_branches 150', lines)
+        self.assertIn('scheduler_solver_conflicts 15', lines)
+
+        # deleting a schedule lowers them, which a counter must never do
+        Schedule.objects.filter(branches=100).delete()
+        self.assertIn('scheduler_solver_branches 50', prometheus_text().splitlines())
+
+
+class SolveLogTests(SimpleTestCase):
+    def test_solves_are_logged_without_output(self):
+        stage = {'stage': 'obj_1', 'status': 'OPTIMAL', 'wall_time': 0.5}
+        with self.assertLogs('scheduler.solver', 'INFO') as logs:
+            log_solve(datetime.date(2026, 1, 1), datetime.date(2026, 1, 31), 5, {'variables': 10, 'constraints': 4}, 0.1, [stage])
+
+        self.assertEqual(logs.records[0].solve_metrics['status'], 'OPTIMAL')
+        # the deployment attaches handlers, by default there is only the null one
+        self.assertEqual([type(handler) for handler in logger.handlers], [logging.NullHandler])
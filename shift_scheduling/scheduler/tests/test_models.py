@@ -0,0 +1,110 @@
+import datetime
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from scheduler.create_schedule import create_schedule
+from scheduler.demand import DEFAULT_DEMAND
+from scheduler.models import Worker, Schedule, schedule_roster
+
+
+class ScheduleAssignmentTests(TestCase):
+    period = datetime.date(2026, 2, 1)
+
+    def store(self, per_day_schedule, per_employee_schedule):
+        schedule = Schedule.objects.create(
+            schedule_period=self.period,
+            per_day_schedule=per_day_schedule,
+            per_employee_schedule=per_employee_schedule,
+            roster=schedule_roster(per_employee_schedule),
+        )
+        schedule.set_assignments(per_day_schedule)
+        return schedule
+
+    def test_rows_match_the_json_copy(self):
+        workers = [Worker.objects.create(first_name=f'Worker{i}', last_name='Test') for i in range(5)]
+        unavailable = {workers[0].id: [(self.period + datetime.timedelta(days=day)).isoformat() for day in range(10)]}
+        per_day_schedule, per_employee_schedule, _ = create_schedule(
+            self.period, workers, unavailable=unavailable, demand=DEFAULT_DEMAND, solver_params={'time_limit': 5, 'num_workers': 1},
+        )
+        schedule = self.store(per_day_schedule, per_employee_schedule)
+
+        self.assertEqual(schedule.per_day(), per_day_schedule)
+
+        per_employee = {employee['id']: employee for employee in schedule.per_employee()}
+        for employee in per_employee_schedule:
+            days = employee['days']
+            self.assertEqual(per_employee[employee['id']]['days'], days)
+            self.assertEqual(per_employee[employee['id']]['shifts'], len(days))
+            self.assertEqual(
+                per_employee[employee['id']]['weekend_shifts'],
+                sum(datetime.date.fromisoformat(d).weekday() >= 5 for d in days),
+            )
+
+    def test_workers_without_shifts_are_listed(self):
+        ann = Worker.objects.create(first_name='Ann', last_name='Smith')
+        bob = Worker.objects.create(first_name='Bob', last_name='Jones')
+        schedule = self.store(
+            [{'iso_date': '2026-02-01', 'daily_employees': [{'id': bob.id, 'name': 'Bob Jones'}]}],
+            [{'id': ann.id, 'name': 'Ann Smith', 'days': []}, {'id': bob.id, 'name': 'Bob Jones', 'days': ['2026-02-01']}],
+        )
+
+        self.assertEqual(schedule.per_employee(), [
+            {'id': ann.id, 'name': 'Ann Smith', 'days': [], 'shifts': 0, 'weekend_shifts': 0},
+            {'id': bob.id, 'name': 'Bob Jones', 'days': ['2026-02-01'], 'shifts': 1, 'weekend_shifts': 1},
+        ])
+
+
+class AssignmentMigrationTests(TransactionTestCase):
+    # 0021 copies the JSON days into Assignment rows, 0027 the JSON workers
+    # into the roster
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('scheduler', target)])
+        return executor.loader.project_state([('scheduler', target)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        apps = self.migrate('0020_shift_types')
+        worker = apps.get_model('scheduler', 'Worker').objects.create(first_name='Ann', last_name='Smith')
+        schedule = apps.get_model('scheduler', 'Schedule').objects.create(
+            schedule_period=datetime.date(2026, 2, 1),
+            per_day_schedule=[
+                {'iso_date': '2026-02-01', 'daily_employees': [{'id': worker.id, 'name': 'Ann Smith'}, {'id': 999, 'name': 'Gone Worker'}]},
+                {'iso_date': '2026-02-02', 'daily_employees': [{'id': worker.id, 'name': 'Ann Smith', 'shift': 'Night'}]},
+            ],
+            per_employee_schedule=[
+                {'id': worker.id, 'name': 'Ann Smith', 'days': ['2026-02-01', '2026-02-02']},
+                {'id': 999, 'name': 'Gone Worker', 'days': ['2026-02-01']},
+                {'id': 1000, 'name': 'Idle Worker', 'days': []},
+            ],
+            schedule_stats={},
+        )
+
+        apps = self.migrate('0021_assignment')
+        rows = apps.get_model('scheduler', 'Assignment').objects.filter(schedule_id=schedule.id).order_by('date', 'id')
+        self.assertEqual(
+            [(row.date.isoformat(), row.worker_id, row.worker_name, row.shift) for row in rows],
+            [
+                ('2026-02-01', worker.id, 'Ann Smith', ''),
+                # the worker was deleted, the name is kept
+                ('2026-02-01', None, 'Gone Worker', ''),
+                ('2026-02-02', worker.id, 'Ann Smith', 'Night'),
+            ],
+        )
+
+        self.migrate('0027_schedule_roster')
+        schedule = Schedule.objects.get(pk=schedule.id)
+        self.assertEqual(schedule.roster, [
+            {'id': worker.id, 'name': 'Ann Smith'}, {'id': 999, 'name': 'Gone Worker'}, {'id': 1000, 'name': 'Idle Worker'},
+        ])
+        self.assertEqual(
+            [(employee['id'], employee['name'], employee['shifts']) for employee in schedule.per_employee()],
+            [(worker.id, 'Ann Smith', 2), (None, 'Gone Worker', 1), (1000, 'Idle Worker', 0)],
+        )
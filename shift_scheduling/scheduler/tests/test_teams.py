@@ -0,0 +1,101 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from scheduler import incremental, jobs
+from scheduler.models import Team, Worker, Schedule, ShiftType
+from scheduler.teams import merge_team_results, solve_teams, team_groups
+
+
+TEST_SOLVER = {'time_limit': 5, 'num_workers': 1, 'random_seed': 0}
+
+
+@override_settings(SCHEDULER_SOLVER=TEST_SOLVER, SCHEDULER_SOLVER_PORTFOLIO=[])
+class TeamTests(TestCase):
+    period = datetime.date(2025, 2, 1)
+
+    def setUp(self):
+        # the north team staffs one worker a day, the south team has no shift
+        # types and the default two
+        self.north, self.south = Team.objects.create(name='North'), Team.objects.create(name='South')
+        ShiftType.objects.create(name='Day', headcount=1, team=self.north)
+        self.north_workers = [Worker.objects.create(first_name=f'North{i}', last_name='Test', team=self.north) for i in range(3)]
+        self.south_workers = [Worker.objects.create(first_name=f'South{i}', last_name='Test', team=self.south) for i in range(5)]
+
+    def team_counts(self, per_day_schedule, workers):
+        ids = {e.id for e in workers}
+        return {len([employee for employee in day_data['daily_employees'] if employee['id'] in ids]) for day_data in per_day_schedule}
+
+    def solve_job(self):
+        _, job = jobs.get_or_enqueue_schedule_job(self.period)
+        jobs.claim_next_job()
+        jobs.execute_job(job.pk)
+        job.refresh_from_db()
+        return Schedule.objects.get(pk=job.schedule_id)
+
+    def test_every_team_gets_its_demand(self):
+        period_end = self.period + datetime.timedelta(days=13)
+        per_day_schedule, per_employee_schedule, schedule_stats = solve_teams(
+            self.period, period_end, Worker.objects.all(), [TEST_SOLVER], processes=2, unavailable={},
+        )
+
+        self.assertEqual(self.team_counts(per_day_schedule, self.north_workers), {1})
+        self.assertEqual(self.team_counts(per_day_schedule, self.south_workers), {2})
+        self.assertEqual(len(per_employee_schedule), 8)
+
+        teams = schedule_stats['teams']
+        self.assertEqual([(team['name'], team['workers']) for team in teams], [('North', 3), ('South', 5)])
+        for key in ['max_shifts_min_shifts', 'max_wknd_shifts_min_wknd_shifts']:
+            self.assertEqual(schedule_stats[key], max(team[key] for team in teams))
+
+    def test_stats_are_the_worst_of_the_teams(self):
+        def result(iso_date, worker, spread, weekend_spread, interval, violations):
+            stats = {
+                'max_shifts_min_shifts': spread,
+                'max_wknd_shifts_min_wknd_shifts': weekend_spread,
+                'interval_violations': violations,
+                'shift_violations': [],
+                'wknd_shift_violations': [],
+                'theoretical_intervals': interval,
+            }
+            employee = {'id': worker.id, 'name': str(worker)}
+            return [{'iso_date': iso_date, 'daily_employees': [employee]}], [{**employee, 'days': [iso_date]}], stats
+
+        groups = team_groups(Worker.objects.all())
+        per_day_schedule, _, schedule_stats = merge_team_results(groups, [
+            result('2025-02-01', self.north_workers[0], 2, 0, 3, ['north']),
+            result('2025-02-01', self.south_workers[0], 1, 1, 2, ['south']),
+        ])
+
+        self.assertEqual(schedule_stats['max_shifts_min_shifts'], 2)
+        self.assertEqual(schedule_stats['max_wknd_shifts_min_wknd_shifts'], 1)
+        self.assertEqual(schedule_stats['theoretical_intervals'], 2)
+        self.assertEqual(schedule_stats['interval_violations'], ['north', 'south'])
+        self.assertEqual([team['theoretical_intervals'] for team in schedule_stats['teams']], [3, 2])
+        self.assertEqual(len(per_day_schedule[0]['daily_employees']), 2)
+
+    def test_delta_solves_only_the_workers_team(self):
+        schedule = self.solve_job()
+        date = self.period + datetime.timedelta(days=10)
+        worker = next(e for e in self.north_workers if schedule.assignments.filter(worker=e, date=date).exists())
+        south_ids = [e.id for e in self.south_workers]
+
+        with mock.patch('scheduler.incremental.create_schedule', wraps=incremental.create_schedule) as create:
+            new_schedule = incremental.resolve_schedule_delta(schedule, 'unavailable', worker, date, **jobs.get_solve_options())
+
+        self.assertEqual({e.id for e in create.call_args.args[1]}, {e.id for e in self.north_workers})
+        self.assertFalse(new_schedule.assignments.filter(worker=worker, date=date).exists())
+        self.assertEqual(self.team_counts(new_schedule.per_day(), self.north_workers), {1})
+
+        # the south team's shifts are kept as they were
+        def south_days(s):
+            return sorted(s.assignments.filter(worker_id__in=south_ids).values_list('date', 'worker_id'))
+        self.assertEqual(south_days(new_schedule), south_days(schedule))
+
+    def test_swap_across_teams_is_refused(self):
+        schedule = self.solve_job()
+        date = self.period + datetime.timedelta(days=10)
+
+        with self.assertRaisesMessage(ValueError, 'are in different teams'):
+            incremental.resolve_schedule_delta(schedule, 'swap', self.north_workers[0], date, other_worker=self.south_workers[0])
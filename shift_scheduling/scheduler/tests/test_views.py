@@ -0,0 +1,41 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from scheduler.models import Schedule
+
+
+class ScheduleListSearchTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('planner', password='planner'))
+        # two pages of 2025 and one schedule of March 2026 on the last page
+        for month in range(1, 13):
+            Schedule.objects.create(schedule_period=datetime.date(2025, month, 1))
+        for month in range(1, 13):
+            Schedule.objects.create(schedule_period=datetime.date(2024, month, 1))
+        self.march = Schedule.objects.create(schedule_period=datetime.date(2026, 3, 1))
+        self.spring = Schedule.objects.create(schedule_period=datetime.date(2026, 1, 1), period_end=datetime.date(2026, 4, 30))
+
+    def search(self, query, page=1):
+        return self.client.get(reverse('schedules'), {'q': query, 'page': page}).context['schedule_list']
+
+    def test_search_covers_all_pages(self):
+        self.assertEqual(list(self.search('2026')), [self.march, self.spring])
+        self.assertEqual(list(self.search('march 2026')), [self.march])
+        self.assertEqual(len(self.search('feb')), 2)
+
+    def test_search_matches_either_end_of_a_range(self):
+        self.assertIn(self.spring, self.search('April'))
+        self.assertIn(self.spring, self.search('January 2026 - April 2026'))
+
+    def test_search_paginates(self):
+        self.assertEqual(len(self.search('202')), 10)
+        response = self.client.get(reverse('schedules'), {'q': '2025'})
+        self.assertContains(response, '?page=2&amp;q=2025')
+        self.assertEqual(len(self.search('2025', page=2)), 2)
+
+    def test_no_match(self):
+        response = self.client.get(reverse('schedules'), {'q': 'smarch'})
+        self.assertContains(response, 'No schedules match')
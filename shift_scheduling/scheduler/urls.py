@@ -1,19 +1,28 @@
 from django.contrib.auth.decorators import login_required
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('', views.CreateSchedule, name='create_schedule'),
     path('schedule/<int:pk>', views.DisplaySchedule, name='display_schedule'),
+    path('schedule/<int:pk>/change/', views.schedule_delta, name='schedule_delta'),
+    path('schedule/<int:pk>/replan/', views.replan_schedule, name='schedule_replan'),
     path('schedule/<int:pk>/delete/', views.ScheduleDeleteView.as_view(), name='schedule_delete'),
     path('schedules/', views.ScheduleListView.as_view(), name='schedules'),
+    path('schedule/job/<int:pk>', views.ScheduleJob, name='schedule_job'),
+    path('schedule/job/<int:pk>/status', views.schedule_job_status, name='schedule_job_status'),
+    path('schedule/job/<int:pk>/events', views.schedule_job_events, name='schedule_job_events'),
+    path('schedule/job/<int:pk>/stop', views.stop_schedule_job, name='schedule_job_stop'),
     
     path('worker/create/', views.WorkerCreateView.as_view(), name='worker_create'),
+    path('workers/import/', views.import_workers, name='workers_import'),
     path('worker/<int:pk>/', views.worker_data, name='worker_data'),
     path('worker/<int:pk>/delete/', views.WorkerDeleteView.as_view(), name='worker_delete'),
     path('workers/', views.WorkerListView.as_view(), name='workers'),
 
     path('schedule/<int:pk>/download_csv', views.download_schedule_csv, name="download_schedule_csv"),
+    path('schedule/<int:pk>/download/<str:export_format>', views.download_schedule, name="download_schedule"),
+    path('schedules/export', views.export_schedules, name='export_schedules'),
 
     path('workers/action/confirm', views.worker_bulk_action_confirm, name='workers_bulk_action_confirm'),
     path('workers/action', views.worker_bulk_action, name='workers_bulk_action'),
@@ -21,5 +30,12 @@ urlpatterns = [
     path('schedules/action/confirm', views.schedules_bulk_action_confirm, name='schedules_bulk_action_confirm'),
     path('schedules/action', views.schedules_bulk_action, name='schedules_bulk_action'),
 
+    path('api/workers', api.workers, name='api_workers'),
+    path('api/workers/bulk', api.workers_bulk, name='api_workers_bulk'),
+    path('api/solve', api.solve, name='api_solve'),
+    path('api/jobs/<int:pk>', api.job, name='api_job'),
+    path('api/schedules/<int:pk>', api.schedule, name='api_schedule'),
+    path('api/metrics', api.metrics, name='api_metrics'),
+
     
 ]
@@ -1,17 +1,23 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponseRedirect, HttpResponse
-from .models import Worker, Schedule
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse, StreamingHttpResponse, FileResponse, HttpResponseBadRequest, Http404
+from .models import Worker, Schedule, SolveJob, Unavailability
 from django.views import generic
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from .forms import WorkerDataForm, MonthForm
+from .forms import WorkerDataForm, WorkerImportForm, MonthForm, ScheduleDeltaForm, ScheduleExportForm
 import json
-from .create_schedule import create_schedule
 from .data_checks import data_checks
-import csv
+from .jobs import get_or_enqueue_schedule_job, job_status, get_solve_options, request_stop, invalidate_cached_schedules
+from .incremental import resolve_schedule_delta
+from .imports import import_format, import_workers_file
+from .exports import EXPORT_FORMATS, EXPORT_LAYOUTS, export_assignments, export_dates, assignment_rows, worker_rows, csv_stream, xlsx_file, pdf_stream
+import time
+import calendar
 from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.db.models import Q
 
 @login_required
 def index(request):
@@ -60,7 +66,7 @@ def worker_data(request, pk):
     else:
         form = WorkerDataForm(instance=worker)
     
-    initial_dates_json = json.dumps(worker.unavailable_dates or [])
+    initial_dates_json = json.dumps(form.fields['unavailable_dates'].initial or [])
     context = {
         'form': form,
         'worker': worker,
@@ -81,10 +87,32 @@ class WorkerDeleteView(LoginRequiredMixin, DeleteView):
         except:
             return HttpResponseRedirect('worker_delete', kwargs={'pk': self.object.pk})
 
+@login_required
+def import_workers(request):
+    # a CSV/XLSX file of workers in one transaction, see imports.py
+    report = None
+
+    if request.method == 'POST':
+        form = WorkerImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            file = form.cleaned_data['file']
+            try:
+                report = import_workers_file(
+                    file,
+                    import_format(file.name),
+                    since=form.cleaned_data['unavailable_since'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except ValueError as error:
+                form.add_error('file', str(error))
+    else:
+        form = WorkerImportForm()
+
+    return render(request, 'worker_import.html', context={'form': form, 'report': report})
+
 @login_required
 def CreateSchedule(request):
     data_error_msg = ''
-    solver = 'successful'
     
 
     if request.method == 'POST':
@@ -98,26 +126,20 @@ def CreateSchedule(request):
 
             employees = Worker.objects.all()
             schedule_period = form.cleaned_data['schedule_period']
+            period_end = form.cleaned_data['period_end']
 
-            test_results = data_checks(employees, schedule_period)
+            test_results = data_checks(employees, schedule_period, period_end)
 
             if test_results['code'] == 0:
 
-                result = create_schedule(schedule_period, employees)
-
-                if result == None:
-                    solver = 'unsuccessful'
-                    
-                else:
-                    per_day_schedule, per_employee_schedule, schedule_stats = result
-                    new_schedule = Schedule.objects.create(
-                        schedule_period=schedule_period,
-                        per_day_schedule=per_day_schedule,
-                        per_employee_schedule=per_employee_schedule,
-                        schedule_stats = schedule_stats,
-                    )
-
-                    return redirect('display_schedule', pk=new_schedule.pk)
+                # the solve itself runs in the solver worker, see jobs.py.
+                # An unchanged request returns the schedule it already got.
+                schedule, job = get_or_enqueue_schedule_job(schedule_period, period_end, solver_options=form.solver_options())
+
+                if schedule is not None:
+                    return redirect('display_schedule', pk=schedule.pk)
+
+                return redirect('schedule_job', pk=job.pk)
             
             else:
                 data_error_msg = test_results['msg']
@@ -127,20 +149,157 @@ def CreateSchedule(request):
 
     context = {
         'form': form,
-        'solver': solver,
         'data_error_msg': data_error_msg
     }
     
     return render(request, 'create_schedule.html', context=context)
 
+@require_POST
+@login_required
+def replan_schedule(request, pk):
+    # solves the schedule's period again with the current worker data, starting
+    # from the existing schedule and changing as few assignments as possible
+    schedule = get_object_or_404(Schedule, pk=pk)
+    cached, job = get_or_enqueue_schedule_job(schedule.schedule_period, schedule.period_end, base_schedule=schedule, minimal_changes=True)
+
+    if cached is not None:
+        return redirect('display_schedule', pk=cached.pk)
+
+    return redirect('schedule_job', pk=job.pk)
+
+@login_required
+def ScheduleJob(request, pk):
+    job = get_object_or_404(SolveJob, pk=pk)
+
+    if job.status == SolveJob.DONE and job.schedule_id:
+        return redirect('display_schedule', pk=job.schedule_id)
+
+    return render(request, 'schedule_job.html', context={'job': job})
+
+@login_required
+def schedule_job_status(request, pk):
+    job = get_object_or_404(SolveJob, pk=pk)
+    return JsonResponse(job_status(job))
+
+@login_required
+def schedule_job_events(request, pk):
+    # server-sent events with the job's status and solver progress. The stream
+    # ends after a while so it doesn't hold a request worker for the whole
+    # solve, EventSource reconnects on its own.
+    get_object_or_404(SolveJob, pk=pk)
+    stream_seconds = getattr(settings, 'SCHEDULER_EVENTS_STREAM_SECONDS', 30)
+
+    def events():
+        deadline = time.monotonic() + stream_seconds
+        last_data = None
+
+        yield 'retry: 1000\n\n'
+
+        while time.monotonic() < deadline:
+            job = SolveJob.objects.get(pk=pk)
+            data = job_status(job)
+
+            if data != last_data:
+                yield f'data: {json.dumps(data)}\n\n'
+                last_data = data
+
+            if job.is_finished():
+                return
+
+            time.sleep(0.5)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@require_POST
+@login_required
+def stop_schedule_job(request, pk):
+    # the solver keeps the best schedule found so far
+    job = get_object_or_404(SolveJob, pk=pk)
+    request_stop(job)
+    return redirect('schedule_job', pk=job.pk)
+
+def display_context(schedule, delta_form, delta_error_msg=''):
+    # the day and employee tables are read from the Assignment rows and cached
+    # by the template, the JSON copies aren't needed
+    return {
+        'schedule': schedule,
+        'display_cache_timeout': getattr(settings, 'SCHEDULER_DISPLAY_CACHE_TIMEOUT', 3600),
+        'delta_form': delta_form,
+        'delta_error_msg': delta_error_msg,
+    }
+
 @login_required
 def DisplaySchedule(request, pk):
-    schedule = Schedule.objects.get(pk=pk)
-    return render(request, 'display_schedule.html', context={'schedule': schedule})
+    schedule = get_object_or_404(Schedule.objects.defer('per_day_schedule', 'per_employee_schedule'), pk=pk)
+    return render(request, 'display_schedule.html', context=display_context(schedule, ScheduleDeltaForm()))
+
+@require_POST
+@login_required
+def schedule_delta(request, pk):
+    # small edits are solved right away, they only re-optimize a few days.
+    # The solve runs inside the request, so it gets its own small limits
+    # instead of the ones of a background job.
+    schedule = get_object_or_404(Schedule.objects.defer('per_day_schedule', 'per_employee_schedule'), pk=pk)
+    form = ScheduleDeltaForm(request.POST)
+    delta_error_msg = ''
+
+    if form.is_valid():
+        solve_options = get_solve_options()
+        solve_options['solver_params'] = {
+            **solve_options['solver_params'],
+            **getattr(settings, 'SCHEDULER_DELTA_SOLVER', {'time_limit': 1, 'num_workers': 4}),
+        }
+
+        try:
+            new_schedule = resolve_schedule_delta(
+                schedule,
+                form.cleaned_data['delta_type'],
+                form.cleaned_data['worker'],
+                form.cleaned_data['date'],
+                other_worker=form.cleaned_data['other_worker'],
+                radius=getattr(settings, 'SCHEDULER_DELTA_RADIUS', 3),
+                **solve_options,
+            )
+        except ValueError as error:
+            delta_error_msg = str(error)
+        else:
+            if new_schedule is None:
+                delta_error_msg = 'Solver failed to apply the change.'
+            else:
+                return redirect('display_schedule', pk=new_schedule.pk)
+
+    return render(request, 'display_schedule.html', context=display_context(schedule, form, delta_error_msg))
+
+def search_schedules(queryset, query):
+    """
+    The schedules whose name ("January 2026", "January 2026 - March 2026")
+    matches query: every word has to be part of the first or last month's
+    name or of its year.
+    """
+    for word in query.lower().replace('-', ' ').split():
+        months = [month for month in range(1, 13) if word in calendar.month_name[month].lower()]
+        match = Q(schedule_period__month__in=months) | Q(period_end__month__in=months)
+        if word.isdigit():
+            match |= Q(schedule_period__year__contains=word) | Q(period_end__year__contains=word)
+        queryset = queryset.filter(match)
+    return queryset
 
 class ScheduleListView(LoginRequiredMixin, generic.ListView):
     model = Schedule
-    paginate_by: 10
+    paginate_by = 10
+
+    def get_queryset(self):
+        # the list only shows the period, the assignments stay in the database.
+        # The search runs here, on every schedule and not just the current page.
+        return search_schedules(Schedule.objects.only('id', 'schedule_period', 'period_end'), self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
 class ScheduleDeleteView(LoginRequiredMixin, generic.DeleteView):
     model = Schedule
@@ -154,31 +313,77 @@ class ScheduleDeleteView(LoginRequiredMixin, generic.DeleteView):
             return HttpResponseRedirect('schedule_delete', kwargs={'pk': self.object.pk})
         
 
+def export_response(assignments, export_format, layout, filename, dates=None, with_schedule=False):
+    # streams the assignments in the chosen format, see exports.py
+    if layout == 'workers':
+        rows = worker_rows(assignments, dates, with_schedule)
+    else:
+        rows = assignment_rows(assignments, with_schedule)
+
+    if export_format == 'xlsx':
+        try:
+            return FileResponse(xlsx_file(rows), as_attachment=True, filename=f'{filename}.xlsx')
+        except RuntimeError as error:
+            return HttpResponse(str(error), status=501)
+
+    if export_format == 'pdf':
+        response = StreamingHttpResponse(pdf_stream(rows, filename), content_type='application/pdf')
+    else:
+        response = StreamingHttpResponse(csv_stream(rows), content_type='text/csv; charset=utf-8')
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+def schedule_filename(schedule):
+    filename = f"schedule_{schedule.schedule_period.strftime('%Y-%m')}"
+    if schedule.period_end:
+        filename += f"_{schedule.period_end.strftime('%Y-%m')}"
+    return filename
+
 @login_required
 def download_schedule_csv(request, pk):
     schedule = get_object_or_404(Schedule, pk=pk)
-    per_day = schedule.per_day_schedule # list of dictionaries
+    return export_response(schedule.assignments.all(), 'csv', 'rows', schedule_filename(schedule))
 
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    filename = f"schedule_{schedule.schedule_period.strftime('%Y-%m')}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    response.write('\ufeff')
+@login_required
+def download_schedule(request, pk, export_format):
+    schedule = get_object_or_404(Schedule, pk=pk)
+    layout = request.GET.get('layout', 'rows')
 
-    writer = csv.writer(response, delimiter=';')
+    if export_format not in EXPORT_FORMATS or layout not in EXPORT_LAYOUTS or (export_format == 'pdf' and layout == 'workers'):
+        raise Http404('Unknown export')
 
-    writer.writerow(['date', 'id', 'name'])
-    
-    for day in per_day:
-        date = day.get('iso_date', '')
-        employees = day.get('daily_employees', []) or [] # list of dictionaries
+    return export_response(
+        schedule.assignments.all(),
+        export_format,
+        layout,
+        schedule_filename(schedule),
+        dates=export_dates([schedule.id]),
+    )
 
-        for employee in employees:
-            employee_name = employee.get('name','')
-            employee_id = employee.get('id','')
+@login_required
+def export_schedules(request):
+    # several schedules and/or a date range in one file, with a schedule column
+    form = ScheduleExportForm(request.GET)
 
-            writer.writerow([date, employee_id, employee_name])
-    
-    return response
+    if not form.is_valid():
+        return HttpResponseBadRequest(' '.join(error for errors in form.errors.values() for error in errors))
+
+    schedule_ids = [schedule.id for schedule in form.cleaned_data['schedules']] or None
+    start, end = form.cleaned_data['start'], form.cleaned_data['end']
+
+    filename = 'schedules'
+    if start and end:
+        filename += f'_{start.isoformat()}_{end.isoformat()}'
+
+    return export_response(
+        export_assignments(schedule_ids, start, end),
+        form.cleaned_data['export_format'],
+        form.cleaned_data['layout'],
+        filename,
+        dates=export_dates(schedule_ids, start, end),
+        with_schedule=True,
+    )
 
 @login_required
 def worker_bulk_action_confirm(request):
@@ -207,11 +412,13 @@ def worker_bulk_action(request):
         instances.delete()
     
     elif action == 'reset':
+        Unavailability.objects.filter(worker__in=instances).delete()
         instances.update(
-            unavailable_dates=[],
             assign_least_shifts=False,
             assign_least_weekends=False
         )
+        # update() bypasses the Worker signals
+        invalidate_cached_schedules()
     
     return redirect('workers')
 
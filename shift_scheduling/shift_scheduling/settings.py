@@ -127,4 +127,111 @@ LOGIN_REDIRECT_URL = '/'
 
 LOGOUT_REDIRECT_URL = 'login'
 
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# Schedule solve jobs are executed by `python manage.py run_solver_worker`,
+# which runs this many solves in parallel and polls the queue at this interval.
+SCHEDULER_WORKER_PROCESSES = 2
+
+SCHEDULER_WORKER_POLL_INTERVAL = 1.0
+
+# A running job writes a heartbeat every SCHEDULER_JOB_HEARTBEAT_INTERVAL
+# seconds. Without one for SCHEDULER_JOB_STALE_AFTER seconds its worker is
+# considered dead and the job is failed, so it can be requested again.
+SCHEDULER_JOB_HEARTBEAT_INTERVAL = 10
+
+SCHEDULER_JOB_STALE_AFTER = 120
+
+# How create_schedule combines its objectives: 'sequential' re-solves once per
+# objective, 'hinted' does the same but warm-starts every stage from the
+# previous one, 'weighted' solves a single weighted objective. 'lns' improves
+# a first weighted schedule by re-solving parts of it (some days, some workers)
+# with the rest fixed, within the time the sequential stages would get
+# together. It is meant for rosters of a thousand workers and more.
+SCHEDULER_OBJECTIVE_MODE = 'sequential'
+
+# Encoding of the "one shift per interval" soft constraint, 'reified' or
+# 'implication' (create_schedule's default as well). Both reach the same optimum.
+SCHEDULER_INTERVAL_ENCODING = 'implication'
+
+# Order the working days of interchangeable workers (same available days,
+# history and assign_least_* flags) when at least 100 of them make up half of
+# a team with a single shift type. Speeds up the proofs of optimality on
+# homogeneous teams.
+SCHEDULER_SYMMETRY_BREAKING = True
+
+# Schedules longer than SCHEDULER_HORIZON_WINDOW_DAYS are solved in rolling
+# windows of that many days, each overlapping the next by
+# SCHEDULER_HORIZON_OVERLAP_DAYS days.
+SCHEDULER_HORIZON_WINDOW_DAYS = 35
+
+SCHEDULER_HORIZON_OVERLAP_DAYS = 7
+
+# Editing a single day of a schedule re-solves the days within this many days
+# of the change and keeps the rest as it is.
+SCHEDULER_DELTA_RADIUS = 3
+
+# SCHEDULER_SOLVER overrides for those edits. They are solved inside the web
+# request, time_limit is per objective stage like everywhere else, so an edit
+# takes a few seconds at most.
+SCHEDULER_DELTA_SOLVER = {
+    'time_limit': 1,
+    'num_workers': 4,
+}
+
+# CP-SAT parameters for every solve. time_limit is in seconds per objective
+# stage; for reproducible results use a fixed random_seed and
+# 'deterministic_time' instead of time_limit. Any other SatParameters field
+# may be added here as well.
+SCHEDULER_SOLVER = {
+    'time_limit': 5,
+    'num_workers': 8,
+    'random_seed': 0,
+}
+
+# The largest time_limit (seconds per objective stage), num_workers and
+# portfolio_size a single request may ask for, on the schedule form and in
+# the API.
+SCHEDULER_MAX_TIME_LIMIT = 60
+
+SCHEDULER_MAX_NUM_WORKERS = 8
+
+SCHEDULER_MAX_PORTFOLIO_SIZE = 8
+
+# Parameter overrides to run side by side for every job, keeping the best
+# schedule, e.g. [{'random_seed': 1}, {'random_seed': 2}]. Empty means one run.
+SCHEDULER_SOLVER_PORTFOLIO = []
+
+# A schedule job's progress stream is closed after this many seconds and the
+# browser reconnects, so a long solve doesn't hold a request worker.
+SCHEDULER_EVENTS_STREAM_SECONDS = 30
+
+# Reuse a stored schedule when the same period is requested again with
+# unchanged workers and solver settings, instead of solving it again.
+SCHEDULER_CACHE_RESULTS = True
+
+# Seconds the conflict explanation of a failed job may take, see diagnosis.py
+SCHEDULER_DIAGNOSIS_TIME_LIMIT = 10
+
+# Seconds the rendered tables of a schedule page stay in the default cache.
+# The key contains the schedule's update time, so edits show up right away.
+SCHEDULER_DISPLAY_CACHE_TIMEOUT = 60 * 60
+
+# Upper bounds (seconds) of the solve and build time histograms at
+# /scheduler/api/metrics
+SCHEDULER_METRICS_BUCKETS = [1, 5, 10, 30, 60, 120, 300, 600]
+
+# Every model solve is logged to 'scheduler.solver' at INFO (size, build and
+# solve time, status), see metrics.py. Nothing is configured for it here, the
+# deployment decides where the records go. To see them on the console:
+#
+# LOGGING = {
+#     'version': 1,
+#     'disable_existing_loggers': False,
+#     'handlers': {
+#         'console': {'class': 'logging.StreamHandler'},
+#     },
+#     'loggers': {
+#         'scheduler.solver': {'handlers': ['console'], 'level': 'INFO'},
+#     },
+# }